@@ -0,0 +1,282 @@
+"""
+Benchmark the main teacher and student pages against a generated district.
+
+Builds an in-memory database with `feedbook.synthetic`, then drives the Flask
+test client through each flow. Every flow is run once cold (stored student
+statuses cleared and nothing loaded in the session) and then repeatedly warm.
+For each flow it reports p50/p95 warm latency, cold latency, queries per
+request and peak Python memory, and compares them with the committed
+baseline in `benchmarks/baseline.json`.
+
+    python -m benchmarks.run                  # compare with the baseline
+    python -m benchmarks.run --save           # replace the baseline
+    python -m benchmarks.run --courses 100    # a bigger district
+
+Latency depends on the machine, so compare runs from the same machine. Query
+counts don't, which makes them the most reliable signal.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tracemalloc
+from time import perf_counter
+
+from config import Config
+from feedbook import create_app
+from feedbook.extensions import db
+from feedbook.profiling import record_queries
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# District used for the committed baseline
+DISTRICT = {
+    "courses": 20,
+    "students_per_course": 30,
+    "courses_per_student": 4,
+    "standards": 60,
+    "standards_per_course": 12,
+    "assignments_per_course": 20,
+}
+
+
+class BenchmarkConfig(Config):
+    TESTING = True
+    SECRET_KEY = "benchmark"
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    SQLALCHEMY_RECORD_QUERIES = False
+
+
+class Runner:
+    def __init__(self, app, iterations):
+        self.app = app
+        self.iterations = iterations
+        self.client = app.test_client()
+        self.results = {}
+
+        from feedbook.models import Course, User
+
+        # The first course, its teacher, standard, assignment and students.
+        # Only ids are kept so every request starts with an empty session.
+        with app.app_context():
+            course = db.session.get(Course, 1)
+            students = course.enrollments.filter(User.usertype_id == 2).all()
+            assignment = course.assignments.first()
+
+            self.course = course.id
+            self.teacher = course.enrollments.filter(User.usertype_id == 1).first().id
+            self.student = students[0].id
+            self.standard = course.standards.first().id
+            self.assignment = assignment.id
+            self.grid = self._grid(assignment, students)
+
+    def _grid(self, assignment, students):
+        """
+        Form data scoring every student in the course on the assignment.
+        """
+        cells = [
+            (user.id, standard.id)
+            for user in students
+            for standard in assignment.alignments
+        ]
+
+        return {
+            "assignment": assignment.id,
+            "user_id": [user_id for user_id, _ in cells],
+            "standard_id": [standard_id for _, standard_id in cells],
+            "score": ["1"] * len(cells),
+        }
+
+    def login(self, user_id):
+        with self.client.session_transaction() as session:
+            session["_user_id"] = str(user_id)
+            session["_fresh"] = True
+
+    def clear(self):
+        """
+        Delete the stored student statuses for the course so the next request
+        rebuilds them.
+        """
+        from feedbook import status
+
+        with self.app.app_context():
+            status.invalidate(course_ids=[self.course])
+            db.session.commit()
+
+    def request(self, method, url, **kwargs):
+        with record_queries() as log:
+            start = perf_counter()
+            resp = self.client.open(
+                url, method=method, headers={"HX-Request": "true"}, **kwargs
+            )
+            elapsed = (perf_counter() - start) * 1000
+
+        if resp.status_code != 200:
+            raise RuntimeError(f"{method} {url} returned {resp.status_code}")
+
+        return elapsed, log.count
+
+    def measure(self, name, user_id, method, url, data=None):
+        self.login(user_id)
+        self.clear()
+
+        cold, cold_queries = self.request(method, url, data=data)
+
+        timings, queries = [], []
+        for _ in range(self.iterations):
+            elapsed, count = self.request(method, url, data=data)
+            timings.append(elapsed)
+            queries.append(count)
+
+        # Tracing allocations slows everything down, so it gets its own request
+        tracemalloc.start()
+        self.request(method, url, data=data)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings.sort()
+        self.results[name] = {
+            "p50_ms": round(statistics.median(timings), 2),
+            "p95_ms": round(timings[int(0.95 * (len(timings) - 1))], 2),
+            "cold_ms": round(cold, 2),
+            "queries": max(queries),
+            "cold_queries": cold_queries,
+            "peak_kb": round(peak / 1024),
+        }
+
+    def run(self):
+        course, standard = self.course, self.standard
+        assignment, student = self.assignment, self.student
+
+        flows = [
+            ("dashboard", self.teacher, "GET", f"/courses/{course}"),
+            (
+                "standard_results",
+                self.teacher,
+                "GET",
+                f"/courses/{course}/standards/{standard}/results",
+            ),
+            (
+                "assignment_detail",
+                self.teacher,
+                "GET",
+                f"/courses/{course}/assignments/{assignment}",
+            ),
+            (
+                "student_report",
+                self.teacher,
+                "GET",
+                f"/courses/{course}/users?user_id={student}",
+            ),
+            ("student_dashboard", self.student, "GET", f"/courses/{course}"),
+            ("admin", self.teacher, "GET", "/admin"),
+            ("standard_chart", self.teacher, "GET", f"/standards/{standard}"),
+        ]
+        for name, user, method, url in flows:
+            self.measure(name, user, method, url)
+
+        self.measure(
+            "bulk_scoring", self.teacher, "POST", "/standards/attempts", self.grid
+        )
+
+        return self.results
+
+
+def compare(results, baseline, tolerance) -> list:
+    """
+    Print each flow next to its baseline and return the regressions.
+    """
+    regressions = []
+    print(
+        f"{'flow':<20}{'p50 ms':>18}{'p95 ms':>18}{'cold ms':>18}{'queries':>12}{'peak kb':>14}"
+    )
+
+    for name, result in results.items():
+        before = baseline.get(name, {})
+
+        def cell(key, width=18):
+            value = result[key]
+            if key not in before:
+                return f"{value:>{width}}"
+            return f"{f'{value} ({before[key]})':>{width}}"
+
+        print(
+            f"{name:<20}{cell('p50_ms')}{cell('p95_ms')}{cell('cold_ms')}{cell('queries', 12)}{cell('peak_kb', 14)}"
+        )
+
+        if not before:
+            continue
+        if result["queries"] > before["queries"]:
+            regressions.append(
+                f"{name}: {result['queries']} queries, was {before['queries']}"
+            )
+        if result["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p50 {result['p50_ms']}ms, was {before['p50_ms']}ms"
+            )
+        if result["peak_kb"] > before["peak_kb"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: peak {result['peak_kb']}kb, was {before['peak_kb']}kb"
+            )
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--courses", type=int, default=DISTRICT["courses"])
+    parser.add_argument("--students", type=int, default=DISTRICT["students_per_course"])
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed p50 and peak memory increase before a flow counts as a regression.",
+    )
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument(
+        "--save", action="store_true", help="Write the results as the baseline."
+    )
+    args = parser.parse_args(argv)
+
+    options = dict(DISTRICT, courses=args.courses, students_per_course=args.students)
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        from feedbook.synthetic import District, load
+
+        db.create_all()
+        with db.engine.begin() as connection:
+            load(connection, District(**options))
+
+    # Each request gets its own app context and session, like in production
+    results = Runner(app, args.iterations).run()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file_in:
+            stored = json.load(file_in)
+        if stored.get("district") == options:
+            baseline = stored["flows"]
+        else:
+            print("The baseline used a different district, so it isn't compared.")
+
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save:
+        with open(args.baseline, "w") as file_out:
+            json.dump({"district": options, "flows": results}, file_out, indent=2)
+            file_out.write("\n")
+        print(f"Saved the baseline to {args.baseline}")
+    elif regressions:
+        print("\nSlower than the baseline:")
+        print("\n".join(regressions))
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,7 @@ from flask import Flask, has_request_context, request
 from config import Config
 from feedbook.extensions import db, htmx, login_manager, migrate, partials
 from feedbook.blueprints import admin, assignment, auth, home, course, standard, user
+from feedbook import commands, profiling
 from feedbook.errors import forbidden, not_found, unauthorized
 
 
@@ -42,7 +43,7 @@ def create_app(config=Config):
         app.logger.setLevel(logging.INFO)
         app.logger.info("Starting application")
 
-    from feedbook import models
+    from feedbook import identity, lookups, models, status
 
     db.init_app(app)
     htmx.init_app(app)
@@ -52,6 +53,8 @@ def create_app(config=Config):
     login_manager.login_view = "auth.get_login"
 
     partials.register_extensions(app)
+    profiling.init_app(app)
+    lookups.init_app(app)
 
     app.register_blueprint(admin.bp)
     app.register_blueprint(assignment.bp)
@@ -60,6 +63,7 @@ def create_app(config=Config):
     app.register_blueprint(course.bp)
     app.register_blueprint(standard.bp)
     app.register_blueprint(user.bp)
+    app.register_blueprint(commands.bp)
 
     app.register_error_handler(401, unauthorized)
     app.register_error_handler(403, forbidden)
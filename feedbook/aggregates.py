@@ -0,0 +1,53 @@
+from collections import namedtuple
+
+from sqlalchemy import func, select
+
+from feedbook.extensions import db
+from feedbook.models import _ids, user_courses, StandardAttempt
+
+# The rounded average score and the number of attempts behind it
+Average = namedtuple("Average", ["average", "count"])
+
+
+def _averages(column, course=None, ids=None) -> dict:
+    """
+    Average StandardAttempt scores grouped by `column` in a single query.
+
+    When a course is given, only attempts from students enrolled in that course
+    are counted, matching the old per-row `course_average` methods.
+    """
+    query = select(
+        column, func.avg(StandardAttempt.score), func.count(StandardAttempt.id)
+    ).group_by(column)
+
+    if course is not None:
+        query = query.join(
+            user_courses, user_courses.c.user_id == StandardAttempt.user_id
+        ).where(user_courses.c.course_id == getattr(course, "id", course))
+    if ids is not None:
+        query = query.where(column.in_(_ids(ids)))
+
+    return {
+        key: Average(round(float(average), 2), count)
+        for key, average, count in db.session.execute(query)
+    }
+
+
+def assignment_averages(course=None, assignments=None) -> dict:
+    """
+    Get the average score for each assignment as {assignment_id: Average}.
+
+    Pass a course to limit the attempts to its students and a list of
+    assignments (or ids) to limit which assignments are returned. Assignments
+    without attempts are left out.
+    """
+    return _averages(StandardAttempt.assignment_id, course, assignments)
+
+
+def standard_averages(course=None, standards=None) -> dict:
+    """
+    Get the average score for each standard as {standard_id: Average}.
+
+    Takes the same filters as `assignment_averages`.
+    """
+    return _averages(StandardAttempt.standard_id, course, standards)
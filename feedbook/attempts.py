@@ -0,0 +1,239 @@
+"""
+Record many StandardAttempts at once.
+
+Scoring a class one POST at a time costs a request, a commit and several lazy
+loads per student. `add_attempts` takes a whole grid of scores for one
+assignment, inserts every attempt in one executemany, adds proficient
+overrides for passed assessments in one statement per standard and commits
+once.
+
+Score forms send an idempotency key so a double-submitted form (a double
+click or a retry on a flaky connection) doesn't store the same attempt twice.
+Keys are unique in the database, and inserts skip keys that are already
+stored, so a retry returns the attempts saved the first time.
+"""
+
+from collections import defaultdict
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from feedbook import status
+from feedbook.extensions import db
+from feedbook.lookups import STUDENT, user_types
+from feedbook.models import assignment_standards, Standard, StandardAttempt, User
+
+SCORES = (0, 1, 2)
+
+
+class GridError(ValueError):
+    """
+    Raised when a submitted grid can't be saved. `errors` holds a message for
+    each problem so they can be shown together.
+    """
+
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def parse_grid(user_ids, standard_ids, scores, comments=None) -> list:
+    """
+    Turn the parallel lists submitted by the score grid into entries for
+    `add_attempts`. Each position is one cell. Cells without a score are
+    left out so a teacher can save a partly filled grid.
+    """
+    comments = comments or [""] * len(user_ids)
+    if not len(user_ids) == len(standard_ids) == len(scores) == len(comments):
+        raise GridError(["Every cell needs a student, standard and score"])
+
+    entries = []
+    errors = []
+    for user_id, standard_id, score, comment in zip(
+        user_ids, standard_ids, scores, comments
+    ):
+        score = score.strip()
+        if not score:
+            continue
+
+        if not score.isdigit() or int(score) not in SCORES:
+            errors.append(f"{score} is not a valid score")
+            continue
+
+        entries.append(
+            {
+                "user_id": user_id,
+                "standard_id": standard_id,
+                "score": int(score),
+                "comments": comment.strip() or None,
+            }
+        )
+
+    if errors:
+        raise GridError(errors)
+
+    return entries
+
+
+def validate_entries(assignment, entries):
+    """
+    Check that every entry is for a student and a standard aligned to the
+    assignment, with one query for each.
+    """
+    errors = []
+
+    user_ids = {entry["user_id"] for entry in entries}
+    students = set(
+        db.session.scalars(
+            select(User.id).where(
+                User.id.in_(user_ids), User.usertype_id == user_types.id(STUDENT)
+            )
+        )
+    )
+    for user_id in sorted(user_ids - students):
+        errors.append(f"User {user_id} is not a student")
+
+    standard_ids = {entry["standard_id"] for entry in entries}
+    aligned = set(
+        db.session.scalars(
+            select(assignment_standards.c.standard_id).where(
+                assignment_standards.c.assignment_id == assignment.id,
+                assignment_standards.c.standard_id.in_(standard_ids),
+            )
+        )
+    )
+    for standard_id in sorted(standard_ids - aligned):
+        errors.append(f"Standard {standard_id} is not aligned to {assignment.name}")
+
+    if errors:
+        raise GridError(errors)
+
+
+def cell_key(key, entry) -> str:
+    """
+    The idempotency key for one cell of a grid submitted with `key`.
+    """
+    return f"{key}:{entry['user_id']}:{entry['standard_id']}"
+
+
+def attempts_for_keys(keys) -> dict:
+    """
+    Get stored attempts by idempotency key as {key: StandardAttempt}.
+    """
+    if not keys:
+        return {}
+
+    return {
+        attempt.idempotency_key: attempt
+        for attempt in db.session.scalars(
+            select(StandardAttempt).where(StandardAttempt.idempotency_key.in_(keys))
+        )
+    }
+
+
+def _insert(rows) -> list:
+    """
+    Insert attempts with one executemany and return the new rows. Rows with
+    an idempotency key that is already stored are skipped by the database.
+    Other dialects fall back to filtering out stored keys first.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "sqlite":
+        stmt = sqlite.insert(StandardAttempt).on_conflict_do_nothing()
+    elif dialect == "postgresql":
+        stmt = postgresql.insert(StandardAttempt).on_conflict_do_nothing()
+    else:
+        stmt = insert(StandardAttempt)
+        stored = attempts_for_keys(
+            [row["idempotency_key"] for row in rows if row.get("idempotency_key")]
+        )
+        rows = [row for row in rows if row.get("idempotency_key") not in stored]
+        if not rows:
+            return []
+
+    return db.session.scalars(stmt.returning(StandardAttempt), rows).all()
+
+
+def add_attempts(assignment, entries, key=None) -> list:
+    """
+    Save a grid of scores for an assignment and return its attempts.
+
+    `entries` are dicts with user_id, standard_id, score and comments. All of
+    them are inserted with a single executemany. When the assignment is an
+    assessment, passing scores add proficient overrides in bulk. The stored
+    student statuses are refreshed and everything commits together.
+
+    With an idempotency `key`, cells that were already saved with the same key
+    aren't stored again. Their original attempts are returned with the new
+    ones, in the order of `entries`.
+    """
+    if not entries:
+        return []
+
+    validate_entries(assignment, entries)
+
+    rows = [dict(entry, assignment_id=assignment.id) for entry in entries]
+    saved = {}
+    if key is not None:
+        for row in rows:
+            row["idempotency_key"] = cell_key(key, row)
+        saved = attempts_for_keys([row["idempotency_key"] for row in rows])
+        rows = [row for row in rows if row["idempotency_key"] not in saved]
+
+    attempts = _insert(rows) if rows else []
+
+    if assignment.is_assessment:
+        passed = defaultdict(set)
+        for attempt in attempts:
+            if attempt.score == 2:
+                passed[attempt.standard_id].add(attempt.user_id)
+
+        for standard_id, user_ids in passed.items():
+            db.session.get(Standard, standard_id).add_overrides(user_ids, refresh=False)
+
+    # Bulk inserts skip the flush hooks, so refresh the statuses here. This
+    # covers the new overrides too, so every pair is refreshed once.
+    status.refresh({(attempt.user_id, attempt.standard_id) for attempt in attempts})
+    ids = [attempt.id for attempt in attempts]
+    db.session.commit()
+
+    if key is None:
+        # The commit expired the new rows, so read them back together instead
+        # of one at a time when they are used
+        db.session.scalars(
+            select(StandardAttempt).where(StandardAttempt.id.in_(ids))
+        ).all()
+        return attempts
+
+    # A retry racing the first request may have stored some cells in between
+    saved = attempts_for_keys([cell_key(key, entry) for entry in entries])
+    return [saved[cell_key(key, entry)] for entry in entries]
+
+
+def add_attempt(key=None, **values):
+    """
+    Save a single attempt and return (attempt, created).
+
+    If an attempt with the same idempotency `key` is stored already, it is
+    returned instead. The insert runs in a savepoint, so when a racing request
+    stores it first only the insert is rolled back and the stored attempt is
+    returned. Any other database error is raised. Does not commit.
+    """
+    if key is not None:
+        attempt = attempts_for_keys([key]).get(key)
+        if attempt is not None:
+            return attempt, False
+
+    attempt = StandardAttempt(idempotency_key=key, **values)
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(attempt)
+    except IntegrityError:
+        stored = attempts_for_keys([key]).get(key) if key is not None else None
+        if stored is None:
+            raise
+        return stored, False
+
+    return attempt, True
@@ -1,11 +1,14 @@
-from flask import Blueprint, current_app, jsonify, render_template
+from flask import Blueprint, abort, current_app, jsonify, render_template
 from flask_login import current_user, login_required
 from htmx_flask import make_response
-from webargs import fields
+from webargs import fields, validate
 from webargs.flaskparser import parser
 
+from feedbook.aggregates import assignment_averages
+from feedbook.dashboard import attempt_assignments
 from feedbook.extensions import db
-from feedbook.models import Assignment, AssignmentType, Course, Standard
+from feedbook.lookups import assignment_types
+from feedbook.models import Assignment, Course, Standard, StandardAttempt
 from feedbook.wrappers import restricted
 
 bp = Blueprint("assignment", __name__)
@@ -63,6 +66,7 @@ def create_assignment():
             "assignments/assignment-list-item.html",
             assignment=assignment,
             course=current_course,
+            averages=assignment_averages(current_course, [assignment]),
         ),
         trigger={
             "showToast": {"msg": "Assignment added", "err": False},
@@ -79,7 +83,7 @@ def create_assignment_form():
     Get the form to create a new assignment.
     """
     args = parser.parse({"current_course_id": fields.Int()}, location="query")
-    types = AssignmentType.query.all()
+    types = assignment_types.all()
     courses = Course.query.filter(Course.active).all()
     return render_template(
         "course/right-sidebar.html",
@@ -94,6 +98,50 @@ def create_assignment_form():
     )
 
 
+@bp.get("/assignments/search")
+@login_required
+@restricted
+def search_assignments():
+    """
+    Get <option> elements for the assignment picker on the assessment forms.
+
+    Assignments are matched on the start of their name, a page at a time. An
+    empty search lists what the forms start with instead: the assignments in
+    `course_id`, or the choices for editing `attempt_id`.
+    """
+    args = parser.parse(
+        {
+            "q": fields.Str(load_default=""),
+            "course_id": fields.Int(load_default=None),
+            "attempt_id": fields.Int(load_default=None),
+            "page": fields.Int(validate=validate.Range(min=1), load_default=1),
+        },
+        location="query",
+    )
+
+    query = args["q"].strip()
+    if query:
+        page = Assignment.search(query, page=args["page"])
+        assignments, more = page.items, page.has_next
+    elif args["course_id"] is not None:
+        course = current_user.enrolled_course(args["course_id"])
+        if not course:
+            abort(401)
+        assignments = course.assignments.order_by(
+            Assignment.created_on.desc(), Assignment.id.desc()
+        ).all()
+        more = False
+    elif args["attempt_id"] is not None:
+        attempt = db.get_or_404(StandardAttempt, args["attempt_id"])
+        assignments, more = attempt_assignments(attempt, current_user), False
+    else:
+        assignments, more = [], False
+
+    return render_template(
+        "assignments/assignment-options.html", assignments=assignments, more=more
+    )
+
+
 @bp.get("/assignments/<int:assignment_id>")
 @login_required
 @restricted
@@ -110,7 +158,7 @@ def get_assignment(assignment_id):
 @restricted
 def get_assignment_edit_form(assignment_id):
     assignment = Assignment.query.filter(Assignment.id == assignment_id).first()
-    types = AssignmentType.query.all()
+    types = assignment_types.all()
 
     return render_template(
         "shared/forms/edit-assignment.html", assignment=assignment, types=types
@@ -143,6 +191,7 @@ def edit_assignment(assignment_id):
         for course in args["courses"]:
             c = Course.query.filter(Course.id == course).first()
             c.add_assignment(assignment)
+        db.session.commit()
 
     return make_response(
         render_template("assignments/single-assignment.html", assignment=assignment),
@@ -159,10 +208,11 @@ def create_standard_alignment(assignment_id):
     """
     assignment = db.session.get(Assignment, assignment_id)
     args = parser.parse({"standards": fields.List(fields.Int())}, location="form")
-    for standard_id in args["standards"]:
-        standard = Standard.query.filter(Standard.id == standard_id).first()
-        if standard:
-            assignment.add_standard(standard)
+    standard_ids = db.session.scalars(
+        db.select(Standard.id).where(Standard.id.in_(args["standards"]))
+    ).all()
+    assignment.add_standards(standard_ids)
+    db.session.commit()
 
     return make_response(trigger={"showToast": "Alignments created"})
 
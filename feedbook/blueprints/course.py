@@ -1,24 +1,30 @@
-import csv
 from io import TextIOWrapper
-from collections import defaultdict
+from uuid import uuid4
 
 from flask import abort, Blueprint, current_app, render_template, request
 from flask_login import current_user, login_required
 from htmx_flask import make_response
-from webargs import fields
+from webargs import fields, validate
 from webargs.flaskparser import parser
 
+from feedbook.dashboard import (
+    assignment_detail,
+    standard_results,
+    student_report,
+    teacher_dashboard,
+)
 from feedbook.extensions import db
+from feedbook.lookups import STUDENT, user_types
 from feedbook.models import (
-    course_assignments,
     Assignment,
     Course,
     Standard,
     StandardAttempt,
     User,
 )
-from feedbook.schemas import CourseSchema, StandardListSchema
-from feedbook.wrappers import templated, restricted
+from feedbook.roster import import_roster, sync_roster
+from feedbook.status import load_statuses
+from feedbook.wrappers import render_page, templated, restricted
 
 bp = Blueprint("course", __name__)
 
@@ -83,10 +89,20 @@ def get_roster_form(course_id):
 
 
 # Process the uploaded CSV file for a new course roster.
+# In sync mode, the course is changed to match the file. Use dry_run to preview the changes first.
 @bp.post("/courses/<int:course_id>/upload")
 @login_required
 @restricted
 def roster_upload(course_id):
+    options = parser.parse(
+        {
+            "mode": fields.String(
+                load_default="add", validate=validate.OneOf(["add", "sync"])
+            ),
+            "dry_run": fields.Boolean(load_default=False),
+        },
+        location="form",
+    )
     args = parser.parse(
         {
             "file": fields.Field(
@@ -96,40 +112,43 @@ def roster_upload(course_id):
         location="files",
     )
 
-    course = current_user.enrollments.filter(Course.id == course_id).first()
+    course = current_user.enrolled_course(course_id)
 
-    csv_file = TextIOWrapper(args["file"], encoding="utf-8")
-    reader = csv.reader(csv_file, delimiter=",")
-    next(reader)
+    if not course:
+        abort(401)
+
+    # utf-8-sig drops the byte order mark spreadsheet exports add
+    csv_file = TextIOWrapper(args["file"], encoding="utf-8-sig", newline="")
+
+    if options["mode"] == "sync":
+        result = sync_roster(course, csv_file, dry_run=options["dry_run"])
+
+        if result.dry_run:
+            msg = "Review the roster changes"
+        else:
+            current_app.logger.info(
+                f"{current_user.id} synced the roster for {course.id}: {len(result.added)} added, {len(result.reactivated)} reactivated, {len(result.deactivated)} deactivated"
+            )
+            msg = "Roster synced"
 
-    for row in reader:
-        user = User(
-            email=row[2],
-            last_name=row[0],
-            first_name=row[1],
-            usertype_id=2,
-            active=True,
+        return make_response(
+            render_template(
+                "course/partials/roster-sync.html", course=course, result=result
+            ),
+            trigger={"showToast": msg},
         )
-        db.session.add(user)
 
-        user.enroll(course)
-        db.session.commit()
+    result = import_roster(course, csv_file)
 
-    student_enrollments = (
-        course.enrollments.filter(User.usertype_id == 2, User.active == True)
-        .order_by("last_name")
-        .all()
+    current_app.logger.info(
+        f"{current_user.id} uploaded a roster to {course.id}: {result.created} created, {result.updated} updated, {result.skipped} skipped"
     )
-    for student in student_enrollments:
-        student.scores = []
-        for standard in course.standards.all():
-            user_score = standard.current_score(student.id)
-            student.scores.append({"standard_id": standard.id, "score": user_score})
 
-    return render_template(
-        "course/teacher-index-htmx.html",
-        course=CourseSchema().dump(course),
-        students=student_enrollments,
+    return make_response(
+        render_template(
+            "course/partials/roster-results.html", course=course, result=result
+        ),
+        trigger={"showToast": f"Roster imported: {result.enrolled} students added"},
     )
 
 
@@ -142,59 +161,29 @@ def get_single_course(id):
 
     This route returns differently based on the request method. If it is an HTMX request, `render_template` is called normally using **kwargs to set the template context.
 
-    If the route is called from a browser reload, the request data is packed into a `ctx` mapping which renders with a layout wrapper to keep styles intact.
+    If the route is called from a browser reload, `render_page` places the template inside the cached layout to keep styles intact.
     """
-    course = current_user.enrollments.filter(Course.id == id).first()
+    course = current_user.enrolled_course(id)
 
     if not course:
         abort(401)
 
-    if current_user.usertype_id == 2:
+    if current_user.is_student:
         template = "course/student_index.html"
-        resp_data = {"course": course}
+        statuses = load_statuses(course, [current_user.id], course.standards.all())
+        proficiency = {
+            standard_id: row.proficient for (_, standard_id), row in statuses.items()
+        }
+        resp_data = {"course": course, "proficiency": proficiency}
         current_app.logger.info(f"{current_user.id} opened {course.name}")
     else:
-        # prep the standard report
-        results = {}
-        enrollments = (
-            course.enrollments.filter(User.usertype_id == 2, User.active)
-            .order_by(User.last_name)
-            .all()
-        )
-        for standard in course.standards.all():
-            count = 0
-            for student in enrollments:
-                if standard.is_proficient(student):
-                    count = count + 1
-            results[f"standard_{standard.id}"] = {
-                "proficient": count,
-                "not_proficient": len(enrollments) - count,
-            }
-
         template = "course/teacher-index-htmx.html"
-        resp_data = {"course": course, "enrollments": enrollments, "results": results}
+        resp_data = teacher_dashboard(course)
 
-    # Handle reload requests by passing this through the wrapper
-    if request.htmx:
-        resp = render_template(template, **resp_data)
-    else:
+    if not request.htmx:
         current_app.logger.info(f"{current_user.id} refreshed the page")
-        # The sidebar is part of the template, so it needs to be rebult
-        # if the page is reloaded.
-        from feedbook.static.icons import add, admin, home, logout
-
-        resp_data["icons"] = {
-            "add": add,
-            "admin": admin,
-            "home": home,
-            "logout": logout,
-        }
 
-        resp = render_template(
-            "shared/layout_wrapper.html", partial=template, data=resp_data
-        )
-
-    return resp
+    return render_page(template, **resp_data)
 
 
 # Get edit form for a single course
@@ -239,7 +228,9 @@ def update_course_state(course_id):
 
     course.active = not course.active
 
-    for user in course.enrollments.filter(User.usertype_id == 2).all():
+    for user in course.enrollments.filter(
+        User.usertype_id == user_types.id(STUDENT)
+    ).all():
         user.active = not user.active
 
     db.session.commit()
@@ -257,6 +248,7 @@ def update_course_state(course_id):
 
 
 @bp.get("/courses/<int:course_id>/assignments/<int:assignment_id>")
+@templated("assignments/assignment-detail.html")
 def get_single_assignment(course_id, assignment_id):
     """
     Get the data for a single assignment from the course context.
@@ -264,83 +256,10 @@ def get_single_assignment(course_id, assignment_id):
     Assignments are course agnostic, this route allows for the assignment
     data to be loaded with the current student roster.
     """
-    from itertools import groupby
-    from operator import attrgetter
-
     assignment = db.session.get(Assignment, assignment_id)
     course = db.session.get(Course, course_id)
-    students = course.enrollments.filter(
-        User.usertype_id == 2, User.active == True
-    ).all()
-
-    enrollment_ids = [
-        user.id
-        for user in db.session.get(Course, course_id)
-        .enrollments.filter(User.usertype_id == 2 and User.active == True)
-        .all()
-    ]
-
-    # Limit the results for the assignment to the current course only.
-    # This returns all StandardAttempt records for the current course,
-    # arranged by student ID.
-    query = (
-        StandardAttempt.query.join(Assignment)
-        .join(course_assignments)
-        .filter(
-            (course_assignments.c.course_id == course_id)
-            & (StandardAttempt.assignment_id == assignment_id)
-        )
-        .order_by(StandardAttempt.user_id)
-        .all()
-    )
-
-    # Use a defaultdict class to collect the StandardAttempt objects by
-    # user in a dictionary.
-    results = defaultdict(dict)
 
-    if not query:
-        for user in students:
-            results["user_{}".format(user.id)]["user"] = user
-            results["user_{}".format(user.id)]["items"] = []
-            results["user_{}".format(user.id)].setdefault("includes", []).append(
-                assignment.alignments.all()
-            )
-    else:
-        for user in students:
-            student_results = [item for item in query if item.user.id == user.id]
-            results["user_{}".format(user.id)]["items"] = student_results
-            results["user_{}".format(user.id)]["user"] = user
-            results["user_{}".format(user.id)]["includes"] = [
-                result.standard_id for result in student_results
-            ]
-
-    sorted_results = sorted(results.values(), key=lambda item: item["user"].last_name)
-
-    template = ("assignments/assignment-detail.html",)
-    resp_data = {
-        "assignment": assignment,
-        "results": sorted_results,
-        "course_id": course_id,
-    }
-
-    if request.htmx:
-        resp = render_template(template, **resp_data)
-    else:
-        # The sidebar is part of the template, so it needs to be rebult
-        # if the page is reloaded.
-        from feedbook.static.icons import add, admin, home, logout
-
-        resp_data["icons"] = {
-            "add": add,
-            "admin": admin,
-            "home": home,
-            "logout": logout,
-        }
-        resp = render_template(
-            "shared/layout_wrapper.html", partial=template, data=resp_data
-        )
-
-    return resp
+    return assignment_detail(course, assignment)
 
 
 # Align an assignment in a course to a standard
@@ -362,52 +281,15 @@ def get_alignment_form(course_id, assignment_id):
 @bp.get("/courses/<int:course_id>/users")
 @login_required
 @restricted
+@templated("user/user-index.html")
 def get_user(course_id):
     args = parser.parse({"user_id": fields.Int()}, location="querystring")
-    course = Course.query.filter(Course.id == course_id).first()
-    user = User.query.filter(User.id == args["user_id"]).first()
-    standards = defaultdict(dict)
-
-    for a in user.assessments.all():
-        standards[a.standard.name]["is_proficient"] = a.standard.is_proficient(user)
-        standards[a.standard.name]["id"] = a.standard.id
-        standards[a.standard.name].setdefault("assessments", []).append(
-            {
-                "assignment": a.assessed_on,
-                "score": a.score,
-                "occurred": a.occurred,
-                "comments": a.comments,
-            }
-        )
-
-    enrollments = [user for user in course.enrollments if user.usertype_id == 2]
-
-    template = "user/user-index.html"
-    resp_data = {
-        "user": user,
-        "standards": standards,
-        "enrollments": enrollments,
-        "course": course,
-    }
-
-    if request.htmx:
-        resp = render_template(template, **resp_data)
-    else:
-        # The sidebar is part of the template, so it needs to be rebult
-        # if the page is reloaded.
-        from feedbook.static.icons import add, admin, home, logout
-
-        resp_data["icons"] = {
-            "add": add,
-            "admin": admin,
-            "home": home,
-            "logout": logout,
-        }
-        resp = render_template(
-            "shared/layout_wrapper.html", partial=template, data=resp_data
-        )
+    course = db.session.get(Course, course_id)
+    user = db.session.get(User, args["user_id"])
+    if course is None or user is None:
+        abort(404)
 
-    return resp
+    return student_report(course, user)
 
 
 # Create new standard
@@ -415,86 +297,70 @@ def get_user(course_id):
 @login_required
 @restricted
 def get_create_standard_form(course_id):
-    standards = Standard.query.all()
-    course = current_user.enrollments.filter(Course.id == course_id).first()
+    course = current_user.enrolled_course(course_id)
+    if course is None:
+        abort(404)
 
-    filtered = [standard for standard in standards if standard not in course.standards]
+    page = course.available_standards()
 
     return render_template(
         "standards/standard-sidebar.html",
         position="right",
         partial="shared/forms/create-standard.html",
         title="Add standards",
-        items=StandardListSchema(many=True).dump(filtered),
+        page=page,
         course_id=course_id,
     )
 
 
-# Get results for a standard in the course context
-@bp.get("/courses/<int:course_id>/standards/<int:standard_id>/results")
+# Search the standards which can be added to a course, a page at a time
+@bp.get("/courses/<int:course_id>/standards/available")
 @login_required
 @restricted
-def get_standard_scores_in_course(course_id, standard_id):
-    from feedbook.models import StandardAttempt
-    from feedbook.schemas import StandardAttemptSchema
-
-    course = Course.query.filter(Course.id == course_id).first()
-    standard = Standard.query.filter(Standard.id == standard_id).first()
-
-    student_enrollments = (
-        course.enrollments.filter(User.usertype_id == 2, User.active == True)
-        .order_by("last_name")
-        .all()
+def get_available_standards(course_id):
+    args = parser.parse(
+        {
+            "q": fields.Str(load_default=None),
+            "page": fields.Int(validate=validate.Range(min=1), load_default=1),
+        },
+        location="querystring",
     )
+    course = current_user.enrolled_course(course_id)
+    if course is None:
+        abort(404)
 
-    # Process student results
-    results = []
-    for student in student_enrollments:
-        assessments = student.assessments.filter(
-            StandardAttempt.standard_id == standard_id
-        ).order_by(StandardAttempt.occurred)
-
-        results.append(
-            {
-                "last_name": student.last_name,
-                "first_name": student.first_name,
-                "id": student.id,
-                "scores": assessments,
-                "is_proficient": standard.is_proficient(student),
-            }
-        )
+    page = course.available_standards(search=args["q"], page=args["page"])
 
-    template = "course/partials/standard-score-table.html"
-    resp_data = {"students": results, "course_id": course_id, "standard": standard}
+    return render_template(
+        "standards/standards-available.html",
+        page=page,
+        search=args["q"],
+        course_id=course_id,
+    )
 
-    if request.htmx:
-        resp = render_template(template, **resp_data)
-    else:
-        # The sidebar is part of the template, so it needs to be rebult
-        # if the page is reloaded.
-        from feedbook.static.icons import add, admin, home, logout
-
-        resp_data["icons"] = {
-            "add": add,
-            "admin": admin,
-            "home": home,
-            "logout": logout,
-        }
 
-        resp = render_template(
-            "shared/layout_wrapper.html", partial=template, data=resp_data
-        )
+# Get results for a standard in the course context
+@bp.get("/courses/<int:course_id>/standards/<int:standard_id>/results")
+@login_required
+@restricted
+@templated("course/partials/standard-score-table.html")
+def get_standard_scores_in_course(course_id, standard_id):
+    course = db.session.get(Course, course_id)
+    standard = db.session.get(Standard, standard_id)
+    if course is None or standard is None:
+        abort(404)
 
-    return resp
+    return standard_results(course, standard)
 
 
 # Student view
 # Get current results for a single student in a course.
 @bp.get("/courses/<int:course_id>/users/<int:user_id>/results/<int:standard_id>")
+@templated("standards/student-standard-scores.html")
 def get_student_results(course_id, user_id, standard_id):
     from feedbook.models import StandardAttempt
 
-    if current_user.usertype_id != 1 and current_user.id != user_id:
+    if not current_user.is_teacher and current_user.id != user_id:
         current_app.logger.info(
             f"User {current_user.id} requested results for {user_id}"
         )
@@ -504,28 +370,10 @@ def get_student_results(course_id, user_id, standard_id):
         StandardAttempt.standard_id == standard_id
     ).order_by(StandardAttempt.occurred)
 
-    template = "standards/student-standard-scores.html"
-    resp_data = {"results": results}
-    if request.htmx:
-        resp = render_template(template, **resp_data)
-    else:
-        # The sidebar is part of the template, so it needs to be rebult
-        # if the page is reloaded.
-        from feedbook.static.icons import add, admin, home, logout
-
-        resp_data["icons"] = {
-            "add": add,
-            "admin": admin,
-            "home": home,
-            "logout": logout,
-        }
-        resp = render_template(
-            "shared/layout_wrapper.html", partial=template, data=resp_data
-        )
     current_app.logger.info(
         f"User {current_user.id} accessed information for standard {standard_id}"
     )
-    return resp
+    return {"results": results}
 
 
 # Remove a standard from the course
@@ -533,7 +381,7 @@ def get_student_results(course_id, user_id, standard_id):
 @login_required
 @restricted
 def remove_standard_from_course(course_id, standard_id):
-    course = current_user.enrollments.filter(Course.id == course_id).first()
+    course = current_user.enrolled_course(course_id)
     standard = Standard.query.filter(Standard.id == standard_id).first()
 
     course.standards.remove(standard)
@@ -542,19 +390,9 @@ def remove_standard_from_course(course_id, standard_id):
     current_app.logger.info(
         f"User {current_user.id} removed {standard.name} from {course.name}"
     )
-    student_enrollments = (
-        course.enrollments.filter(User.usertype_id == 2).order_by("last_name").all()
-    )
-    for student in student_enrollments:
-        student.scores = []
-        for standard in course.standards.all():
-            user_score = standard.current_score(student.id)
-            student.scores.append({"standard_id": standard.id, "score": user_score})
 
     return render_template(
-        "course/teacher-index-htmx.html",
-        course=CourseSchema().dump(course),
-        students=student_enrollments,
+        "course/teacher-index-htmx.html", **teacher_dashboard(course)
     )
 
 
@@ -572,13 +410,18 @@ def get_assessment_form(course_id, standard_id):
 
     # Get the enrollments, alphabatized to start the loop
     enrollments = (
-        course.enrollments.filter(User.usertype_id == 2, User.active == True)
+        course.enrollments.filter(
+            User.usertype_id == user_types.id(STUDENT), User.active == True
+        )
         .order_by("last_name")
         .all()
     )
 
-    # Get all assignments to add to the assessment form
-    assignments = Assignment.query.all()
+    # Only the course's assignments, newest first. Others can be found
+    # with the search box on the form.
+    assignments = course.assignments.order_by(
+        Assignment.created_on.desc(), Assignment.id.desc()
+    ).all()
 
     return render_template(
         "standards/student-assessment-form.html",
@@ -586,4 +429,6 @@ def get_assessment_form(course_id, standard_id):
         standard_id=standard_id,
         course_id=course_id,
         assignments=assignments,
+        # Idempotency keys for this copy of the form. Saving it twice only stores the attempts once.
+        form_key=uuid4().hex,
     )
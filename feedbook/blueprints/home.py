@@ -3,6 +3,7 @@ from flask_login import current_user, login_required
 
 from feedbook.extensions import db
 from feedbook.models import Course
+from feedbook.wrappers import ICONS
 
 bp = Blueprint("home", __name__)
 
@@ -10,8 +11,5 @@ bp = Blueprint("home", __name__)
 @bp.get("/")
 @login_required
 def index():
-    from feedbook.static.icons import home, add, admin, logout
-
-    courses = current_user.enrollments.all()
-    icons = {"home": home, "add": add, "admin": admin, "logout": logout}
-    return render_template("home/index.html", courses=courses, icons=icons)
+    courses = current_user.active_courses
+    return render_template("home/index.html", courses=courses, icons=ICONS)
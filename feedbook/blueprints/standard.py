@@ -1,7 +1,7 @@
 from flask import abort, Blueprint, current_app, render_template, request
 from flask_login import current_user, login_required
 from htmx_flask import make_response
-from webargs import fields
+from webargs import fields, validate
 from webargs.flaskparser import parser
 
 from feedbook.extensions import db
@@ -61,9 +61,7 @@ def create_standard():
 
     current_app.logger.info(f"Standard {standard.id} added to Course {course.id}")
 
-    items = [
-        item for item in Standard.query.all() if item not in course.standards.all()
-    ]
+    page = course.available_standards()
 
     # The template expects a results object, so send something empty along because there is no data right now.
     results = {"proficient": 0, "not_proficient": 0}
@@ -71,8 +69,9 @@ def create_standard():
     return make_response(
         render_template(
             "shared/forms/create-standard.html",
-            items=items,
+            page=page,
             course=course,
+            course_id=course.id,
             results=results,
         ),
         trigger={"showToast": "Standard created successfully."},
@@ -82,58 +81,27 @@ def create_standard():
 # Get a single standard
 @bp.get("/standards/<int:standard_id>")
 @login_required
-def get_single_standard(standard_id):  # pragma: no cover
-    # Get all the attempts
-    # Sort by class
-    # Graph showing breakdown of average score for each course section
-    from statistics import mean
-    from feedbook.models import (
-        Assignment,
-        User,
-        user_courses,
-        assignment_standards,
-        course_assignments,
-    )
-
-    courses = Course.query.filter(Course.active == True).all()
-    results = []
-
-    for course in courses:
-        course_results = {
-            "name": course.name,
-            "assignments": [],
-        }
-        enrollments = course.enrollments.filter(User.usertype_id == 2).count()
-        standard = course.standards.filter(Standard.id == standard_id).first()
-
-        if not standard:
-            abort(404, description="No data for this standard exists.")
-
-        # get assignments for the given standard assessed in this course
+def get_single_standard(standard_id):
+    """
+    Send the cross-course report for a standard to the chart with a
+    `buildChart` trigger. Each active course aligned to the standard lists the
+    average score on every assignment aligned to it, or on every week with
+    `?by=week`.
+    """
+    from feedbook.reports import BUCKETS, MAX_AGE, standard_report
 
-        assignments = (
-            standard.assignments.join(assignment_standards)
-            .join(Assignment.courses)
-            .filter(assignment_standards.c.standard_id == standard_id, Course.active)
-            .all()
-        )
+    args = parser.parse(
+        {"by": fields.Str(validate=validate.OneOf(BUCKETS), load_default="assignment")},
+        location="query",
+    )
 
-        for assignment in assignments:
-            attempts = (
-                assignment.assessments.join(User, User.id == StandardAttempt.user_id)
-                .join(user_courses)
-                .filter(user_courses.c.course_id == course.id)
-                .all()
-            )
-            if attempts:
-                score = round(mean([attempt.score for attempt in attempts]), 2)
-            else:
-                score = 0
-            course_results["assignments"].append(
-                {"assignment": assignment.name, "avg": score}
-            )
-
-        results.append(course_results)
+    results = standard_report(
+        standard_id,
+        args["by"],
+        max_age=current_app.config.get("STANDARD_REPORT_MAX_AGE", MAX_AGE),
+    )
+    if not results:
+        abort(404, description="No data for this standard exists.")
 
     return make_response(trigger={"buildChart": results})
 
@@ -234,9 +202,10 @@ def add_standard_assessment(standard_id):
     Add a StandardAttempt record for a student
 
     Generic attempt record for a user_id on a standard_id. Can be posted from the course context or the assignment context.
+
+    An idempotency key can be sent in the form or an Idempotency-Key header. Resubmitting with the same key returns the attempt saved the first time.
     """
-    from feedbook.models import StandardAttempt, User
-    from feedbook.schemas import StandardAttemptSchema, UserSchema
+    from feedbook.attempts import add_attempt
 
     args = parser.parse(
         {
@@ -244,28 +213,33 @@ def add_standard_assessment(standard_id):
             "score": fields.Int(),
             "assignment": fields.Int(),
             "comments": fields.Str(),
+            "idempotency_key": fields.Str(
+                load_default=None, validate=validate.Length(max=64)
+            ),
         },
         location="form",
     )
 
-    sa = StandardAttempt(
+    sa, created = add_attempt(
+        key=args["idempotency_key"] or request.headers.get("Idempotency-Key"),
         user_id=args["user_id"],
         standard_id=standard_id,
         score=args["score"],
         assignment_id=args["assignment"],
         comments=args["comments"],
     )
-    db.session.add(sa)
-    db.session.commit()
 
     # If the assignment is a test, add a record on the
     # student proficiencies
-    if sa.score == 2 and sa.assessed_on.type.name == "Assessment":
-        sa.standard.add_proficient_override(sa.user)
+    if created and sa.score == 2 and sa.assessed_on.is_assessment:
+        sa.standard.add_overrides([sa.user])
         current_app.logger.info(
             "Added proficiency record on {} for {}".format(sa.standard, args["user_id"])
         )
 
+    # The attempt and any override are saved together
+    db.session.commit()
+
     return render_template(
         "standards/student-updated.html",
         record=sa,
@@ -273,6 +247,73 @@ def add_standard_assessment(standard_id):
     )
 
 
+# Add a grid of scores in one request
+@bp.post("/standards/attempts")
+@login_required
+@restricted
+def add_standard_assessments():
+    """
+    Add StandardAttempt records for many students and standards on one assignment.
+
+    The grid is sent as parallel lists, one position per cell. Blank scores are skipped. Every attempt is saved in one transaction and the changed rows are returned as out-of-band swaps.
+    """
+    from feedbook.attempts import add_attempts, parse_grid, GridError
+    from feedbook.models import Assignment
+
+    args = parser.parse(
+        {
+            "assignment": fields.Int(required=True),
+            "user_id": fields.List(fields.Int(), load_default=[]),
+            "standard_id": fields.List(fields.Int(), load_default=[]),
+            "score": fields.List(fields.Str(), load_default=[]),
+            "comments": fields.List(fields.Str(), load_default=None),
+            "idempotency_key": fields.Str(
+                load_default=None, validate=validate.Length(max=40)
+            ),
+        },
+        location="form",
+    )
+
+    assignment = db.get_or_404(Assignment, args["assignment"])
+
+    try:
+        entries = parse_grid(
+            args["user_id"], args["standard_id"], args["score"], args["comments"]
+        )
+        attempts = add_attempts(
+            assignment,
+            entries,
+            key=args["idempotency_key"] or request.headers.get("Idempotency-Key"),
+        )
+    except GridError as e:
+        return make_response(
+            "",
+            422,
+            trigger={"showToast": {"msg": str(e), "timeout": 5000, "err": True}},
+        )
+
+    current_app.logger.info(
+        f"{current_user.id} added {len(attempts)} attempts on Assignment {assignment.id}"
+    )
+
+    users = {
+        user.id: user
+        for user in User.query.filter(
+            User.id.in_({attempt.user_id for attempt in attempts})
+        )
+    }
+
+    return make_response(
+        render_template(
+            "standards/attempt-rows.html",
+            attempts=attempts,
+            assignment=assignment,
+            users=users,
+        ),
+        trigger={"showToast": f"{len(attempts)} scores saved"},
+    )
+
+
 @bp.post("/standards/<int:standard_id>/override")
 @login_required
 @restricted
@@ -302,18 +343,16 @@ def get_edit_form(standard_id, attempt_id):
     """
     Get the edit form to update a StandardAttempt record for a student.
     """
-    from feedbook.schemas import StandardListSchema
-    from feedbook.models import Assignment
+    from feedbook.dashboard import attempt_choices
 
-    standards = Standard.query.all()
-    attempt = StandardAttempt.query.filter(StandardAttempt.id == attempt_id).first()
-    assignments = Assignment.query.all()
+    attempt = db.session.get(StandardAttempt, attempt_id)
+    if attempt is None:
+        abort(404)
 
     return render_template(
         "shared/forms/edit-standard-attempt.html",
         attempt=attempt,
-        standards=standards,
-        assignments=assignments,
+        **attempt_choices(attempt, current_user),
     )
 
 
@@ -0,0 +1,92 @@
+import click
+from flask import Blueprint
+
+from feedbook.extensions import db
+
+bp = Blueprint("commands", __name__, cli_group=None)
+
+
+@bp.cli.command("rebuild-status")
+@click.option("--course", "course_id", type=int, help="Only rebuild one course.")
+def rebuild_status(course_id):
+    """
+    Rebuild the stored student standard status table.
+    """
+    from feedbook import status
+
+    if course_id:
+        count = status.rebuild_course(course_id)
+        db.session.commit()
+    else:
+        count = status.rebuild_all()
+
+    click.echo(f"Stored {count} status rows.")
+
+
+@bp.cli.command("refresh-rollup")
+def refresh_rollup():
+    """
+    Rebuild the course and standard proficiency rollup used by the admin panel.
+    """
+    from feedbook import rollup
+
+    count = rollup.rebuild_all()
+    click.echo(f"Stored {count} rollup rows.")
+
+
+@bp.cli.command("generate-district")
+@click.option("--courses", default=10, show_default=True)
+@click.option("--students", default=30, show_default=True, help="Students per course.")
+@click.option("--overlap", default=4, show_default=True, help="Courses per student.")
+@click.option("--standards", default=50, show_default=True)
+@click.option(
+    "--course-standards", default=12, show_default=True, help="Standards per course."
+)
+@click.option(
+    "--assignments", default=20, show_default=True, help="Assignments per course."
+)
+@click.option("--attempt-rate", default=0.9, show_default=True)
+@click.option("--password", help="Password for every teacher account.")
+@click.option("--seed", default=0, show_default=True)
+def generate_district(
+    courses,
+    students,
+    overlap,
+    standards,
+    course_standards,
+    assignments,
+    attempt_rate,
+    password,
+    seed,
+):
+    """
+    Fill an empty database with a generated district for load testing.
+    """
+    from time import perf_counter
+
+    from feedbook.models import User
+    from feedbook.synthetic import District, load
+
+    if db.session.scalar(db.select(User.id).limit(1)) is not None:
+        raise click.ClickException("The database already has users.")
+
+    district = District(
+        courses=courses,
+        students_per_course=students,
+        courses_per_student=overlap,
+        standards=standards,
+        standards_per_course=course_standards,
+        assignments_per_course=assignments,
+        attempt_rate=attempt_rate,
+        password=password,
+        seed=seed,
+    )
+    click.echo(f"Generating about {district.expected_attempts} attempts...")
+
+    start = perf_counter()
+    with db.engine.begin() as connection:
+        counts = load(connection, district)
+
+    for table, count in counts.items():
+        click.echo(f"{table}: {count}")
+    click.echo(f"Loaded in {perf_counter() - start:.1f}s.")
@@ -0,0 +1,331 @@
+"""
+View models for the teacher course dashboard and the assignment and student
+pages it links to.
+
+The dashboard used to walk its relationships while rendering: the standards,
+the assignments (sorted in Jinja) and each assignment's alignments were
+loaded row by row, so the page slowed down as a section grew. Here
+everything the template shows is read up front with a fixed number of
+queries: the roster, the standards, proficiency counts, the assignments,
+their averages and their alignments. The template only loops over the
+results.
+"""
+
+from collections import defaultdict, namedtuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import joinedload
+
+from feedbook.aggregates import assignment_averages
+from feedbook.extensions import db
+from feedbook.lookups import STUDENT, user_types
+from feedbook.models import (
+    _ids,
+    assignment_standards,
+    course_assignments,
+    course_standards,
+    user_courses,
+    Assignment,
+    Standard,
+    StandardAttempt,
+    User,
+)
+from feedbook.proficiency import ProficiencyEngine
+from feedbook.status import load_statuses, proficiency_counts
+
+# An assignment with its Average (or None) and aligned standards
+AssignmentRow = namedtuple("AssignmentRow", ["assignment", "average", "alignments"])
+
+# A student on the assignment detail with their attempts as {standard_id: attempt}
+StudentRow = namedtuple("StudentRow", ["user", "attempts"])
+
+
+def alignments(assignments) -> dict:
+    """
+    Get the standards aligned to each assignment as {assignment_id: [Standard]}
+    with a single join.
+    """
+    assignment_ids = _ids(assignments)
+    if not assignment_ids:
+        return {}
+
+    rows = db.session.execute(
+        select(assignment_standards.c.assignment_id, Standard)
+        .join(Standard, Standard.id == assignment_standards.c.standard_id)
+        .where(assignment_standards.c.assignment_id.in_(assignment_ids))
+        .order_by(assignment_standards.c.assignment_id, Standard.id)
+    )
+
+    aligned = defaultdict(list)
+    for assignment_id, standard in rows:
+        aligned[assignment_id].append(standard)
+    return aligned
+
+
+def teacher_dashboard(course) -> dict:
+    """
+    Build the template context for the teacher course dashboard.
+
+    - enrollments: active students, by last name
+    - standards: active standards in the course
+    - results: proficiency counts keyed by "standard_<id>"
+    - assignments: an AssignmentRow for each assignment, newest first
+    """
+    enrollments = (
+        course.enrollments.filter(
+            User.usertype_id == user_types.id(STUDENT), User.active
+        )
+        .order_by(User.last_name)
+        .all()
+    )
+    standards = course.standards.filter(Standard.active).all()
+    counts = proficiency_counts(course, enrollments, standards)
+
+    assignments = course.assignments.order_by(
+        Assignment.created_on.desc(), Assignment.id
+    ).all()
+    averages = assignment_averages(course, assignments)
+    aligned = alignments(assignments)
+
+    return {
+        "course": course,
+        "enrollments": enrollments,
+        "standards": standards,
+        "results": {
+            f"standard_{standard_id}": result for standard_id, result in counts.items()
+        },
+        "assignments": [
+            AssignmentRow(
+                assignment,
+                averages.get(assignment.id),
+                aligned.get(assignment.id, []),
+            )
+            for assignment in assignments
+        ],
+    }
+
+
+def assignment_detail(course, assignment) -> dict:
+    """
+    Build the template context for an assignment in a course.
+
+    - alignments: standards aligned to the assignment
+    - results: a StudentRow for each active student, by name. Students with
+      more than one attempt on a standard show the first.
+
+    The attempts come from one query, limited to students in the course and
+    grouped by student in a dict.
+    """
+    students = (
+        course.enrollments.filter(
+            User.usertype_id == user_types.id(STUDENT), User.active
+        )
+        .order_by(User.last_name, User.first_name)
+        .all()
+    )
+
+    attempts = db.session.scalars(
+        select(StandardAttempt)
+        .join(
+            user_courses,
+            and_(
+                user_courses.c.user_id == StandardAttempt.user_id,
+                user_courses.c.course_id == course.id,
+            ),
+        )
+        .where(StandardAttempt.assignment_id == assignment.id)
+        .order_by(StandardAttempt.occurred, StandardAttempt.id)
+    )
+    grouped = defaultdict(dict)
+    for attempt in attempts:
+        grouped[attempt.user_id].setdefault(attempt.standard_id, attempt)
+
+    return {
+        "assignment": assignment,
+        "course_id": course.id,
+        "alignments": assignment.alignments.all(),
+        "results": [
+            StudentRow(student, grouped.get(student.id, {})) for student in students
+        ],
+    }
+
+
+def student_report(course, user) -> dict:
+    """
+    Build the template context for one student in a course.
+
+    - standards: every standard the student has attempts on, keyed by name,
+      with its id, whether the student is proficient and their attempts
+    - enrollments: active students in the course, by last name
+
+    Attempts are read with their standard and assignment in one joined query.
+    Proficiency is worked out once per standard by a ProficiencyEngine for
+    the course rather than by `Standard.is_proficient` for every attempt.
+    """
+    attempts = db.session.scalars(
+        select(StandardAttempt)
+        .options(
+            joinedload(StandardAttempt.standard),
+            joinedload(StandardAttempt.assessed_on),
+        )
+        .where(StandardAttempt.user_id == user.id)
+        .order_by(StandardAttempt.occurred, StandardAttempt.id)
+    ).all()
+
+    engine = ProficiencyEngine(
+        course, [user.id], {attempt.standard_id for attempt in attempts}
+    )
+
+    standards = {}
+    for attempt in attempts:
+        standard = attempt.standard
+        entry = standards.setdefault(
+            standard.name,
+            {
+                "id": standard.id,
+                "is_proficient": engine.is_proficient(user.id, standard.id),
+                "assessments": [],
+            },
+        )
+        entry["assessments"].append(
+            {
+                "assignment": attempt.assessed_on,
+                "score": attempt.score,
+                "occurred": attempt.occurred,
+                "comments": attempt.comments,
+            }
+        )
+
+    enrollments = (
+        course.enrollments.filter(
+            User.usertype_id == user_types.id(STUDENT), User.active
+        )
+        .order_by(User.last_name)
+        .all()
+    )
+
+    return {
+        "user": user,
+        "course": course,
+        "standards": standards,
+        "enrollments": enrollments,
+    }
+
+
+def standard_results(course, standard) -> dict:
+    """
+    Build the template context for the results table of one standard in a
+    course.
+
+    - students: a dict for each active student, by last name, with their
+      attempts on the standard (oldest first) and whether they are proficient
+
+    The attempts come from one query, limited to students in the course and
+    grouped by student in memory. Proficiency is read from the stored
+    statuses for the whole roster at once.
+    """
+    students = (
+        course.enrollments.filter(
+            User.usertype_id == user_types.id(STUDENT), User.active
+        )
+        .order_by(User.last_name)
+        .all()
+    )
+    statuses = load_statuses(course, students, [standard])
+
+    attempts = db.session.scalars(
+        select(StandardAttempt)
+        .options(joinedload(StandardAttempt.assessed_on))
+        .join(
+            user_courses,
+            and_(
+                user_courses.c.user_id == StandardAttempt.user_id,
+                user_courses.c.course_id == course.id,
+            ),
+        )
+        .where(StandardAttempt.standard_id == standard.id)
+        .order_by(StandardAttempt.occurred, StandardAttempt.id)
+    )
+    grouped = defaultdict(list)
+    for attempt in attempts:
+        grouped[attempt.user_id].append(attempt)
+
+    return {
+        "course_id": course.id,
+        "standard": standard,
+        "students": [
+            {
+                "last_name": student.last_name,
+                "first_name": student.first_name,
+                "id": student.id,
+                "scores": grouped.get(student.id, []),
+                "is_proficient": statuses[(student.id, standard.id)].proficient,
+            }
+            for student in students
+        ],
+    }
+
+
+def _shared_courses(attempt, teacher):
+    """
+    Select the ids of the courses shared by the attempt's student and the teacher.
+    """
+    return (
+        select(user_courses.c.course_id)
+        .where(user_courses.c.user_id == attempt.user_id)
+        .intersect(
+            select(user_courses.c.course_id).where(user_courses.c.user_id == teacher.id)
+        )
+    )
+
+
+def attempt_assignments(attempt, teacher, shared=None) -> list:
+    """
+    Get the assignments from courses shared by the student and the teacher, by
+    name, along with the attempt's own assignment.
+    """
+    if shared is None:
+        shared = _shared_courses(attempt, teacher)
+
+    return db.session.scalars(
+        select(Assignment)
+        .outerjoin(
+            course_assignments,
+            course_assignments.c.assignment_id == Assignment.id,
+        )
+        .where(
+            or_(
+                course_assignments.c.course_id.in_(shared),
+                Assignment.id == attempt.assignment_id,
+            )
+        )
+        .distinct()
+        .order_by(Assignment.name, Assignment.id)
+    ).all()
+
+
+def attempt_choices(attempt, teacher) -> dict:
+    """
+    Build the assignment and standard options for editing an attempt.
+
+    Only assignments and standards from courses shared by the student and the
+    teacher are listed, by name, along with the attempt's own assignment and
+    standard. Other assignments can be found with `/assignments/search`.
+    """
+    shared = _shared_courses(attempt, teacher)
+    assignments = attempt_assignments(attempt, teacher, shared)
+
+    standards = db.session.scalars(
+        select(Standard)
+        .outerjoin(course_standards, course_standards.c.standard_id == Standard.id)
+        .where(
+            or_(
+                course_standards.c.course_id.in_(shared),
+                Standard.id == attempt.standard_id,
+            )
+        )
+        .distinct()
+        .order_by(Standard.name, Standard.id)
+    ).all()
+
+    return {"assignments": assignments, "standards": standards}
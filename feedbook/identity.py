@@ -0,0 +1,184 @@
+"""
+Cached identities for Flask-Login.
+
+`load_user` used to read the user on every request, and full page renders
+read `current_user.enrollments` twice more for the sidebar. The user's
+identity, type and course links rarely change, so they are kept for a short
+time (`USER_CACHE_TTL` seconds, 60 by default) in a per-worker cache and
+`current_user` is a `CachedUser` built from it.
+
+Anything else on `current_user` (`assessments`, `enroll`, ...) loads the
+`User` row on first use, once per request.
+
+Entries are dropped when a session commits a change to the user or their
+enrollments. Renaming, archiving or deleting a course drops every entry.
+Code which writes users or enrollments with Core statements calls `forget`.
+Other workers keep their copy until it expires.
+"""
+
+import time
+from collections import namedtuple
+
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from feedbook.extensions import db
+from feedbook.lookups import STUDENT, TEACHER, user_types
+from feedbook.models import user_courses, Course, User
+
+# Seconds a cached identity is used before it is read again
+USER_CACHE_TTL = 60
+
+# A course the user is enrolled in, for the sidebar
+CourseLink = namedtuple("CourseLink", ["id", "name", "active"])
+
+# Columns copied from the user row
+FIELDS = ("id", "first_name", "last_name", "email", "usertype_id", "active")
+
+
+class CachedUser(UserMixin):
+    """
+    The signed in user, built from the cache. Other attributes are read
+    from the `User` row, loaded the first time one is needed.
+    """
+
+    def __init__(self, entry):
+        self.__dict__.update(entry)
+        self._user = None
+
+    @property
+    def user(self):
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return self._user
+
+    def __getattr__(self, name):
+        # Only called for attributes which aren't cached
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    @property
+    def is_teacher(self):
+        return self.usertype_id == user_types.id(TEACHER)
+
+    @property
+    def is_student(self):
+        return self.usertype_id == user_types.id(STUDENT)
+
+    @property
+    def active_courses(self) -> list:
+        return [course for course in self.courses if course.active]
+
+    def enrolled_course(self, course_id):
+        """
+        Get a course the user is enrolled in, or None without a query when
+        they aren't.
+        """
+        if not any(course.id == course_id for course in self.courses):
+            return None
+        return db.session.get(Course, course_id)
+
+
+def _cache() -> dict:
+    return current_app.extensions.setdefault("identities", {})
+
+
+def _read(user_id):
+    user = db.session.execute(
+        select(*[getattr(User, field) for field in FIELDS]).where(User.id == user_id)
+    ).first()
+    if user is None:
+        return None
+
+    courses = [
+        CourseLink(*row)
+        for row in db.session.execute(
+            select(Course.id, Course.name, Course.active)
+            .join(user_courses, user_courses.c.course_id == Course.id)
+            .where(user_courses.c.user_id == user_id)
+            .order_by(user_courses.c.id)
+        )
+    ]
+    return dict(user._mapping, courses=courses)
+
+
+def load(user_id):
+    """
+    Get a CachedUser for an id, or None if there is no such user.
+    """
+    cache = _cache()
+    ttl = current_app.config.get("USER_CACHE_TTL", USER_CACHE_TTL)
+
+    cached = cache.get(user_id)
+    if cached is None or cached[0] < time.monotonic():
+        entry = _read(user_id)
+        if entry is None:
+            cache.pop(user_id, None)
+            return None
+        cached = (time.monotonic() + ttl, entry)
+        cache[user_id] = cached
+
+    return CachedUser(cached[1])
+
+
+def forget(user_ids=(), everyone=False):
+    """
+    Drop cached identities once the current transaction commits.
+    """
+    session = db.session()
+    if everyone:
+        session.info["identities_everyone"] = True
+    session.info.setdefault("identities_stale", set()).update(user_ids)
+
+
+# Session hooks
+# Note which users changed while flushing and drop them once the transaction
+# commits.
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    for obj in [*session.new, *session.dirty, *session.deleted]:
+        if isinstance(obj, User) and obj.id is not None:
+            session.info.setdefault("identities_stale", set()).add(obj.id)
+        elif isinstance(obj, Course) and obj in session.deleted:
+            session.info["identities_everyone"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _clear_changed(session):
+    stale = session.info.pop("identities_stale", set())
+    everyone = session.info.pop("identities_everyone", False)
+    if not has_app_context() or not (stale or everyone):
+        return
+
+    cache = _cache()
+    if everyone:
+        cache.clear()
+    for user_id in stale:
+        cache.pop(user_id, None)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changes(session):
+    session.info.pop("identities_stale", None)
+    session.info.pop("identities_everyone", None)
+
+
+@event.listens_for(User.enrollments, "append")
+@event.listens_for(User.enrollments, "remove")
+def _enrollments_changed(user, course, initiator):
+    if user.id is not None:
+        session = Session.object_session(user) or db.session()
+        session.info.setdefault("identities_stale", set()).add(user.id)
+
+
+@event.listens_for(Course.name, "set")
+@event.listens_for(Course.active, "set")
+def _course_changed(course, value, oldvalue, initiator):
+    if course.id is not None and value != oldvalue:
+        session = Session.object_session(course) or db.session()
+        session.info["identities_everyone"] = True
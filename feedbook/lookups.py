@@ -0,0 +1,135 @@
+"""
+Cached lookups for the `user_type` and `assignment_type` tables.
+
+Both tables hold a couple of rows which almost never change, but the code
+compared against hardcoded ids (`usertype_id == 2`) or lazily loaded a row just
+to read its name. A `Lookup` reads its table once per app, when the app starts,
+and resolves names to ids and back from memory:
+
+    user_types.id(STUDENT)
+    assignment_types.name(assignment.assignmenttype_id)
+
+If the tables don't exist yet at startup (before `flask db upgrade`, or in
+tests) they are read on first use instead. The cache is dropped when a session
+commits a change to either table, and the next lookup reads it again. Other
+processes keep their copy until they restart.
+
+Names missing from the table resolve to the ids the app has always been
+seeded with, so a database without the rows behaves as it did before.
+"""
+
+from collections import namedtuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+
+from feedbook.extensions import db
+from feedbook.models import AssignmentType, UserType
+
+TEACHER = "Teacher"
+STUDENT = "Student"
+
+CLASSWORK = "Classwork"
+ASSESSMENT = "Assessment"
+
+# A row from a lookup table
+Row = namedtuple("Row", ["id", "name"])
+
+
+class Lookup(object):
+    """
+    Name and id resolution for one lookup table, cached per app.
+    """
+
+    def __init__(self, model, defaults):
+        self.model = model
+        self.defaults = dict(defaults)
+        self.key = model.__table__.name
+
+    def _cache(self) -> dict:
+        cache = current_app.extensions.setdefault("lookups", {})
+        if self.key not in cache:
+            rows = [
+                Row(*row)
+                for row in db.session.execute(
+                    select(self.model.id, self.model.name).order_by(self.model.id)
+                )
+            ]
+            ids = dict(self.defaults)
+            ids.update({row.name: row.id for row in rows})
+            cache[self.key] = {
+                "rows": rows,
+                "ids": ids,
+                "names": {id: name for name, id in ids.items()},
+            }
+        return cache[self.key]
+
+    def id(self, name) -> int:
+        """Get the id for a name. Raises KeyError for unknown names."""
+        return self._cache()["ids"][name]
+
+    def name(self, id) -> str:
+        """Get the name for an id, or None."""
+        return self._cache()["names"].get(id)
+
+    def all(self) -> list:
+        """Every row stored in the table as a Row, by id."""
+        return self._cache()["rows"]
+
+    def clear(self):
+        if has_app_context():
+            current_app.extensions.get("lookups", {}).pop(self.key, None)
+
+
+user_types = Lookup(UserType, {TEACHER: 1, STUDENT: 2})
+assignment_types = Lookup(AssignmentType, {CLASSWORK: 1, ASSESSMENT: 2})
+
+_lookups = {lookup.model: lookup for lookup in (user_types, assignment_types)}
+
+
+def load():
+    """Read every lookup table into the cache for the current app."""
+    for lookup in _lookups.values():
+        lookup.all()
+
+
+def init_app(app):
+    # Templates resolve type ids with the same registry
+    app.jinja_env.globals.update(
+        user_types=user_types, assignment_types=assignment_types
+    )
+
+    with app.app_context():
+        try:
+            load()
+        except (OperationalError, ProgrammingError):
+            # The tables haven't been created, so load them on first use
+            db.session.rollback()
+
+
+# Session hooks
+# Note which tables changed while flushing and drop their cache once the
+# transaction commits.
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    for obj in [*session.new, *session.dirty, *session.deleted]:
+        lookup = _lookups.get(type(obj))
+        if lookup is not None:
+            session.info.setdefault("lookups_changed", set()).add(lookup.key)
+
+
+@event.listens_for(Session, "after_commit")
+def _clear_changed(session):
+    changed = session.info.pop("lookups_changed", set())
+    for lookup in _lookups.values():
+        if lookup.key in changed:
+            lookup.clear()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changes(session):
+    session.info.pop("lookups_changed", None)
@@ -1,7 +1,9 @@
+import sys
 from collections import Counter
-from statistics import mean
 
 from flask_login import UserMixin
+from sqlalchemy import exists, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import backref
 from sqlalchemy.sql import func
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -9,9 +11,18 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from feedbook.extensions import db, login_manager
 
 
+# Page size for lists of standards to import into a course
+STANDARDS_PER_PAGE = 50
+
+# Page size for assignment search results on the assessment forms
+ASSIGNMENTS_PER_PAGE = 50
+
+
 @login_manager.user_loader
 def load_user(id):  # pragma: no cover
-    return db.session.get(User, int(id))
+    from feedbook import identity
+
+    return identity.load(int(id))
 
 
 class AssignmentType(db.Model):
@@ -20,6 +31,18 @@ class AssignmentType(db.Model):
 
 
 class Assignment(db.Model):
+    # See the index plan above the association tables. PostgreSQL builds the
+    # index with the "C" collation so range scans compare code points, like
+    # SQLite's default BINARY collation.
+    __table_args__ = (
+        db.Index("ix_assignment_lower_name", db.text("lower(name)")).ddl_if(
+            callable_=lambda ddl, target, bind, **kw: kw["dialect"].name != "postgresql"
+        ),
+        db.Index("ix_assignment_lower_name", db.text('lower(name) COLLATE "C"')).ddl_if(
+            dialect="postgresql"
+        ),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(64), nullable=False)
     assignmenttype_id = db.Column(db.ForeignKey("assignment_type.id"))
@@ -41,45 +64,73 @@ class Assignment(db.Model):
         lazy="dynamic",
     )
 
+    # Assignments with names starting with `search`, ignoring case, by name. Returns a page of results.
+    @classmethod
+    def search(cls, search, page=1, per_page=ASSIGNMENTS_PER_PAGE):
+        dialect = db.session.get_bind().dialect.name
+        query = cls.search_query(search, dialect)
+        return db.paginate(query, page=page, per_page=per_page, error_out=False)
+
+    # The prefix is matched as a range on lower(name), ordered the same way, so the lower(name) index finds and orders the page without scanning the table. The range ends before the prefix with its last character bumped by one, which is exact when strings compare by code point. SQLite does that by default, and PostgreSQL does with the "C" collation the index is built with.
+    @classmethod
+    def search_query(cls, search, dialect):
+        prefix = search.lower()
+        name = func.lower(cls.name)
+        if dialect == "postgresql":
+            name = name.collate("C")
+
+        query = select(cls).order_by(name, cls.id)
+        if prefix:
+            query = query.where(name >= prefix)
+            if ord(prefix[-1]) < sys.maxunicode:
+                query = query.where(name < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+        return query
+
     # Get the average score for an assignment
     # This returns the average for all classes regardless of when it happened. This will be helpful for looking at assignments across all classes and lay a foundation for an eventual `assignment_type` key.
     #
     # Note that this is a straight average, not the weighted average used to calculate student performance.
+    #
+    # Use `feedbook.aggregates.assignment_averages` to get averages for many
+    # assignments at once.
     def average_all(self):
-        scores = self.assessments.all()
-        return round(mean([item.score for item in scores]), 2)
+        from feedbook.aggregates import assignment_averages
+
+        result = assignment_averages(assignments=[self]).get(self.id)
+        return result.average if result else None
 
     # Get the average score for students in a course
-    # Use the StandardAttempt table as the leftmost join to filter down against the other conditions. Since the attempts do not matter which course they're in, just the user, you need to filter against the user_courses table to get only the desired course.
-    # Only return values for students with the given course.id AND attempts for the assignment with the matching ID.
+    # Only attempts from students enrolled in the course are counted. The average is calculated in SQL by `feedbook.aggregates`, which can also return every assignment in the course in one query.
     def course_average(self, course):
-        course_attempts = (
-            StandardAttempt.query.join(User)
-            .join(user_courses)
-            .filter(
-                (user_courses.c.course_id == course.id)
-                & (StandardAttempt.assignment_id == self.id)
-            )
-        ).all()
-        if course_attempts:
-            return round(mean([attempt.score for attempt in course_attempts]), 2)
-        else:
-            return None
+        from feedbook.aggregates import assignment_averages
+
+        result = assignment_averages(course, [self]).get(self.id)
+        return result.average if result else None
+
+    # Assessments count toward proficiency differently than classwork. The type id is resolved from the cached lookup so the type row isn't loaded.
+    @property
+    def is_assessment(self):
+        from feedbook.lookups import ASSESSMENT, assignment_types
+
+        return self.assignmenttype_id == assignment_types.id(ASSESSMENT)
 
     # Align the assignment to learning standards. Multiple can be added and assessed at the same time.
     def add_standard(self, standard):
-        if not self._has_standard(standard):
-            self.alignments.append(standard)
-            db.session.commit()
+        self.add_standards([standard])
+        db.session.commit()
         return self
 
-    def _has_standard(self, standard):
-        return (
-            self.alignments.filter(
-                assignment_standards.c.standard_id == standard.id
-            ).count()
-            > 0
+    # Align many standards (or ids) in one statement. Existing alignments are skipped. Returns the number of new alignments and does not commit.
+    def add_standards(self, standards):
+        added = _add_pairs(
+            assignment_standards, "assignment_id", self, "standard_id", standards
         )
+        if added:
+            from feedbook import status
+
+            # Alignments change which standards have an assessment
+            status.invalidate(standard_ids=_ids(standards))
+        return added
 
     def update(self, data):
         for key, value in data.items():
@@ -111,29 +162,62 @@ class Course(db.Model):
     )
 
     def add_assignment(self, assignment):
-        if not self._has_assignment(assignment):
-            self.assignments.append(assignment)
+        self.add_assignments([assignment])
         return self
 
-    def _has_assignment(self, assignment):
-        return (
-            self.assignments.filter(
-                course_assignments.c.assignment_id == assignment.id
-            ).count()
-            > 0
+    # Add many assignments (or ids) in one statement. Existing ones are skipped. Returns the number of new rows and does not commit.
+    def add_assignments(self, assignments):
+        added = _add_pairs(
+            course_assignments, "course_id", self, "assignment_id", assignments
         )
+        if added:
+            from feedbook import status
+
+            status.invalidate(course_ids=[self.id])
+        return added
 
     # safely align a standard to a course
     def align(self, standard):
-        if not self._is_aligned(standard):
-            self.standards.append(standard)
+        self.align_many([standard])
         return self
 
-    def _is_aligned(self, standard):
-        return (
-            self.standards.filter(course_standards.c.standard_id == standard.id).count()
-            > 0
+    # Align many standards (or ids) in one statement. Existing alignments are skipped. Returns the number of new alignments and does not commit.
+    def align_many(self, standards):
+        added = _add_pairs(
+            course_standards, "course_id", self, "standard_id", standards
+        )
+        if added:
+            from feedbook import status
+
+            # Rows for the standard may have missed attempts while it was
+            # removed from the course
+            status.invalidate(course_ids=[self.id])
+        return added
+
+    # Enroll many users (or ids) in one statement. Existing enrollments are skipped. Returns the number of new enrollments and does not commit.
+    def enroll_many(self, users):
+        added = _add_pairs(user_courses, "course_id", self, "user_id", users)
+        if added:
+            from feedbook import identity, status
+
+            status.invalidate(course_ids=[self.id])
+            identity.forget(_ids(users))
+        return added
+
+    # Active standards which are not aligned to the course, by name. An anti-join finds them in the database instead of checking each standard against the course. `search` limits them to names starting with it. Returns a page of results.
+    def available_standards(self, search=None, page=1, per_page=STANDARDS_PER_PAGE):
+        aligned = exists().where(
+            course_standards.c.course_id == self.id,
+            course_standards.c.standard_id == Standard.id,
         )
+        query = (
+            select(Standard)
+            .where(Standard.active, ~aligned)
+            .order_by(Standard.name, Standard.id)
+        )
+        if search:
+            query = query.where(Standard.name.istartswith(search, autoescape=True))
+        return db.paginate(query, page=page, per_page=per_page, error_out=False)
 
     def update(self, data):
         for key, value in data.items():
@@ -191,10 +275,12 @@ class Standard(db.Model):
         #     Assignment.assignmenttype_id == 2
         # ).all()
 
+        from feedbook.lookups import ASSESSMENT, assignment_types
+
         query = (
             self.attempts.join(Assignment)
             .filter(
-                Assignment.assignmenttype_id == 2,
+                Assignment.assignmenttype_id == assignment_types.id(ASSESSMENT),
                 StandardAttempt.score == 2,
                 StandardAttempt.user_id == user.id,
             )
@@ -209,8 +295,7 @@ class Standard(db.Model):
             return False
 
     def add_proficient_override(self, user):
-        if not self._has_proficient_override(user):
-            self.students.append(user)
+        if self.add_overrides([user]):
             db.session.commit()
         else:
             return (
@@ -227,6 +312,15 @@ class Standard(db.Model):
             200,
         )
 
+    # Add overrides for many users (or ids) in one statement. Existing overrides are skipped. Returns the number of new overrides and does not commit. Pass `refresh=False` when the caller refreshes the student statuses itself.
+    def add_overrides(self, users, refresh=True):
+        added = _add_pairs(user_standards, "standard_id", self, "user_id", users)
+        if added and refresh:
+            from feedbook import status
+
+            status.refresh([(user_id, self.id) for user_id in _ids(users)])
+        return added
+
     def is_proficient(self, user) -> bool:
         """
         Determine if a user is showing mastery on a standard.
@@ -239,11 +333,13 @@ class Standard(db.Model):
             - If an override is present, then True
             - More 2's than 1's or 0's in the assessment objects AND a true assessment, otherwise false
         """
+        from feedbook.lookups import ASSESSMENT, assignment_types
+
         # Check for assessments attached to the given standard for the user's course
         assessment_present = (
             self.assignments.join(course_assignments)
             .filter(
-                (Assignment.assignmenttype_id == 2)
+                (Assignment.assignmenttype_id == assignment_types.id(ASSESSMENT))
                 & (course_assignments.c.course_id == user.enrollments.all()[0].id)
             )
             .all()
@@ -295,29 +391,17 @@ class Standard(db.Model):
         Returns:
             float: average
         """
-        scores = self._get_scores(user.id)
-        if len(scores) == 0:
-            return None
-        else:
-            return (max(scores) + scores[-1]) / 2
+        from feedbook.scoring import current_scores
+
+        return current_scores(users=[user], standards=[self]).get((user.id, self.id))
 
     # Get the average score for students in a course
-    # Use the StandardAttempt table as the leftmost join to filter down against the other conditions. Since the attempts do not matter which course they're in, just the user, you need to filter against the user_courses table to get only the desired course.
-    # Only return values for students with the given course.id AND attempts for the assignment with the matching ID.
+    # Only attempts from students enrolled in the course are counted. See `feedbook.aggregates.standard_averages` for every standard in one query.
     def course_average(self, course_id):
-        course_attempts = (
-            StandardAttempt.query.join(User, StandardAttempt.user_id == User.id)
-            .join(user_courses)
-            .filter(
-                (user_courses.c.course_id == course_id)
-                & (StandardAttempt.standard_id == self.id)
-            )
-            .all()
-        )
-        if course_attempts:
-            return round(mean([attempt.score for attempt in course_attempts]), 2)
-        else:
-            return None
+        from feedbook.aggregates import standard_averages
+
+        result = standard_averages(course_id, [self]).get(self.id)
+        return result.average if result else None
 
     def update(self, data):
         for key, value in data.items():
@@ -326,6 +410,21 @@ class Standard(db.Model):
 
 
 class StandardAttempt(db.Model):
+    # See the index plan above the association tables for the queries each
+    # index serves.
+    __table_args__ = (
+        db.Index(
+            "ix_standard_attempt_user_standard_occurred",
+            "user_id",
+            "standard_id",
+            "occurred",
+        ),
+        db.Index(
+            "ix_standard_attempt_standard_assignment", "standard_id", "assignment_id"
+        ),
+        db.Index("ix_standard_attempt_assignment_id", "assignment_id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(
         db.ForeignKey("user.id", onupdate="CASCADE", ondelete="CASCADE")
@@ -338,6 +437,8 @@ class StandardAttempt(db.Model):
     assignment = db.Column(db.String(32))
     assignment_id = db.Column(db.ForeignKey("assignment.id"))
     comments = db.Column(db.String(1000))
+    # Sent by the score forms so a resubmitted attempt is only stored once
+    idempotency_key = db.Column(db.String(64), unique=True, index=True)
 
     def update(self, data):
         for key, value in data.items():
@@ -345,6 +446,122 @@ class StandardAttempt(db.Model):
         db.session.commit()
 
 
+class StudentStandardStatus(db.Model):
+    """
+    Stored proficiency for a student on a standard in a single course.
+
+    Rows are kept current by `feedbook.status` whenever attempts or overrides
+    are written so dashboards can read mastery without recalculating it from
+    every StandardAttempt. Use `flask rebuild-status` to rebuild the table.
+    """
+
+    __tablename__ = "student_standard_status"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "user_id",
+            "standard_id",
+            "course_id",
+            name="uq_student_standard_status_user_standard_course",
+        ),
+        db.Index(
+            "ix_student_standard_status_course_standard", "course_id", "standard_id"
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(
+        db.ForeignKey("user.id", onupdate="CASCADE", ondelete="CASCADE"),
+        nullable=False,
+    )
+    standard_id = db.Column(
+        db.ForeignKey("standard.id", onupdate="CASCADE", ondelete="CASCADE"),
+        nullable=False,
+    )
+    course_id = db.Column(
+        db.ForeignKey("course.id", onupdate="CASCADE", ondelete="CASCADE"),
+        nullable=False,
+    )
+    count_0 = db.Column(db.Integer, default=0)
+    count_1 = db.Column(db.Integer, default=0)
+    count_2 = db.Column(db.Integer, default=0)
+    max_score = db.Column(db.Integer)
+    last_score = db.Column(db.Integer)
+    has_assessment_pass = db.Column(db.Boolean, default=False)
+    has_override = db.Column(db.Boolean, default=False)
+    proficient = db.Column(db.Boolean, default=False)
+    updated_at = db.Column(
+        db.DateTime(timezone=True), default=func.now(), onupdate=func.now()
+    )
+
+    @property
+    def current_score(self):
+        """Same calculation as `Standard.current_score` from the stored values."""
+        if self.max_score is None:
+            return None
+        return (self.max_score + self.last_score) / 2
+
+
+class CourseStandardRollup(db.Model):
+    """
+    Number of active students and how many are proficient on each active
+    standard in a course, for the admin panel.
+
+    Every built course also has a row without a standard holding its roster
+    size, so a course without standards still counts as built. Rows are
+    deleted by `feedbook.rollup` whenever a course's statuses, roster or
+    standards change and rebuilt the next time they are read. Use
+    `flask refresh-rollup` to rebuild the table.
+    """
+
+    __tablename__ = "course_standard_rollup"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "course_id",
+            "standard_id",
+            name="uq_course_standard_rollup_course_standard",
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(
+        db.ForeignKey("course.id", onupdate="CASCADE", ondelete="CASCADE"),
+        nullable=False,
+    )
+    standard_id = db.Column(
+        db.ForeignKey("standard.id", onupdate="CASCADE", ondelete="CASCADE"),
+        nullable=True,
+    )
+    students = db.Column(db.Integer, default=0)
+    proficient = db.Column(db.Integer, default=0)
+    updated_at = db.Column(
+        db.DateTime(timezone=True), default=func.now(), onupdate=func.now()
+    )
+
+
+class StandardReport(db.Model):
+    """
+    Cached cross-course report for a standard as JSON, one row for each way
+    of grouping it. Rows are deleted by `feedbook.reports` when attempts on
+    the standard change and rebuilt the next time they are read.
+    """
+
+    __tablename__ = "standard_report"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "standard_id", "bucket", name="uq_standard_report_standard_bucket"
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    standard_id = db.Column(
+        db.ForeignKey("standard.id", onupdate="CASCADE", ondelete="CASCADE"),
+        nullable=False,
+    )
+    bucket = db.Column(db.String(16), nullable=False)
+    data = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     last_name = db.Column(db.String(32), nullable=False)
@@ -376,8 +593,7 @@ class User(UserMixin, db.Model):
     )
 
     def enroll(self, course):
-        if not self.is_enrolled(course):
-            self.enrollments.append(course)
+        if course.enroll_many([self]):
             db.session.commit()
         else:
             raise Exception(
@@ -398,6 +614,26 @@ class User(UserMixin, db.Model):
             self.enrollments.filter(user_courses.c.course_id == course.id).count() > 0
         )
 
+    # Active courses for the sidebar. `feedbook.identity.CachedUser` has the same helpers without queries.
+    @property
+    def active_courses(self):
+        return self.enrollments.filter(Course.active).all()
+
+    def enrolled_course(self, course_id):
+        return self.enrollments.filter(Course.id == course_id).first()
+
+    @property
+    def is_teacher(self):
+        from feedbook.lookups import TEACHER, user_types
+
+        return self.usertype_id == user_types.id(TEACHER)
+
+    @property
+    def is_student(self):
+        from feedbook.lookups import STUDENT, user_types
+
+        return self.usertype_id == user_types.id(STUDENT)
+
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
         db.session.commit()
@@ -411,6 +647,94 @@ class UserType(db.Model):
     name = db.Column(db.String(32))
 
 
+def _ids(items):
+    """Accept model instances or plain ids and return a list of ids."""
+    return [getattr(item, "id", item) for item in items]
+
+
+def _add_pairs(table, column, owner, other_column, others) -> int:
+    """
+    Insert rows pairing `owner` with each of `others` (models or ids) into an
+    association table in a single statement and return how many were added.
+
+    Pairs that already exist are skipped by the database with
+    ON CONFLICT DO NOTHING against the table's unique pair, so two requests
+    adding the same row at once can't create a duplicate. Other dialects fall
+    back to filtering out existing pairs first.
+
+    New models are added to the session and flushed so they have ids, like
+    appending to the relationship would. Does not commit.
+    """
+    others = list(others)
+    db.session.add_all(
+        [owner] + [other for other in others if isinstance(other, db.Model)]
+    )
+    db.session.flush()
+    other_ids = sorted(set(_ids(others)))
+    if not other_ids:
+        return 0
+
+    rows = [{column: owner.id, other_column: other_id} for other_id in other_ids]
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == "sqlite":
+        stmt = sqlite.insert(table).values(rows).on_conflict_do_nothing()
+    elif dialect == "postgresql":
+        stmt = postgresql.insert(table).values(rows).on_conflict_do_nothing()
+    else:
+        existing = set(
+            db.session.scalars(
+                select(table.c[other_column]).where(
+                    table.c[column] == owner.id, table.c[other_column].in_(other_ids)
+                )
+            )
+        )
+        rows = [row for row in rows if row[other_column] not in existing]
+        if not rows:
+            return 0
+        stmt = insert(table).values(rows)
+
+    return db.session.execute(stmt).rowcount
+
+
+# Index plan
+#
+# assignment
+#   ix lower(name)   Assignment.search prefix lookups for the assessment forms
+#                    (COLLATE "C" on PostgreSQL so range scans can use it)
+#
+# Association tables keep their surrogate `id` keys, but every pair is unique.
+# The unique index covers lookups from the first column, and a second index
+# covers lookups from the other side.
+#
+# user_courses
+#   uq (user_id, course_id)   user.enrollments, is_enrolled, enroll_many
+#   ix (course_id)            course.enrollments, rosters joined to attempts
+# course_standards
+#   uq (course_id, standard_id)   course.standards, align_many
+#   ix (standard_id)              standard.standards, status refreshes
+# course_assignments
+#   uq (course_id, assignment_id) course.assignments, add_assignments
+#   ix (assignment_id)            assignment.courses, assessment lookups
+# assignment_standards
+#   uq (assignment_id, standard_id)   assignment.alignments, add_standards
+#   ix (standard_id)                  standard.assignments, assessment lookups
+# user_standards
+#   uq (user_id, standard_id)   overrides for a roster, _has_proficient_override
+#   ix (standard_id)            standard.students
+#
+# standard_attempt
+#   ix (user_id, standard_id, occurred)
+#       _get_scores, is_proficient, ProficiencyEngine score counts and the
+#       window functions in feedbook.scoring, which partition by the pair and
+#       order by occurred.
+#   ix (standard_id, assignment_id)
+#       standard.attempts and cross-course standard reports
+#   ix (assignment_id)
+#       assignment.assessments, assignment averages, assignment detail pages
+#   unique ix (idempotency_key)
+#       finding an attempt that was already saved when a form is resubmitted
+
 assignment_standards = db.Table(
     "assignment_standards",
     db.Column("id", db.Integer, primary_key=True),
@@ -424,6 +748,12 @@ assignment_standards = db.Table(
         db.Integer,
         db.ForeignKey("standard.id", onupdate="CASCADE", ondelete="CASCADE"),
     ),
+    db.UniqueConstraint(
+        "assignment_id",
+        "standard_id",
+        name="uq_assignment_standards_assignment_standard",
+    ),
+    db.Index("ix_assignment_standards_standard_id", "standard_id"),
 )
 
 course_standards = db.Table(
@@ -439,6 +769,10 @@ course_standards = db.Table(
         db.Integer,
         db.ForeignKey("standard.id", onupdate="CASCADE", ondelete="CASCADE"),
     ),
+    db.UniqueConstraint(
+        "course_id", "standard_id", name="uq_course_standards_course_standard"
+    ),
+    db.Index("ix_course_standards_standard_id", "standard_id"),
 )
 
 course_assignments = db.Table(
@@ -454,6 +788,10 @@ course_assignments = db.Table(
         db.Integer,
         db.ForeignKey("assignment.id", onupdate="CASCADE", ondelete="CASCADE"),
     ),
+    db.UniqueConstraint(
+        "course_id", "assignment_id", name="uq_course_assignments_course_assignment"
+    ),
+    db.Index("ix_course_assignments_assignment_id", "assignment_id"),
 )
 
 user_courses = db.Table(
@@ -469,6 +807,8 @@ user_courses = db.Table(
         db.Integer,
         db.ForeignKey("course.id", onupdate="CASCADE", ondelete="CASCADE"),
     ),
+    db.UniqueConstraint("user_id", "course_id", name="uq_user_courses_user_course"),
+    db.Index("ix_user_courses_course_id", "course_id"),
 )
 
 user_standards = db.Table(
@@ -484,4 +824,8 @@ user_standards = db.Table(
         db.Integer,
         db.ForeignKey("standard.id", onupdate="CASCADE", ondelete="CASCADE"),
     ),
+    db.UniqueConstraint(
+        "user_id", "standard_id", name="uq_user_standards_user_standard"
+    ),
+    db.Index("ix_user_standards_standard_id", "standard_id"),
 )
@@ -0,0 +1,226 @@
+from collections import Counter, defaultdict
+from copy import copy
+
+from sqlalchemy import case, func, select
+
+from feedbook.extensions import db
+from feedbook.lookups import ASSESSMENT, STUDENT, assignment_types, user_types
+from feedbook.models import (
+    _ids,
+    assignment_standards,
+    course_assignments,
+    user_standards,
+    Assignment,
+    StandardAttempt,
+    User,
+)
+
+
+def _assessed_by_course(course_ids, standard_ids) -> dict:
+    """
+    Standards with an assessment assigned in each course, in one query, as
+    {course_id: set of standard ids}.
+    """
+    assessed = defaultdict(set)
+    rows = db.session.execute(
+        select(course_assignments.c.course_id, assignment_standards.c.standard_id)
+        .join(Assignment, Assignment.id == assignment_standards.c.assignment_id)
+        .join(
+            course_assignments,
+            course_assignments.c.assignment_id == Assignment.id,
+        )
+        .where(
+            Assignment.assignmenttype_id == assignment_types.id(ASSESSMENT),
+            course_assignments.c.course_id.in_(list(course_ids)),
+            assignment_standards.c.standard_id.in_(list(standard_ids)),
+        )
+        .distinct()
+    )
+    for course_id, standard_id in rows:
+        assessed[course_id].add(standard_id)
+    return assessed
+
+
+class ProficiencyEngine(object):
+    """
+    Compute proficiency for every student and standard in a course at once.
+
+    `Standard.is_proficient` answers the question for one student on one
+    standard and costs several queries each time it is called. The engine
+    loads everything it needs for the whole roster in three grouped queries
+    and then applies the same rules in memory:
+
+    - If an assessment for the standard is assigned in the course, the student
+      is proficient when they scored a 2 on any assessment or have an override.
+    - Otherwise they are proficient when they have more 2's than 1's and 0's.
+
+    Use `ProficiencyEngine.for_course(course)` to build one.
+    """
+
+    def __init__(self, course, student_ids, standard_ids):
+        # Accept either a Course or its id
+        self.course_id = getattr(course, "id", course)
+        self.student_ids = list(student_ids)
+        self.standard_ids = list(standard_ids)
+
+        # Standards with an assessment assigned in this course
+        self._assessed = set()
+        # (user_id, standard_id) -> Counter of scores
+        self._counts = defaultdict(Counter)
+        # (user_id, standard_id) pairs with a passed assessment
+        self._passed = set()
+        # (user_id, standard_id) pairs with a proficiency override
+        self._overrides = set()
+
+        if self.student_ids and self.standard_ids:
+            self._load()
+
+    @classmethod
+    def for_course(cls, course, students=None, standards=None):
+        """
+        Build an engine for a course.
+
+        By default, all active students and every standard aligned to the
+        course are included. Pass lists of users/standards (or their ids) to
+        limit the calculation when they are already loaded.
+        """
+        if students is None:
+            students = course.enrollments.filter(
+                User.usertype_id == user_types.id(STUDENT), User.active == True
+            ).all()
+        if standards is None:
+            standards = course.standards.all()
+
+        return cls(course, _ids(students), _ids(standards))
+
+    @classmethod
+    def for_courses(cls, course_ids, student_ids, standard_ids) -> dict:
+        """
+        Build engines for several courses at once as {course_id: engine}.
+
+        Scores and overrides are loaded once and shared between the engines.
+        The assessed standards for every course come from one query, so the
+        cost doesn't grow with the number of courses.
+        """
+        shared = cls(None, (), ())
+        shared.student_ids = list(student_ids)
+        shared.standard_ids = list(standard_ids)
+        assessed = defaultdict(set)
+        if shared.student_ids and shared.standard_ids and course_ids:
+            shared._load_scores()
+            assessed = _assessed_by_course(course_ids, shared.standard_ids)
+        return {
+            course_id: shared._in_course(course_id, assessed[course_id])
+            for course_id in course_ids
+        }
+
+    def _in_course(self, course_id, assessed):
+        engine = copy(self)
+        engine.course_id = course_id
+        engine._assessed = set(assessed)
+        return engine
+
+    def _load(self):
+        self._assessed = _assessed_by_course([self.course_id], self.standard_ids)[
+            self.course_id
+        ]
+        self._load_scores()
+
+    def _load_scores(self):
+        assessment = assignment_types.id(ASSESSMENT)
+
+        # Count scores for each student and standard. The second aggregate
+        # flags groups which include an attempt on an assessment so passed
+        # assessments come back in the same query.
+        counts = db.session.execute(
+            select(
+                StandardAttempt.user_id,
+                StandardAttempt.standard_id,
+                StandardAttempt.score,
+                func.count(StandardAttempt.id),
+                func.max(
+                    case((Assignment.assignmenttype_id == assessment, 1), else_=0)
+                ),
+            )
+            .outerjoin(Assignment, Assignment.id == StandardAttempt.assignment_id)
+            .where(
+                StandardAttempt.user_id.in_(self.student_ids),
+                StandardAttempt.standard_id.in_(self.standard_ids),
+            )
+            .group_by(
+                StandardAttempt.user_id,
+                StandardAttempt.standard_id,
+                StandardAttempt.score,
+            )
+        )
+        for user_id, standard_id, score, count, on_assessment in counts:
+            # Attempts saved without a score don't count toward anything
+            if score is None:
+                continue
+            self._counts[(user_id, standard_id)][score] = count
+            if score == 2 and on_assessment:
+                self._passed.add((user_id, standard_id))
+
+        overrides = db.session.execute(
+            select(user_standards.c.user_id, user_standards.c.standard_id).where(
+                user_standards.c.user_id.in_(self.student_ids),
+                user_standards.c.standard_id.in_(self.standard_ids),
+            )
+        )
+        self._overrides = {(user_id, standard_id) for user_id, standard_id in overrides}
+
+    def has_assessment(self, standard_id) -> bool:
+        return standard_id in self._assessed
+
+    def is_proficient(self, user_id, standard_id) -> bool:
+        key = (user_id, standard_id)
+        if standard_id in self._assessed:
+            return key in self._passed or key in self._overrides
+
+        counts = self._counts.get(key, Counter())
+        return counts[2] > counts[1] + counts[0]
+
+    def record(self, user_id, standard_id) -> dict:
+        """
+        Return the values behind a proficiency decision for one student.
+        """
+        key = (user_id, standard_id)
+        counts = self._counts.get(key, Counter())
+        scored = [
+            score for score, count in counts.items() if count and score is not None
+        ]
+        return {
+            "count_0": counts[0],
+            "count_1": counts[1],
+            "count_2": counts[2],
+            "max_score": max(scored) if scored else None,
+            "has_assessment_pass": key in self._passed,
+            "has_override": key in self._overrides,
+            "proficient": self.is_proficient(user_id, standard_id),
+        }
+
+    def matrix(self) -> dict:
+        """
+        Return the full proficiency matrix as {user_id: {standard_id: bool}}.
+        """
+        return {
+            user_id: {
+                standard_id: self.is_proficient(user_id, standard_id)
+                for standard_id in self.standard_ids
+            }
+            for user_id in self.student_ids
+        }
+
+    def summary(self, standard_id) -> dict:
+        """
+        Count proficient and not proficient students on a single standard.
+        """
+        count = sum(
+            1
+            for user_id in self.student_ids
+            if self.is_proficient(user_id, standard_id)
+        )
+        return {
+            "proficient": count,
+            "not_proficient": len(self.student_ids) - count,
+        }
@@ -0,0 +1,198 @@
+"""
+Count the SQL run for each request.
+
+When `SQLALCHEMY_RECORD_QUERIES` is set, every request records its queries,
+the time spent in the database and the time spent rendering templates. Each
+request writes a summary to the app log and a `Server-Timing` header, so the
+browser's network panel shows db and render time for every HTMX fragment.
+
+The same statement run many times with different parameters is the mark of
+an N+1 query (usually a dynamic relationship iterated in a template). Those
+are logged as warnings with the route or template that ran them. Set
+`QUERY_REPEAT_THRESHOLD` to change how many repeats are reported (default 5).
+
+`record_queries` gives the same counts for any block of code, which the test
+suite uses for query budgets.
+"""
+
+from collections import namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from flask import before_render_template, g, has_request_context, request
+from flask import template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# A single statement run against the database
+Query = namedtuple("Query", ["statement", "parameters", "duration", "source"])
+
+# Repeated statement with the number of times it ran and where it came from
+Repeat = namedtuple("Repeat", ["statement", "count", "sources"])
+
+_logs = ContextVar("query_logs", default=())
+
+
+class QueryLog:
+    """
+    Queries recorded while the log was active. Durations are in seconds.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.render_time = 0.0
+        self.render_db_time = 0.0
+
+    def __len__(self):
+        return len(self.queries)
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def db_time(self) -> float:
+        return sum(query.duration for query in self.queries)
+
+    def repeated(self, threshold=5) -> list:
+        """
+        Statements run at least `threshold` times with different parameters,
+        most repeated first.
+        """
+        grouped = {}
+        for query in self.queries:
+            grouped.setdefault(query.statement, []).append(query)
+
+        repeats = [
+            Repeat(
+                statement,
+                len(queries),
+                sorted({query.source for query in queries if query.source}),
+            )
+            for statement, queries in grouped.items()
+            if len({query.parameters for query in queries}) >= threshold
+        ]
+        return sorted(repeats, key=lambda repeat: repeat.count, reverse=True)
+
+
+@contextmanager
+def record_queries():
+    """
+    Record the queries run inside the block.
+
+        with record_queries() as log:
+            client.get("/courses/1")
+        log.count
+    """
+    log = QueryLog()
+    token = _logs.set(_logs.get() + (log,))
+    try:
+        yield log
+    finally:
+        _logs.reset(token)
+
+
+def _source():
+    if not has_request_context():
+        return None
+
+    templates = g.get("template_stack")
+    if templates:
+        return templates[-1][0]
+    return request.endpoint
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _logs.get():
+        conn.info.setdefault("query_start", []).append(perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    logs = _logs.get()
+    if not logs or not conn.info.get("query_start"):
+        return
+
+    duration = perf_counter() - conn.info["query_start"].pop()
+    query = Query(statement, repr(parameters), duration, _source())
+    rendering = has_request_context() and bool(g.get("template_stack"))
+
+    for log in logs:
+        log.queries.append(query)
+        if rendering:
+            log.render_db_time += duration
+
+
+def _before_render(sender, template, context, **extra):
+    g.setdefault("template_stack", []).append((template.name, perf_counter()))
+
+
+def _template_rendered(sender, template, context, **extra):
+    templates = g.get("template_stack")
+    if not templates:
+        return
+
+    _, start = templates.pop()
+    # Nested partials are already counted in the template that includes them
+    if not templates and "query_log" in g:
+        g.query_log.render_time += perf_counter() - start
+
+
+def _start_request():
+    g.query_log = QueryLog()
+    g.query_log_token = _logs.set(_logs.get() + (g.query_log,))
+    g.request_start = perf_counter()
+
+
+def _report(app, response):
+    log = g.get("query_log")
+    if log is None:
+        return response
+
+    total = (perf_counter() - g.request_start) * 1000
+    db_time = log.db_time * 1000
+    # Queries run while rendering are counted as db time, not render time
+    render = (log.render_time - log.render_db_time) * 1000
+
+    response.headers["Server-Timing"] = ", ".join(
+        [
+            f'db;dur={db_time:.1f};desc="{log.count} queries"',
+            f"render;dur={render:.1f}",
+            f"total;dur={total:.1f}",
+        ]
+    )
+
+    app.logger.info(
+        f"{request.method} {request.endpoint}: {log.count} queries, db {db_time:.1f}ms, render {render:.1f}ms, total {total:.1f}ms"
+    )
+
+    threshold = app.config.get("QUERY_REPEAT_THRESHOLD", 5)
+    for repeat in log.repeated(threshold):
+        app.logger.warning(
+            f"Possible N+1 in {request.endpoint}: ran {repeat.count} times from {', '.join(repeat.sources) or 'unknown'}: {repeat.statement[:200]}"
+        )
+
+    return response
+
+
+def _end_request(exc):
+    token = g.pop("query_log_token", None)
+    if token is not None:
+        _logs.reset(token)
+
+
+def init_app(app):
+    """
+    Record queries for every request when `SQLALCHEMY_RECORD_QUERIES` is set.
+    """
+    if not app.config.get("SQLALCHEMY_RECORD_QUERIES"):
+        return
+
+    app.before_request(_start_request)
+    app.after_request(lambda response: _report(app, response))
+    app.teardown_request(_end_request)
+
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_template_rendered, app)
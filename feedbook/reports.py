@@ -0,0 +1,221 @@
+"""
+Cross-course reports for a single standard.
+
+The standards admin panel charts how every active course scores on a
+standard. The report groups the standard's attempts by course and assignment
+(or by week of `occurred`) and averages them in one query instead of loading
+every attempt. Students count toward each course they are enrolled in.
+
+Reports are stored as JSON in `standard_report`. Writing, editing or deleting
+an attempt, and changes which invalidate student statuses (alignments and
+assignment types), delete the stored reports for the standards involved.
+Roster and course changes don't, so reports older than `max_age` seconds are
+rebuilt as well.
+"""
+
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from feedbook.extensions import db
+from feedbook.models import (
+    assignment_standards,
+    course_assignments,
+    course_standards,
+    user_courses,
+    Assignment,
+    Course,
+    StandardAttempt,
+    StandardReport,
+)
+
+# Ways a report can be grouped
+BUCKETS = ("assignment", "week")
+
+# Seconds before a stored report is rebuilt even if nothing invalidated it
+MAX_AGE = 3600
+
+report_table = StandardReport.__table__
+
+
+def _week(column):
+    """
+    The first day (Monday) of the week of a datetime column as YYYY-MM-DD.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "sqlite":
+        return func.date(column, "weekday 0", "-6 days")
+    if dialect == "postgresql":
+        return func.to_char(func.date_trunc("week", column), "YYYY-MM-DD")
+    return func.date(column)
+
+
+def _courses(standard_id) -> list:
+    return db.session.execute(
+        select(Course.id, Course.name)
+        .join(course_standards, course_standards.c.course_id == Course.id)
+        .where(course_standards.c.standard_id == standard_id, Course.active)
+        .order_by(Course.id)
+    ).all()
+
+
+def _assignments(standard_id) -> list:
+    """
+    Assignments aligned to the standard in any active course, oldest first.
+    """
+    return db.session.execute(
+        select(Assignment.id, Assignment.name)
+        .join(
+            assignment_standards,
+            assignment_standards.c.assignment_id == Assignment.id,
+        )
+        .join(course_assignments, course_assignments.c.assignment_id == Assignment.id)
+        .join(Course, Course.id == course_assignments.c.course_id)
+        .where(assignment_standards.c.standard_id == standard_id, Course.active)
+        .distinct()
+        .order_by(Assignment.created_on, Assignment.id)
+    ).all()
+
+
+def _averages(standard_id, course_ids, key) -> dict:
+    """
+    Average score and number of attempts on the standard for each course and
+    `key` as {(course_id, key): (average, count)} in a single grouped query.
+    """
+    rows = db.session.execute(
+        select(
+            user_courses.c.course_id,
+            key,
+            func.avg(StandardAttempt.score),
+            func.count(StandardAttempt.id),
+        )
+        .join(user_courses, user_courses.c.user_id == StandardAttempt.user_id)
+        .where(
+            StandardAttempt.standard_id == standard_id,
+            user_courses.c.course_id.in_(course_ids),
+        )
+        .group_by(user_courses.c.course_id, key)
+    )
+    return {
+        (course_id, value): (round(float(average), 2), count)
+        for course_id, value, average, count in rows
+    }
+
+
+def _point(key, label, result) -> dict:
+    average, count = result or (0, 0)
+    return {key: label, "avg": average, "count": count}
+
+
+def build(standard_id, bucket="assignment") -> list:
+    """
+    Work out a report from the attempts. Every course lists the same
+    assignments (or weeks) in the same order so the chart can line them up.
+    Groups without attempts have an average of 0 and a count of 0.
+    """
+    courses = _courses(standard_id)
+    if not courses:
+        return []
+    course_ids = [course_id for course_id, _ in courses]
+
+    if bucket == "week":
+        averages = _averages(standard_id, course_ids, _week(StandardAttempt.occurred))
+        weeks = sorted({week for _, week in averages})
+        return [
+            {
+                "name": name,
+                "weeks": [
+                    _point("week", week, averages.get((course_id, week)))
+                    for week in weeks
+                ],
+            }
+            for course_id, name in courses
+        ]
+
+    assignments = _assignments(standard_id)
+    averages = _averages(standard_id, course_ids, StandardAttempt.assignment_id)
+    return [
+        {
+            "name": name,
+            "assignments": [
+                _point(
+                    "assignment",
+                    assignment_name,
+                    averages.get((course_id, assignment_id)),
+                )
+                for assignment_id, assignment_name in assignments
+            ],
+        }
+        for course_id, name in courses
+    ]
+
+
+def _fresh(report, max_age) -> bool:
+    updated_at = report.updated_at
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    age = datetime.now(timezone.utc) - updated_at
+    return age.total_seconds() < max_age
+
+
+def standard_report(standard_id, bucket="assignment", max_age=MAX_AGE) -> list:
+    """
+    Get the report for a standard, from storage when it is current. Otherwise
+    it is built, stored and committed.
+    """
+    stored = db.session.scalars(
+        select(StandardReport).where(
+            StandardReport.standard_id == standard_id,
+            StandardReport.bucket == bucket,
+        )
+    ).first()
+    if stored is not None and _fresh(stored, max_age):
+        return json.loads(stored.data)
+
+    report = build(standard_id, bucket)
+    try:
+        db.session.execute(
+            delete(report_table).where(
+                report_table.c.standard_id == standard_id,
+                report_table.c.bucket == bucket,
+            )
+        )
+        db.session.execute(
+            insert(report_table).values(
+                standard_id=standard_id,
+                bucket=bucket,
+                data=json.dumps(report),
+                updated_at=datetime.now(timezone.utc),
+            )
+        )
+        db.session.commit()
+    except IntegrityError:
+        # Another request stored the same report first.
+        db.session.rollback()
+
+    return report
+
+
+def invalidate(standard_ids=(), course_ids=()):
+    """
+    Delete stored reports for some standards, or every standard aligned to
+    some courses. Does not commit.
+    """
+    if standard_ids:
+        db.session.execute(
+            delete(report_table).where(
+                report_table.c.standard_id.in_(list(standard_ids))
+            )
+        )
+    if course_ids:
+        db.session.execute(
+            delete(report_table).where(
+                report_table.c.standard_id.in_(
+                    select(course_standards.c.standard_id).where(
+                        course_standards.c.course_id.in_(list(course_ids))
+                    )
+                )
+            )
+        )
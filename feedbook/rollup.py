@@ -0,0 +1,319 @@
+"""
+Maintenance for the `course_standard_rollup` table.
+
+The admin panel charts the share of students proficient on every standard in
+every course. Working that out on each load meant reading every course's
+roster and statuses. Instead the counts are stored per course and standard
+and the panel reads them with one query.
+
+Rows are deleted for a whole course whenever something it counts changes:
+
+- Recalculated or invalidated student statuses (`feedbook.status` calls
+  `invalidate`).
+- Enrollments, and students being activated or deactivated.
+- Standards added to or removed from the course, or switched on or off.
+
+`read` rebuilds any course without rows before returning, a batch of courses
+at a time. `flask refresh-rollup` rebuilds every course, which can also be
+run on a schedule.
+"""
+
+from collections import defaultdict, namedtuple
+
+from sqlalchemy import and_, case, delete, event, func, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from feedbook.extensions import db
+from feedbook.lookups import STUDENT, user_types
+from feedbook.models import (
+    course_standards,
+    user_courses,
+    Course,
+    CourseStandardRollup,
+    Standard,
+    StudentStandardStatus,
+    User,
+)
+
+rollup_table = CourseStandardRollup.__table__
+status_table = StudentStandardStatus.__table__
+
+# A course with one of its standards and the stored counts. Courses without
+# standards have a single row with standard_id None.
+Result = namedtuple(
+    "Result",
+    [
+        "course_id",
+        "course_name",
+        "standard_id",
+        "standard_name",
+        "students",
+        "proficient",
+    ],
+)
+
+
+def ratio(result) -> float:
+    """
+    Share of students proficient on a standard. Courses without students
+    are 0 rather than an error.
+    """
+    if not result.students:
+        return 0
+    return round(result.proficient / result.students, 2)
+
+
+def invalidate(course_ids=(), standard_ids=(), user_ids=()):
+    """
+    Delete the rows for courses, every course aligned to some standards or
+    every course some users are enrolled in. They are rebuilt the next time
+    `read` needs them. Does not commit.
+    """
+    conditions = []
+    if course_ids:
+        conditions.append(rollup_table.c.course_id.in_(list(course_ids)))
+    if standard_ids:
+        standard_ids = list(standard_ids)
+        conditions.append(
+            rollup_table.c.course_id.in_(
+                select(course_standards.c.course_id).where(
+                    course_standards.c.standard_id.in_(standard_ids)
+                )
+            )
+        )
+        conditions.append(rollup_table.c.standard_id.in_(standard_ids))
+    if user_ids:
+        conditions.append(
+            rollup_table.c.course_id.in_(
+                select(user_courses.c.course_id).where(
+                    user_courses.c.user_id.in_(list(user_ids))
+                )
+            )
+        )
+
+    if conditions:
+        # Whole courses go, so a course is either fully built or not at all
+        db.session.execute(
+            delete(rollup_table).where(
+                rollup_table.c.course_id.in_(
+                    select(rollup_table.c.course_id).where(or_(*conditions))
+                )
+            )
+        )
+
+
+def _rosters(course_ids) -> dict:
+    rosters = defaultdict(list)
+    for course_id, user_id in db.session.execute(
+        select(user_courses.c.course_id, user_courses.c.user_id)
+        .join(User, User.id == user_courses.c.user_id)
+        .where(
+            user_courses.c.course_id.in_(course_ids),
+            User.usertype_id == user_types.id(STUDENT),
+            User.active,
+        )
+    ):
+        rosters[course_id].append(user_id)
+    return rosters
+
+
+def _standards(course_ids) -> dict:
+    standards = defaultdict(list)
+    for course_id, standard_id in db.session.execute(
+        select(course_standards.c.course_id, course_standards.c.standard_id)
+        .join(Standard, Standard.id == course_standards.c.standard_id)
+        .where(course_standards.c.course_id.in_(course_ids), Standard.active)
+    ):
+        standards[course_id].append(standard_id)
+    return standards
+
+
+def _counts(course_ids) -> dict:
+    """
+    Count stored statuses and proficient students for enrolled, active
+    students as {(course_id, standard_id): (rows, proficient)}.
+    """
+    rows = db.session.execute(
+        select(
+            status_table.c.course_id,
+            status_table.c.standard_id,
+            func.count(),
+            func.sum(case((status_table.c.proficient, 1), else_=0)),
+        )
+        .join(
+            user_courses,
+            and_(
+                user_courses.c.user_id == status_table.c.user_id,
+                user_courses.c.course_id == status_table.c.course_id,
+            ),
+        )
+        .join(User, User.id == status_table.c.user_id)
+        .where(
+            status_table.c.course_id.in_(course_ids),
+            User.usertype_id == user_types.id(STUDENT),
+            User.active,
+        )
+        .group_by(status_table.c.course_id, status_table.c.standard_id)
+    )
+    return {
+        (course_id, standard_id): (count, proficient or 0)
+        for course_id, standard_id, count, proficient in rows
+    }
+
+
+def build(course_ids) -> int:
+    """
+    Rebuild the rows for some courses with a fixed number of queries. Missing
+    student statuses are filled in first. Returns the number of rows stored
+    and commits.
+    """
+    from feedbook.status import load_statuses
+
+    course_ids = list(course_ids)
+    if not course_ids:
+        return 0
+
+    rosters = _rosters(course_ids)
+    standards = _standards(course_ids)
+    counts = _counts(course_ids)
+
+    incomplete = [
+        course_id
+        for course_id in course_ids
+        if any(
+            counts.get((course_id, standard_id), (0, 0))[0] < len(rosters[course_id])
+            for standard_id in standards[course_id]
+        )
+    ]
+    for course_id in incomplete:
+        statuses = load_statuses(course_id, rosters[course_id], standards[course_id])
+        for standard_id in standards[course_id]:
+            proficient = [
+                statuses[(user_id, standard_id)].proficient
+                for user_id in rosters[course_id]
+                if (user_id, standard_id) in statuses
+            ]
+            counts[(course_id, standard_id)] = (len(proficient), sum(proficient))
+
+    rows = []
+    for course_id in course_ids:
+        students = len(rosters[course_id])
+        rows.append(
+            {
+                "course_id": course_id,
+                "standard_id": None,
+                "students": students,
+                "proficient": None,
+            }
+        )
+        rows.extend(
+            {
+                "course_id": course_id,
+                "standard_id": standard_id,
+                "students": students,
+                "proficient": counts.get((course_id, standard_id), (0, 0))[1],
+            }
+            for standard_id in standards[course_id]
+        )
+
+    try:
+        db.session.execute(
+            delete(rollup_table).where(rollup_table.c.course_id.in_(course_ids))
+        )
+        db.session.execute(insert(rollup_table), rows)
+        db.session.commit()
+    except IntegrityError:
+        # Another request built the same courses first.
+        db.session.rollback()
+
+    return len(rows)
+
+
+def rebuild_all() -> int:
+    """Rebuild the rollup for every course. Commits when finished."""
+    db.session.execute(delete(rollup_table))
+    return build(db.session.scalars(select(Course.id)).all())
+
+
+def read(archived=False) -> list:
+    """
+    Get a Result for every active standard in every active course (or every
+    course with `archived`), ordered by course and standard.
+
+    Built courses are read with one query. Courses without rows are built
+    and the rows read again.
+    """
+    query = (
+        select(
+            Course.id,
+            Course.name.label("course_name"),
+            rollup_table.c.standard_id,
+            Standard.name.label("standard_name"),
+            rollup_table.c.students,
+            rollup_table.c.proficient,
+        )
+        .outerjoin(rollup_table, rollup_table.c.course_id == Course.id)
+        .outerjoin(Standard, Standard.id == rollup_table.c.standard_id)
+        .order_by(Course.id, rollup_table.c.standard_id.is_not(None), Standard.id)
+    )
+    if not archived:
+        query = query.where(Course.active)
+
+    rows = db.session.execute(query).all()
+    stale = sorted({row.id for row in rows if row.students is None})
+    if stale:
+        build(stale)
+        rows = db.session.execute(query).all()
+
+    return [Result(*row) for row in rows]
+
+
+# Session hooks
+# Collect what changed during the flush and delete the affected rows once it
+# has been written.
+
+
+def _pending(session, key):
+    return session.info.setdefault(key, set())
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _apply_pending(session, flush_context):
+    course_ids = session.info.pop("rollup_stale_courses", set())
+    standard_ids = session.info.pop("rollup_stale_standards", set())
+    user_ids = session.info.pop("rollup_stale_users", set())
+
+    course_ids.discard(None)
+    standard_ids.discard(None)
+    user_ids.discard(None)
+    if course_ids or standard_ids or user_ids:
+        invalidate(course_ids, standard_ids, user_ids)
+
+
+def _session_for(target):
+    return Session.object_session(target) or db.session()
+
+
+@event.listens_for(User.enrollments, "append")
+@event.listens_for(User.enrollments, "remove")
+def _enrollments_changed(user, course, initiator):
+    _pending(_session_for(user), "rollup_stale_courses").add(course.id)
+
+
+@event.listens_for(Course.standards, "append")
+@event.listens_for(Course.standards, "remove")
+def _course_standards_changed(course, standard, initiator):
+    _pending(_session_for(course), "rollup_stale_courses").add(course.id)
+
+
+@event.listens_for(User.active, "set")
+def _user_active_changed(user, value, oldvalue, initiator):
+    if user.id is not None and value != oldvalue:
+        _pending(_session_for(user), "rollup_stale_users").add(user.id)
+
+
+@event.listens_for(Standard.active, "set")
+def _standard_active_changed(standard, value, oldvalue, initiator):
+    if standard.id is not None and value != oldvalue:
+        _pending(_session_for(standard), "rollup_stale_standards").add(standard.id)
@@ -0,0 +1,282 @@
+"""
+Import course rosters from CSV files.
+
+Rosters use the columns from the shared template: last name, first name and
+email, with a header row. Any extra columns (like the old password column) are
+ignored.
+
+Rows are read in chunks so large schedule loads never hold the whole file or
+one query per student. Each chunk looks up existing accounts by email in one
+query, creates or updates the rest and enrolls them with a single
+`Course.enroll_many` statement. The whole file is committed once, so a
+database error leaves the roster untouched.
+
+`sync_roster` makes the course match the file instead: students missing from
+the file are deactivated and listed students are enrolled or reactivated. The
+differences are worked out in memory from sets of emails, then applied with a
+few bulk statements or returned as a preview.
+"""
+
+import csv
+from itertools import islice
+
+from sqlalchemy import func, select, update
+
+from feedbook import identity, rollup
+from feedbook.extensions import db
+from feedbook.lookups import STUDENT, user_types
+from feedbook.models import User
+
+CHUNK_SIZE = 500
+
+
+class RosterReport:
+    """
+    Rows that couldn't be used, as (line number, message) in `errors`.
+    """
+
+    def __init__(self):
+        self.skipped = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.errors.append((line, message))
+        self.skipped += 1
+
+
+class RosterImport(RosterReport):
+    """
+    Counts and row errors from an import.
+
+    - created: new student accounts
+    - updated: existing students whose name changed
+    - skipped: rows with an error or matching an account without changes
+    - enrolled: new enrollments in the course
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.created = 0
+        self.updated = 0
+        self.enrolled = 0
+
+
+class RosterSync(RosterReport):
+    """
+    Changes made (or previewed, with `dry_run`) by a roster sync.
+
+    - added: (last name, first name, email) for students to enroll. Emails
+      without an account get one.
+    - reactivated: inactive students in the file
+    - deactivated: active students in the course missing from the file
+    - unchanged: count of students already enrolled and active
+    """
+
+    def __init__(self, dry_run=False):
+        super().__init__()
+        self.dry_run = dry_run
+        self.added = []
+        self.reactivated = []
+        self.deactivated = []
+        self.unchanged = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.reactivated or self.deactivated)
+
+
+def normalize_email(email) -> str:
+    return email.strip().lower()
+
+
+def read_rows(csv_file, result):
+    """
+    Yield (line, last_name, first_name, email) for each valid row in the file.
+    Invalid rows are recorded on `result` and left out.
+    """
+    reader = csv.reader(csv_file, delimiter=",")
+    next(reader, None)
+
+    # The header is line 1
+    for line, row in enumerate(reader, start=2):
+        row = [value.strip() for value in row]
+        if not any(row):
+            continue
+
+        if len(row) < 3 or not all(row[:3]):
+            result.error(line, "Missing a last name, first name or email")
+            continue
+
+        email = normalize_email(row[2])
+        if "@" not in email:
+            result.error(line, f"{row[2]} is not an email address")
+            continue
+
+        yield line, row[0], row[1], email
+
+
+def import_roster(course, csv_file, chunk_size=CHUNK_SIZE) -> RosterImport:
+    """
+    Upsert the students in a CSV roster by email and enroll them in `course`.
+
+    New students get an account, existing students have their names updated
+    and non-student accounts are reported as errors. Re-uploading the same
+    file is safe and only skips rows.
+    """
+    result = RosterImport()
+    rows = read_rows(csv_file, result)
+    seen = set()
+
+    try:
+        while chunk := list(islice(rows, chunk_size)):
+            _import_chunk(course, chunk, seen, result)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return result
+
+
+def _import_chunk(course, chunk, seen, result):
+    students = {}
+    for line, last_name, first_name, email in chunk:
+        if email in seen:
+            result.error(line, f"{email} is listed more than once")
+            continue
+        seen.add(email)
+        students[email] = (line, last_name, first_name)
+
+    if not students:
+        return
+
+    # Stored emails may have capitals, the CSV emails are already lowercase
+    existing = {
+        normalize_email(user.email): user
+        for user in db.session.scalars(
+            select(User).where(func.lower(User.email).in_(students))
+        )
+    }
+
+    members = []
+    for email, (line, last_name, first_name) in students.items():
+        user = existing.get(email)
+
+        if user is None:
+            user = User(
+                email=email,
+                last_name=last_name,
+                first_name=first_name,
+                usertype_id=user_types.id(STUDENT),
+                active=True,
+            )
+            db.session.add(user)
+            result.created += 1
+        elif not user.is_student:
+            result.error(line, f"{email} is not a student account")
+            continue
+        elif (user.last_name, user.first_name) != (last_name, first_name):
+            user.last_name = last_name
+            user.first_name = first_name
+            result.updated += 1
+        else:
+            result.skipped += 1
+
+        members.append(user)
+
+    result.enrolled += course.enroll_many(members)
+
+
+def sync_roster(course, csv_file, dry_run=False) -> RosterSync:
+    """
+    Make the students in `course` match a CSV roster.
+
+    Listed students who aren't enrolled are enrolled (creating accounts for
+    new emails), listed students who are inactive are reactivated and active
+    students missing from the file are deactivated. Teachers in the course
+    are never changed.
+
+    With `dry_run`, the changes are worked out and returned without writing
+    anything.
+    """
+    result = RosterSync(dry_run)
+
+    listed = {}
+    for line, last_name, first_name, email in read_rows(csv_file, result):
+        if email in listed:
+            result.error(line, f"{email} is listed more than once")
+            continue
+        listed[email] = (line, last_name, first_name)
+
+    enrolled = {
+        normalize_email(user.email): user
+        for user in course.enrollments.filter(
+            User.usertype_id == user_types.id(STUDENT)
+        )
+    }
+    accounts = {
+        normalize_email(user.email): user
+        for user in db.session.scalars(
+            select(User).where(
+                func.lower(User.email).in_(list(listed.keys() - enrolled.keys()))
+            )
+        )
+    }
+
+    for email, (line, last_name, first_name) in listed.items():
+        user = enrolled.get(email)
+        if user is None:
+            user = accounts.get(email)
+            if user is not None and not user.is_student:
+                result.error(line, f"{email} is not a student account")
+                continue
+            result.added.append((last_name, first_name, email))
+        elif user.active:
+            result.unchanged += 1
+
+        if user is not None and not user.active:
+            result.reactivated.append(user)
+
+    result.deactivated = [
+        user
+        for email, user in sorted(enrolled.items())
+        if user.active and email not in listed
+    ]
+
+    if dry_run or not result.changed:
+        return result
+
+    try:
+        new_users = [
+            User(
+                email=email,
+                last_name=last_name,
+                first_name=first_name,
+                usertype_id=user_types.id(STUDENT),
+                active=True,
+            )
+            for last_name, first_name, email in result.added
+            if email not in accounts
+        ]
+        db.session.add_all(new_users)
+        course.enroll_many(
+            new_users
+            + [accounts[email] for _, _, email in result.added if email in accounts]
+        )
+        _set_active([user.id for user in result.reactivated], True)
+        _set_active([user.id for user in result.deactivated], False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return result
+
+
+def _set_active(user_ids, active):
+    if user_ids:
+        db.session.execute(
+            update(User).where(User.id.in_(user_ids)).values(active=active)
+        )
+        rollup.invalidate(user_ids=user_ids)
+        identity.forget(user_ids)
@@ -0,0 +1,79 @@
+from sqlalchemy import func, select
+
+from feedbook.extensions import db
+from feedbook.models import _ids, course_standards, user_courses, StandardAttempt
+
+
+def score_summaries(course=None, users=None, standards=None) -> dict:
+    """
+    Get the highest and most recent score for each student and standard.
+
+    Both values come from window functions over the StandardAttempt table, so
+    every pair is calculated in a single statement on SQLite and PostgreSQL.
+    The most recent score is ordered by `occurred`, not by when it was entered.
+
+    Limit the results with a course (its roster and aligned standards) and/or
+    explicit lists of users and standards (or their ids).
+
+    Returns a dict of {(user_id, standard_id): (max_score, last_score)}.
+    """
+    partition = (StandardAttempt.user_id, StandardAttempt.standard_id)
+    ranked = select(
+        StandardAttempt.user_id,
+        StandardAttempt.standard_id,
+        StandardAttempt.score,
+        func.max(StandardAttempt.score).over(partition_by=partition).label("max_score"),
+        func.row_number()
+        .over(
+            partition_by=partition,
+            order_by=(StandardAttempt.occurred.desc(), StandardAttempt.id.desc()),
+        )
+        .label("position"),
+    )
+
+    if course is not None:
+        course_id = getattr(course, "id", course)
+        ranked = ranked.where(
+            StandardAttempt.user_id.in_(
+                select(user_courses.c.user_id).where(
+                    user_courses.c.course_id == course_id
+                )
+            ),
+            StandardAttempt.standard_id.in_(
+                select(course_standards.c.standard_id).where(
+                    course_standards.c.course_id == course_id
+                )
+            ),
+        )
+    if users is not None:
+        ranked = ranked.where(StandardAttempt.user_id.in_(_ids(users)))
+    if standards is not None:
+        ranked = ranked.where(StandardAttempt.standard_id.in_(_ids(standards)))
+
+    ranked = ranked.subquery()
+    rows = db.session.execute(
+        select(
+            ranked.c.user_id, ranked.c.standard_id, ranked.c.max_score, ranked.c.score
+        ).where(ranked.c.position == 1)
+    )
+
+    return {
+        (user_id, standard_id): (max_score, last_score)
+        for user_id, standard_id, max_score, last_score in rows
+    }
+
+
+def current_scores(course=None, users=None, standards=None) -> dict:
+    """
+    Bulk version of `Standard.current_score`. Averages the highest score with
+    the most recent score for every student and standard in one query.
+
+    Takes the same filters as `score_summaries` and returns a dict of
+    {(user_id, standard_id): score}. Pairs without attempts are left out.
+    """
+    return {
+        key: (max_score + last_score) / 2
+        for key, (max_score, last_score) in score_summaries(
+            course, users, standards
+        ).items()
+    }
@@ -0,0 +1,435 @@
+"""
+Maintenance for the `student_standard_status` table.
+
+Each row stores the proficiency inputs and result for one student on one
+standard in one course. Rows are kept current with session events:
+
+- Writing, editing or deleting a StandardAttempt recalculates the affected
+  (user, standard) pairs after the flush, in the same transaction.
+- Adding or removing a proficiency override does the same.
+- Changes which decide whether a standard is assessed in a course (assigning
+  assignments to courses, aligning standards, changing an assignment type)
+  delete the affected rows. They are rebuilt the next time they are read.
+- Adding or removing course standards and enrolling students delete the
+  course's rows too. Attempts recorded while a standard or student was out
+  of the course only refresh the courses they were in at the time.
+
+Reads go through `load_statuses`, which fills in any missing rows before
+returning. `flask rebuild-status` rebuilds the table from scratch.
+"""
+
+from collections import defaultdict
+from itertools import chain
+
+from sqlalchemy import case, delete, event, func, insert, inspect, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from feedbook import reports, rollup
+from feedbook.extensions import db
+from feedbook.lookups import STUDENT, user_types
+from feedbook.models import (
+    _ids,
+    assignment_standards,
+    course_standards,
+    user_courses,
+    Assignment,
+    Course,
+    StandardAttempt,
+    StudentStandardStatus,
+    User,
+)
+from feedbook.proficiency import ProficiencyEngine
+from feedbook.scoring import score_summaries
+
+status_table = StudentStandardStatus.__table__
+
+
+# Columns which identify a row, matching the table's unique constraint
+KEY = ("user_id", "standard_id", "course_id")
+
+
+def _build_rows(courses):
+    """
+    Build rows for {course_id: (user_id, standard_id) pairs}. Scores are read
+    once for every course.
+    """
+    pairs = set().union(*courses.values())
+    if not pairs:
+        return []
+    user_ids = {user_id for user_id, _ in pairs}
+    standard_ids = {standard_id for _, standard_id in pairs}
+
+    engines = ProficiencyEngine.for_courses(list(courses), user_ids, standard_ids)
+    summaries = score_summaries(users=user_ids, standards=standard_ids)
+
+    rows = []
+    for course_id, course_pairs in courses.items():
+        engine = engines[course_id]
+        for user_id, standard_id in course_pairs:
+            row = engine.record(user_id, standard_id)
+            row.update(
+                user_id=user_id,
+                standard_id=standard_id,
+                course_id=course_id,
+                last_score=summaries.get((user_id, standard_id), (None, None))[1],
+            )
+            rows.append(row)
+    return rows
+
+
+def _upsert_rows(rows):
+    """
+    Write rows in one statement, replacing any stored row for the same
+    student, standard and course with ON CONFLICT DO UPDATE. Other dialects
+    delete the old rows first.
+    """
+    if not rows:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialect == "sqlite" else postgresql).insert(status_table)
+        values = {name: stmt.excluded[name] for name in rows[0] if name not in KEY}
+        stmt = stmt.on_conflict_do_update(
+            index_elements=KEY, set_=dict(values, updated_at=func.now())
+        )
+        db.session.execute(stmt, rows)
+        return
+
+    db.session.execute(
+        delete(status_table).where(
+            tuple_(*[status_table.c[name] for name in KEY]).in_(
+                [tuple(row[name] for name in KEY) for row in rows]
+            )
+        )
+    )
+    db.session.execute(insert(status_table), rows)
+
+
+def _write_rows(course_id, pairs):
+    _upsert_rows(_build_rows({course_id: set(pairs)}))
+
+
+def _courses_for_pairs(pairs):
+    """
+    Group (user_id, standard_id) pairs by every course where the student is
+    enrolled and the standard is aligned, in one query.
+    """
+    user_ids = {user_id for user_id, _ in pairs}
+    standard_ids = {standard_id for _, standard_id in pairs}
+
+    courses = defaultdict(set)
+    for course_id, user_id, standard_id in db.session.execute(
+        select(
+            user_courses.c.course_id,
+            user_courses.c.user_id,
+            course_standards.c.standard_id,
+        )
+        .join(
+            course_standards,
+            course_standards.c.course_id == user_courses.c.course_id,
+        )
+        .where(
+            user_courses.c.user_id.in_(user_ids),
+            course_standards.c.standard_id.in_(standard_ids),
+        )
+    ):
+        if (user_id, standard_id) in pairs:
+            courses[course_id].add((user_id, standard_id))
+    return courses
+
+
+def refresh(pairs):
+    """
+    Recalculate stored status for (user_id, standard_id) pairs in every course
+    they share. Does not commit.
+    """
+    pairs = {
+        (user_id, standard_id)
+        for user_id, standard_id in pairs
+        if user_id is not None and standard_id is not None
+    }
+    if not pairs:
+        return
+
+    # One read for the courses and a fixed number for the scores, then every
+    # row is written with one statement however many courses are involved
+    courses = _courses_for_pairs(pairs)
+    _upsert_rows(_build_rows(courses))
+    rollup.invalidate(course_ids=courses)
+    reports.invalidate(standard_ids={standard_id for _, standard_id in pairs})
+
+
+def invalidate(course_ids=(), standard_ids=()):
+    """
+    Delete stored rows for whole courses or standards. They are rebuilt the
+    next time `load_statuses` reads them. Does not commit.
+    """
+    if course_ids:
+        db.session.execute(
+            delete(status_table).where(status_table.c.course_id.in_(course_ids))
+        )
+    if standard_ids:
+        db.session.execute(
+            delete(status_table).where(status_table.c.standard_id.in_(standard_ids))
+        )
+    rollup.invalidate(course_ids=course_ids, standard_ids=standard_ids)
+    reports.invalidate(standard_ids=standard_ids, course_ids=course_ids)
+
+
+def rebuild_course(course):
+    """
+    Rebuild every row for a course from the current roster and standards.
+    """
+    course_id = getattr(course, "id", course)
+    student_ids = db.session.scalars(
+        select(user_courses.c.user_id)
+        .join(User, User.id == user_courses.c.user_id)
+        .where(
+            user_courses.c.course_id == course_id,
+            User.usertype_id == user_types.id(STUDENT),
+        )
+    ).all()
+    standard_ids = db.session.scalars(
+        select(course_standards.c.standard_id).where(
+            course_standards.c.course_id == course_id
+        )
+    ).all()
+
+    db.session.execute(
+        delete(status_table).where(status_table.c.course_id == course_id)
+    )
+    rollup.invalidate(course_ids=[course_id])
+    rows = _build_rows(
+        {
+            course_id: {
+                (user_id, standard_id)
+                for user_id in student_ids
+                for standard_id in standard_ids
+            }
+        }
+    )
+    if rows:
+        db.session.execute(insert(status_table), rows)
+    return len(rows)
+
+
+def rebuild_all():
+    """Rebuild the status table for every course. Commits when finished."""
+    db.session.execute(delete(status_table))
+    count = 0
+    for course_id in db.session.scalars(select(Course.id)).all():
+        count += rebuild_course(course_id)
+    db.session.commit()
+    return count
+
+
+def load_statuses(course, students, standards) -> dict:
+    """
+    Read stored status rows for a roster in a course in one query.
+
+    Returns a dict keyed by (user_id, standard_id). Any missing rows are
+    calculated, stored and committed before returning.
+    """
+    course_id = getattr(course, "id", course)
+    user_ids = _ids(students)
+    standard_ids = _ids(standards)
+    if not user_ids or not standard_ids:
+        return {}
+
+    def read():
+        rows = db.session.scalars(
+            select(StudentStandardStatus).where(
+                StudentStandardStatus.course_id == course_id,
+                StudentStandardStatus.user_id.in_(user_ids),
+                StudentStandardStatus.standard_id.in_(standard_ids),
+            )
+        )
+        return {(row.user_id, row.standard_id): row for row in rows}
+
+    statuses = read()
+    missing = [
+        (user_id, standard_id)
+        for user_id in user_ids
+        for standard_id in standard_ids
+        if (user_id, standard_id) not in statuses
+    ]
+    if missing:
+        # The rows are written with Core statements, so nothing the caller
+        # already loaded changes. Keep it loaded instead of expiring it, or
+        # rendering the roster reloads every student one at a time.
+        session = db.session()
+        expire_on_commit = session.expire_on_commit
+        session.expire_on_commit = False
+        try:
+            _write_rows(course_id, missing)
+            session.commit()
+        except IntegrityError:
+            # Another request filled the same rows first.
+            session.rollback()
+        finally:
+            session.expire_on_commit = expire_on_commit
+        statuses = read()
+
+    return statuses
+
+
+def proficiency_counts(course, students, standards) -> dict:
+    """
+    Count proficient and not proficient students on each standard as
+    {standard_id: {"proficient": n, "not_proficient": n}}.
+
+    The counts come from one grouped query, so no status rows are loaded.
+    When rows are missing they are built by `load_statuses` first.
+    """
+    course_id = getattr(course, "id", course)
+    user_ids = _ids(students)
+    standard_ids = _ids(standards)
+    if not standard_ids:
+        return {}
+
+    def read():
+        rows = db.session.execute(
+            select(
+                status_table.c.standard_id,
+                func.count(),
+                func.sum(case((status_table.c.proficient, 1), else_=0)),
+            )
+            .where(
+                status_table.c.course_id == course_id,
+                status_table.c.user_id.in_(user_ids),
+                status_table.c.standard_id.in_(standard_ids),
+            )
+            .group_by(status_table.c.standard_id)
+        )
+        return {
+            standard_id: (count, proficient) for standard_id, count, proficient in rows
+        }
+
+    counts = read() if user_ids else {}
+    if any(
+        counts.get(standard_id, (0, 0))[0] < len(user_ids)
+        for standard_id in standard_ids
+    ):
+        # Count the rows that had to be built instead of reading them again
+        statuses = load_statuses(course_id, user_ids, standard_ids)
+        return {
+            standard_id: summarize(statuses, user_ids, standard_id)
+            for standard_id in standard_ids
+        }
+
+    results = {}
+    for standard_id in standard_ids:
+        proficient = counts.get(standard_id, (0, 0))[1] or 0
+        results[standard_id] = {
+            "proficient": proficient,
+            "not_proficient": len(user_ids) - proficient,
+        }
+    return results
+
+
+def summarize(statuses, students, standard_id) -> dict:
+    """
+    Count proficient and not proficient students on a standard from the
+    rows returned by `load_statuses`.
+    """
+    student_ids = _ids(students)
+    count = sum(
+        1
+        for user_id in student_ids
+        if statuses.get((user_id, standard_id))
+        and statuses[(user_id, standard_id)].proficient
+    )
+    return {"proficient": count, "not_proficient": len(student_ids) - count}
+
+
+# Session hooks
+# Track what changed while the session is flushing and recalculate once the
+# flush has been written so the engine sees the new attempts.
+
+
+def _pending(session, key):
+    return session.info.setdefault(key, set())
+
+
+def _attempt_pairs(attempt):
+    pairs = {(attempt.user_id, attempt.standard_id)}
+
+    # Moving an attempt to another student or standard changes the old pair too
+    state = inspect(attempt)
+    old_users = state.attrs.user_id.history.deleted or [attempt.user_id]
+    old_standards = state.attrs.standard_id.history.deleted or [attempt.standard_id]
+    pairs.update(
+        (user_id, standard_id) for user_id in old_users for standard_id in old_standards
+    )
+    return pairs
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_attempts(session, flush_context):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, StandardAttempt):
+            _pending(session, "status_pairs").update(_attempt_pairs(obj))
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _apply_pending(session, flush_context):
+    stale_courses = session.info.pop("status_stale_courses", set())
+    stale_assignments = session.info.pop("status_stale_assignments", set())
+    stale_standards = session.info.pop("status_stale_standards", set())
+    pairs = session.info.pop("status_pairs", set())
+
+    if stale_assignments:
+        stale_standards.update(
+            db.session.scalars(
+                select(assignment_standards.c.standard_id).where(
+                    assignment_standards.c.assignment_id.in_(stale_assignments)
+                )
+            )
+        )
+    stale_courses.discard(None)
+    stale_standards.discard(None)
+    if stale_courses or stale_standards:
+        invalidate(course_ids=stale_courses, standard_ids=stale_standards)
+    if pairs:
+        refresh(pairs)
+
+
+def _session_for(target):
+    return Session.object_session(target) or db.session()
+
+
+@event.listens_for(User.proficiencies, "append")
+@event.listens_for(User.proficiencies, "remove")
+def _override_changed(user, standard, initiator):
+    # Also fires for changes made through the `Standard.students` backref
+    _pending(_session_for(user), "status_pairs").add((user.id, standard.id))
+
+
+@event.listens_for(Course.assignments, "append")
+@event.listens_for(Course.assignments, "remove")
+def _course_assignments_changed(course, assignment, initiator):
+    _pending(_session_for(course), "status_stale_courses").add(course.id)
+
+
+@event.listens_for(Course.standards, "append")
+@event.listens_for(Course.standards, "remove")
+def _course_standards_changed(course, standard, initiator):
+    # Also fires for changes made through the `Standard.standards` backref
+    _pending(_session_for(course), "status_stale_courses").add(course.id)
+
+
+@event.listens_for(Assignment.alignments, "append")
+@event.listens_for(Assignment.alignments, "remove")
+def _alignments_changed(assignment, standard, initiator):
+    _pending(_session_for(assignment), "status_stale_standards").add(standard.id)
+
+
+@event.listens_for(Assignment.assignmenttype_id, "set")
+def _assignment_type_changed(assignment, value, oldvalue, initiator):
+    if assignment.id is not None and value != oldvalue:
+        _pending(_session_for(assignment), "status_stale_assignments").add(
+            assignment.id
+        )
@@ -0,0 +1,345 @@
+"""
+Generate a school district worth of fake gradebook data.
+
+The fixtures in `tests/fixtures` are a handful of rows, which hides how pages
+scale. `District` describes a configurable district: teachers and courses,
+students enrolled in several courses each, standards shared between courses,
+classwork and assessments aligned to those standards and a semester of
+attempts. The same seed always produces the same data.
+
+Rows are produced in the fixture format used by `tests.loader.Loader`
+({"table": name, "records": [...]}), a chunk at a time, so very large
+districts never sit in memory. `load` inserts them with one executemany per
+chunk. Ids are assigned up front, so the database must be empty.
+
+    flask generate-district --courses 200 --students 35 --standards 300
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from feedbook.extensions import db
+
+CHUNK_SIZE = 10000
+
+# Tables in the order they need to be loaded
+TABLES = [
+    "user_type",
+    "assignment_type",
+    "user",
+    "course",
+    "user_courses",
+    "standard",
+    "course_standards",
+    "assignment",
+    "course_assignments",
+    "assignment_standards",
+    "standard_attempt",
+    "user_standards",
+]
+
+
+class District:
+    """
+    Describe a district to generate.
+
+    - courses: number of courses
+    - students_per_course: students enrolled in each course
+    - courses_per_student: courses each student is enrolled in. Students
+      overlap between courses, so there are
+      courses * students_per_course / courses_per_student students.
+    - courses_per_teacher: courses each teacher teaches
+    - standards: standards in the district, shared between courses
+    - standards_per_course: standards aligned to each course
+    - assignments_per_course: assignments in each course, spread over the
+      semester
+    - assessment_share: fraction of assignments that are assessments
+    - attempt_rate: chance a student has a score for each standard on an
+      assignment
+    - start, weeks: when the semester starts and how long it runs
+    - password: password for every teacher account, if any
+    """
+
+    def __init__(
+        self,
+        courses=10,
+        students_per_course=30,
+        courses_per_student=4,
+        courses_per_teacher=5,
+        standards=50,
+        standards_per_course=12,
+        assignments_per_course=20,
+        assessment_share=0.25,
+        attempt_rate=0.9,
+        start=datetime(2024, 8, 26),
+        weeks=18,
+        password=None,
+        seed=0,
+    ):
+        if courses_per_student > courses:
+            raise ValueError("Students can't take more courses than exist")
+        if standards_per_course > standards:
+            raise ValueError("Courses can't align more standards than exist")
+
+        self.courses = courses
+        self.students_per_course = students_per_course
+        self.courses_per_student = courses_per_student
+        self.courses_per_teacher = courses_per_teacher
+        self.standards = standards
+        self.standards_per_course = standards_per_course
+        self.assignments_per_course = assignments_per_course
+        self.assessment_share = assessment_share
+        self.attempt_rate = attempt_rate
+        self.start = start
+        self.weeks = weeks
+        self.password = password
+        self.seed = seed
+
+        self.teacher_count = -(-courses // courses_per_teacher)
+        self.student_count = courses * students_per_course // courses_per_student
+
+    @property
+    def expected_attempts(self) -> int:
+        """
+        Roughly how many attempts the district will have.
+        """
+        # Each assignment is aligned to two standards on average
+        return int(
+            self.courses
+            * self.students_per_course
+            * self.assignments_per_course
+            * 2
+            * self.attempt_rate
+        )
+
+    def _plan(self, rng):
+        """
+        Decide which students, standards and assignments belong to each
+        course. Returns a list with a dict for each course.
+        """
+        first_student = self.teacher_count + 1
+
+        # Spacing the courses a student takes evenly around the list gives
+        # every course the same number of students.
+        step = self.courses // self.courses_per_student
+        order = list(range(self.courses))
+        rng.shuffle(order)
+        rosters = [[] for _ in range(self.courses)]
+        for student in range(self.student_count):
+            for j in range(self.courses_per_student):
+                course = order[(student + j * step) % self.courses]
+                rosters[course].append(first_student + student)
+
+        plan = []
+        assignment_id = 0
+        for course in range(self.courses):
+            standards = sorted(
+                rng.sample(range(1, self.standards + 1), self.standards_per_course)
+            )
+            assignments = []
+            for i in range(self.assignments_per_course):
+                assignment_id += 1
+                count = min(rng.choice((1, 2, 2, 3)), len(standards))
+                aligned = rng.sample(standards, count)
+                assignments.append(
+                    {
+                        "id": assignment_id,
+                        "assessment": rng.random() < self.assessment_share,
+                        # Assignments are spread evenly through the semester
+                        "progress": (i + 1) / self.assignments_per_course,
+                        "standards": aligned,
+                    }
+                )
+
+            plan.append(
+                {
+                    "id": course + 1,
+                    "teacher": course // self.courses_per_teacher + 1,
+                    "students": rosters[course],
+                    "standards": standards,
+                    "assignments": assignments,
+                }
+            )
+
+        return plan
+
+    def _users(self):
+        password_hash = generate_password_hash(self.password) if self.password else None
+        for teacher in range(1, self.teacher_count + 1):
+            yield {
+                "id": teacher,
+                "first_name": "Teacher",
+                "last_name": f"{teacher:05}",
+                "email": f"teacher{teacher}@example.com",
+                "password_hash": password_hash,
+                "usertype_id": 1,
+                "active": True,
+            }
+        for student in range(1, self.student_count + 1):
+            yield {
+                "id": self.teacher_count + student,
+                "first_name": "Student",
+                "last_name": f"{student:06}",
+                "email": f"student{student}@example.com",
+                "password_hash": None,
+                "usertype_id": 2,
+                "active": True,
+            }
+
+    def _attempts(self, plan, rng, overrides):
+        # Each student gets a fixed ability so their scores are consistent
+        abilities = {}
+        attempt_id = 0
+
+        for course in plan:
+            for assignment in course["assignments"]:
+                day = self.start + timedelta(weeks=self.weeks * assignment["progress"])
+                name = f"Assignment {assignment['id']}"
+
+                for student in course["students"]:
+                    ability = abilities.setdefault(student, rng.uniform(0.3, 0.95))
+                    # Students improve over the semester
+                    chance = ability * (0.6 + 0.4 * assignment["progress"])
+
+                    for standard in assignment["standards"]:
+                        if rng.random() >= self.attempt_rate:
+                            continue
+
+                        # Classwork and assessments share the 0-2 scale, so
+                        # standards without an assessment can be mastered too
+                        if rng.random() < chance:
+                            score = 2 if rng.random() < chance else 1
+                        else:
+                            score = 0
+                        if score == 2 and assignment["assessment"]:
+                            overrides.add((student, standard))
+
+                        attempt_id += 1
+                        yield {
+                            "id": attempt_id,
+                            "user_id": student,
+                            "standard_id": standard,
+                            "score": score,
+                            "occurred": day
+                            + timedelta(
+                                days=rng.randint(0, 3), minutes=rng.randint(0, 480)
+                            ),
+                            "assignment": name,
+                            "assignment_id": assignment["id"],
+                            "comments": None,
+                        }
+
+    def rows(self):
+        """
+        Yield (table, record) for every row in the district in load order.
+        """
+        rng = random.Random(self.seed)
+        plan = self._plan(rng)
+
+        yield from [
+            ("user_type", {"id": 1, "name": "Teacher"}),
+            ("user_type", {"id": 2, "name": "Student"}),
+            ("assignment_type", {"id": 1, "name": "Classwork"}),
+            ("assignment_type", {"id": 2, "name": "Assessment"}),
+        ]
+
+        for user in self._users():
+            yield "user", user
+
+        for course in plan:
+            yield "course", {
+                "id": course["id"],
+                "name": f"Course {course['id']}",
+                "active": True,
+                "created_on": self.start,
+            }
+
+        # Teachers are enrolled in the courses they teach
+        for course in plan:
+            yield "user_courses", {
+                "user_id": course["teacher"],
+                "course_id": course["id"],
+            }
+            for student in course["students"]:
+                yield "user_courses", {"user_id": student, "course_id": course["id"]}
+
+        for standard in range(1, self.standards + 1):
+            yield "standard", {
+                "id": standard,
+                "name": f"Standard {standard}",
+                "description": f"Description of standard {standard}.",
+                "display_name": f"S{standard}",
+                "active": True,
+            }
+
+        for course in plan:
+            for standard in course["standards"]:
+                yield "course_standards", {
+                    "course_id": course["id"],
+                    "standard_id": standard,
+                }
+
+        for course in plan:
+            for assignment in course["assignments"]:
+                yield "assignment", {
+                    "id": assignment["id"],
+                    "name": f"Assignment {assignment['id']}",
+                    "assignmenttype_id": 2 if assignment["assessment"] else 1,
+                    "created_on": self.start
+                    + timedelta(weeks=self.weeks * assignment["progress"]),
+                }
+
+        for course in plan:
+            for assignment in course["assignments"]:
+                yield "course_assignments", {
+                    "course_id": course["id"],
+                    "assignment_id": assignment["id"],
+                }
+
+        for course in plan:
+            for assignment in course["assignments"]:
+                for standard in assignment["standards"]:
+                    yield "assignment_standards", {
+                        "assignment_id": assignment["id"],
+                        "standard_id": standard,
+                    }
+
+        # Passing an assessment adds a proficient override, like the app does
+        overrides = set()
+        for attempt in self._attempts(plan, rng, overrides):
+            yield "standard_attempt", attempt
+
+        for user_id, standard_id in sorted(overrides):
+            yield "user_standards", {"user_id": user_id, "standard_id": standard_id}
+
+    def tables(self, chunk_size=CHUNK_SIZE):
+        """
+        Yield fixture entries ({"table": name, "records": [...]}) with at most
+        `chunk_size` records each.
+        """
+        table, records = None, []
+        for name, record in self.rows():
+            if name != table or len(records) >= chunk_size:
+                if records:
+                    yield {"table": table, "records": records}
+                table, records = name, []
+            records.append(record)
+
+        if records:
+            yield {"table": table, "records": records}
+
+
+def load(connection, district, chunk_size=CHUNK_SIZE) -> dict:
+    """
+    Insert a district with one executemany per chunk. Returns the number of
+    rows added to each table. Does not commit.
+    """
+    counts = dict.fromkeys(TABLES, 0)
+    for entry in district.tables(chunk_size):
+        table = db.metadata.tables[entry["table"]]
+        connection.execute(table.insert(), entry["records"])
+        counts[entry["table"]] += len(entry["records"])
+
+    return counts
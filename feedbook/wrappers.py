@@ -1,21 +1,104 @@
+"""
+Rendering and access helpers for views.
+
+Most views render a partial into `#detail`. htmx requests get the partial on
+its own. Full page loads (a reload or a pushed url) need the sidebar from
+`shared/layout_wrapper.html` around it. `render_page` (or the `templated`
+decorator) picks between the two.
+
+The layout only changes with the user's type and their active courses, so it
+is rendered once for each of those and kept in a per-app cache as the markup
+before and after `#detail`. Users with the same courses share an entry. The
+cache holds the `LAYOUT_CACHE_SIZE` (128 by default) most recently used
+layouts. Full page loads only render the partial.
+"""
+
+from collections import OrderedDict
 from functools import wraps
-from flask import abort, request, render_template
+from flask import abort, current_app, request, render_template
 from flask_login import current_user
+from markupsafe import Markup
+
+from feedbook.static import icons as _icons
+
+LAYOUT = "shared/layout_wrapper.html"
+LAYOUT_CACHE_SIZE = 128
+
+# Icons used by the layout, built once
+ICONS = {
+    "add": _icons.add,
+    "admin": _icons.admin,
+    "home": _icons.home,
+    "logout": _icons.logout,
+}
+
+# Stands in for the partial while the layout is rendered
+_SLOT = "<!-- detail -->"
+
+
+def _layout_version():
+    """
+    What the rendered layout depends on for the current user.
+    """
+    if current_user.is_anonymous:
+        return None
+    courses = tuple((course.id, course.name) for course in current_user.active_courses)
+    return current_user.is_teacher, courses
+
+
+def layout_shell():
+    """
+    The layout as (before, after) the `#detail` contents, rendered once for
+    each user type and course list.
+    """
+    cache = current_app.extensions.setdefault("layout_shells", OrderedDict())
+    size = current_app.config.get("LAYOUT_CACHE_SIZE", LAYOUT_CACHE_SIZE)
+    version = _layout_version()
+
+    cached = cache.get(version)
+    if cached is None:
+        html = render_template(LAYOUT, content=Markup(_SLOT), icons=ICONS)
+        cached = tuple(html.split(_SLOT, 1))
+        cache[version] = cached
+        while len(cache) > size:
+            cache.popitem(last=False)
+    else:
+        try:
+            cache.move_to_end(version)
+        except KeyError:
+            # Evicted by another thread since the lookup
+            pass
+
+    return cached
+
+
+def render_page(template, **ctx):
+    """
+    Render `template` on its own for htmx requests, or inside the layout for
+    full page loads.
+    """
+    if request.htmx:
+        return render_template(template, **ctx)
+
+    before, after = layout_shell()
+    return before + render_template(template, icons=ICONS, **ctx) + after
 
 
 def templated(template=None):
+    """
+    Render the dict returned by the view with `render_page`. Anything else
+    the view returns is passed through.
+    """
+
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            template_name = template
             ctx = f(*args, **kwargs)
-            if request.htmx:
-                resp = render_template(template_name, **ctx)
-            else:
-                resp = render_template(
-                    "shared/layout_wrapper.html", partial=template_name, data=ctx
-                )
-            return resp
+            if ctx is None:
+                ctx = {}
+            elif not isinstance(ctx, dict):
+                return ctx
+            return render_page(template, **ctx)
 
         return decorated_function
 
@@ -27,7 +110,7 @@ def restricted(func):
     def __restricted(*args, **kwargs):
         if current_user.is_anonymous:
             abort(401)
-        if current_user.usertype_id == 2:
+        if current_user.is_student:
             abort(403)
         return func(*args, **kwargs)
 
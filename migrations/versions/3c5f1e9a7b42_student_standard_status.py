@@ -0,0 +1,67 @@
+"""student standard status
+
+Revision ID: 3c5f1e9a7b42
+Revises: b5bb7d12e37d
+Create Date: 2026-10-18 09:12:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3c5f1e9a7b42"
+down_revision = "b5bb7d12e37d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "student_standard_status",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("standard_id", sa.Integer(), nullable=False),
+        sa.Column("course_id", sa.Integer(), nullable=False),
+        sa.Column("count_0", sa.Integer(), nullable=True),
+        sa.Column("count_1", sa.Integer(), nullable=True),
+        sa.Column("count_2", sa.Integer(), nullable=True),
+        sa.Column("max_score", sa.Integer(), nullable=True),
+        sa.Column("last_score", sa.Integer(), nullable=True),
+        sa.Column("has_assessment_pass", sa.Boolean(), nullable=True),
+        sa.Column("has_override", sa.Boolean(), nullable=True),
+        sa.Column("proficient", sa.Boolean(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["course_id"], ["course.id"], onupdate="CASCADE", ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(
+            ["standard_id"], ["standard.id"], onupdate="CASCADE", ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(
+            ["user_id"], ["user.id"], onupdate="CASCADE", ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "user_id",
+            "standard_id",
+            "course_id",
+            name="uq_student_standard_status_user_standard_course",
+        ),
+    )
+    with op.batch_alter_table("student_standard_status", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_student_standard_status_course_standard",
+            ["course_id", "standard_id"],
+            unique=False,
+        )
+
+    # Rows are filled in as they are read. Run `flask rebuild-status` to
+    # build the whole table at once.
+
+
+def downgrade():
+    with op.batch_alter_table("student_standard_status", schema=None) as batch_op:
+        batch_op.drop_index("ix_student_standard_status_course_standard")
+
+    op.drop_table("student_standard_status")
@@ -0,0 +1,42 @@
+"""assignment name index with the C collation on postgresql
+
+Revision ID: 3f7d9a1c5e42
+Revises: 8c1f4b6d2e95
+Create Date: 2026-10-18 19:05:37.512840
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3f7d9a1c5e42"
+down_revision = "8c1f4b6d2e95"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Range scans on the index compare code points, so PostgreSQL needs the
+    # "C" collation. SQLite already compares that way.
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.drop_index("ix_assignment_lower_name", table_name="assignment")
+    op.create_index(
+        "ix_assignment_lower_name",
+        "assignment",
+        [sa.text('lower(name) COLLATE "C"')],
+        unique=False,
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.drop_index("ix_assignment_lower_name", table_name="assignment")
+    op.create_index(
+        "ix_assignment_lower_name", "assignment", [sa.text("lower(name)")], unique=False
+    )
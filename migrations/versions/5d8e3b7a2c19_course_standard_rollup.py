@@ -0,0 +1,48 @@
+"""course standard rollup
+
+Revision ID: 5d8e3b7a2c19
+Revises: a41c6d2f9e83
+Create Date: 2026-10-18 14:02:17.530118
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5d8e3b7a2c19"
+down_revision = "a41c6d2f9e83"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "course_standard_rollup",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("course_id", sa.Integer(), nullable=False),
+        sa.Column("standard_id", sa.Integer(), nullable=True),
+        sa.Column("students", sa.Integer(), nullable=True),
+        sa.Column("proficient", sa.Integer(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["course_id"], ["course.id"], onupdate="CASCADE", ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(
+            ["standard_id"], ["standard.id"], onupdate="CASCADE", ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "course_id",
+            "standard_id",
+            name="uq_course_standard_rollup_course_standard",
+        ),
+    )
+
+    # Rows are built as the admin panel reads them. Run `flask refresh-rollup`
+    # to build the whole table at once.
+
+
+def downgrade():
+    op.drop_table("course_standard_rollup")
@@ -0,0 +1,81 @@
+"""composite indexes and unique pairs
+
+Revision ID: 7e2b9d4c1a60
+Revises: 3c5f1e9a7b42
+Create Date: 2026-10-18 10:02:17.530911
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "7e2b9d4c1a60"
+down_revision = "3c5f1e9a7b42"
+branch_labels = None
+depends_on = None
+
+# table: (first column, second column)
+# The unique constraint covers lookups from the first column and the extra
+# index covers lookups from the second. See the index plan in models.py.
+pairs = {
+    "assignment_standards": ("assignment_id", "standard_id"),
+    "course_standards": ("course_id", "standard_id"),
+    "course_assignments": ("course_id", "assignment_id"),
+    "user_courses": ("user_id", "course_id"),
+    "user_standards": ("user_id", "standard_id"),
+}
+
+
+def _constraint_name(table, first, second):
+    return "uq_{}_{}_{}".format(
+        table, first.replace("_id", ""), second.replace("_id", "")
+    )
+
+
+def upgrade():
+    # Remove duplicate pairs before adding the unique constraints. The oldest
+    # row (lowest id) for each pair is kept.
+    for table, (first, second) in pairs.items():
+        op.execute(
+            sa.text(
+                f"DELETE FROM {table} WHERE id NOT IN "
+                f"(SELECT MIN(id) FROM {table} GROUP BY {first}, {second})"
+            )
+        )
+
+    for table, (first, second) in pairs.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_unique_constraint(
+                _constraint_name(table, first, second), [first, second]
+            )
+            batch_op.create_index(f"ix_{table}_{second}", [second], unique=False)
+
+    with op.batch_alter_table("standard_attempt", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_standard_attempt_user_standard_occurred",
+            ["user_id", "standard_id", "occurred"],
+            unique=False,
+        )
+        batch_op.create_index(
+            "ix_standard_attempt_standard_assignment",
+            ["standard_id", "assignment_id"],
+            unique=False,
+        )
+        batch_op.create_index(
+            "ix_standard_attempt_assignment_id", ["assignment_id"], unique=False
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("standard_attempt", schema=None) as batch_op:
+        batch_op.drop_index("ix_standard_attempt_assignment_id")
+        batch_op.drop_index("ix_standard_attempt_standard_assignment")
+        batch_op.drop_index("ix_standard_attempt_user_standard_occurred")
+
+    for table, (first, second) in pairs.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f"ix_{table}_{second}")
+            batch_op.drop_constraint(
+                _constraint_name(table, first, second), type_="unique"
+            )
@@ -0,0 +1,26 @@
+"""assignment name search index
+
+Revision ID: 8c1f4b6d2e95
+Revises: e6a4c2f81b37
+Create Date: 2026-10-18 17:42:11.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8c1f4b6d2e95"
+down_revision = "e6a4c2f81b37"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_assignment_lower_name", "assignment", [sa.text("lower(name)")], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index("ix_assignment_lower_name", table_name="assignment")
@@ -0,0 +1,34 @@
+"""idempotency key on attempts
+
+Revision ID: a41c6d2f9e83
+Revises: 7e2b9d4c1a60
+Create Date: 2026-10-18 11:26:40.118274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a41c6d2f9e83"
+down_revision = "7e2b9d4c1a60"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("standard_attempt", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("idempotency_key", sa.String(length=64), nullable=True)
+        )
+        batch_op.create_index(
+            batch_op.f("ix_standard_attempt_idempotency_key"),
+            ["idempotency_key"],
+            unique=True,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("standard_attempt", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_standard_attempt_idempotency_key"))
+        batch_op.drop_column("idempotency_key")
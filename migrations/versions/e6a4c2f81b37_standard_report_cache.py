@@ -0,0 +1,38 @@
+"""standard report cache
+
+Revision ID: e6a4c2f81b37
+Revises: 5d8e3b7a2c19
+Create Date: 2026-10-18 15:20:44.902316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e6a4c2f81b37"
+down_revision = "5d8e3b7a2c19"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "standard_report",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("standard_id", sa.Integer(), nullable=False),
+        sa.Column("bucket", sa.String(length=16), nullable=False),
+        sa.Column("data", sa.Text(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["standard_id"], ["standard.id"], onupdate="CASCADE", ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "standard_id", "bucket", name="uq_standard_report_standard_bucket"
+        ),
+    )
+
+
+def downgrade():
+    op.drop_table("standard_report")
@@ -43,6 +43,16 @@ class Loader(object):
             # Reset fixtures back to None
             self.fixtures = None
 
+    def load_district(self, **options):
+        """
+        Load a generated district instead of fixture files. Takes the options for `feedbook.synthetic.District` and returns the district. The database must be empty.
+        """
+        from feedbook.synthetic import District, load
+
+        district = District(**options)
+        load(self.connection, district)
+        return district
+
     def load_from_file(self):
         for entry in self.data:
             table = Table(entry["table"], self.metadata)
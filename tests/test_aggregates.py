@@ -0,0 +1,55 @@
+from feedbook.extensions import db
+
+from tests.loader import Loader
+from tests.utils import TestBase
+from feedbook.aggregates import assignment_averages, standard_averages
+from feedbook.models import Assignment, Course
+
+
+class TestAggregates(TestBase):
+    def setUp(self):
+        self.app = self.create()
+
+        # Set up the application context manually to build the database
+        # and test client for requests.
+        ctx = self.app.app_context()
+        ctx.push()
+        fixtures = [
+            "assignments.json",
+            "courses.json",
+            "course_enrollments.json",
+            "standards.json",
+            "standard_assessments.json",
+            "users.json",
+        ]
+
+        # Now that we're in context, we can load the database.
+        self.loader = Loader(self.app, db, fixtures)
+        self.loader.load()
+
+    def tearDown(self):
+        db.drop_all()
+        db.session.close()
+
+    def test_assignment_averages(self):
+        averages = assignment_averages(db.session.get(Course, 1))
+
+        self.assertEqual(averages[1].average, 0.67)
+        self.assertEqual(averages[1].count, 3)
+
+    def test_assignment_averages_other_course(self):
+        self.assertEqual(assignment_averages(db.session.get(Course, 2)), {})
+
+    def test_standard_averages(self):
+        averages = standard_averages(1, [1, 2])
+
+        self.assertEqual(list(averages.keys()), [1])
+        self.assertEqual(averages[1].average, 0.67)
+
+    def test_model_methods(self):
+        assignment = db.session.get(Assignment, 1)
+        course = db.session.get(Course, 1)
+
+        self.assertEqual(assignment.course_average(course), 0.67)
+        self.assertEqual(assignment.average_all(), 0.67)
+        self.assertIsNone(assignment.course_average(db.session.get(Course, 2)))
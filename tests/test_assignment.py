@@ -1,8 +1,15 @@
+from ast import literal_eval
+
+from sqlalchemy import create_mock_engine
+from sqlalchemy.dialects import postgresql
+
+from feedbook import lookups
 from feedbook.extensions import db
 
 from tests.loader import Loader
 from tests.utils import TestBase, captured_templates, get_template_context
 from feedbook.models import Assignment, Course, StandardAttempt
+from feedbook.profiling import record_queries
 
 
 class TestUserModel(TestBase):
@@ -55,6 +62,65 @@ class TestUserModel(TestBase):
 
         self.assertEqual(course_average, 0.67)
 
+    def test_search(self):
+        db.session.add_all(
+            Assignment(name=name) for name in ["Quiz 2", "quiz 1", "Lab 50%"]
+        )
+        db.session.commit()
+
+        # Sorted by the lowercase name, like the index
+        page = Assignment.search("QUIZ")
+        self.assertEqual([item.name for item in page.items], ["quiz 1", "Quiz 2"])
+        self.assertEqual(Assignment.search("lab 50%").total, 1)
+        self.assertEqual(Assignment.search("%").total, 0)
+
+    def test_search_uses_name_index(self):
+        with record_queries() as log:
+            Assignment.search("quiz")
+
+        # Explain the statement which reads the page of items
+        items = next(query for query in log.queries if "LIMIT" in query.statement)
+        plan = " ".join(
+            row[-1]
+            for row in db.session.connection().exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {items.statement}",
+                literal_eval(items.parameters),
+            )
+        )
+
+        self.assertIn("USING INDEX ix_assignment_lower_name", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_search_on_postgresql_compares_code_points(self):
+        query = Assignment.search_query("Quiz", "postgresql")
+        compiled = query.compile(dialect=postgresql.dialect())
+
+        self.assertIn('(lower(assignment.name) COLLATE "C") >=', str(compiled))
+        self.assertIn('(lower(assignment.name) COLLATE "C") <', str(compiled))
+        self.assertIn('ORDER BY lower(assignment.name) COLLATE "C"', str(compiled))
+        self.assertEqual(compiled.params, {"param_1": "quiz", "param_2": "qui{"})
+
+        # The index is built with the same collation there, once
+        statements = []
+        engine = create_mock_engine(
+            "postgresql://",
+            lambda sql, *args, **kwargs: statements.append(
+                str(sql.compile(dialect=engine.dialect))
+            ),
+        )
+        Assignment.__table__.create(engine)
+        indexes = [sql for sql in statements if sql.startswith("CREATE INDEX")]
+        self.assertEqual(len(indexes), 1)
+        self.assertIn('lower(name) COLLATE "C"', indexes[0])
+
+    def test_search_pages(self):
+        db.session.add_all(Assignment(name=f"Quiz {i}") for i in range(5))
+        db.session.commit()
+
+        page = Assignment.search("quiz", per_page=2)
+        self.assertEqual(page.total, 5)
+        self.assertTrue(page.has_next)
+
 
 class TestAssignmentBlueprint(TestBase):
     def setUp(self):
@@ -92,6 +158,18 @@ class TestAssignmentBlueprint(TestBase):
 
         self.assertEqual(resp.status_code, 200)
 
+    def test_assignment_types_come_from_lookups(self):
+        lookups.load()
+        db.session.expunge_all()
+
+        with record_queries() as log:
+            resp = self.client.get("/assignments")
+
+        self.assertIn("<td>Classwork</td>", resp.text)
+        self.assertFalse(
+            any("FROM assignment_type" in query.statement for query in log.queries)
+        )
+
     def test_create_assignment(self):
         self.login("teacher@example.com")
         data = {
@@ -113,6 +191,54 @@ class TestAssignmentBlueprint(TestBase):
             self.assertIsInstance(context["assignment"], Assignment)
             self.assertIsInstance(context["course"], Course)
 
+    def test_search_assignments(self):
+        self.login("teacher@example.com")
+        db.session.add(Assignment(name="Another assignment"))
+        db.session.commit()
+
+        with captured_templates(self.app) as templates:
+            resp = self.client.get("/assignments/search?q=ano")
+            self.assertEqual(resp.status_code, 200)
+
+            context = get_template_context(
+                templates, "assignments/assignment-options.html"
+            )
+            self.assertEqual(
+                [item.name for item in context["assignments"]], ["Another assignment"]
+            )
+            self.assertFalse(context["more"])
+
+    def test_empty_search_lists_course_assignments(self):
+        self.login("teacher@example.com")
+        db.session.add(Assignment(name="Another assignment"))
+        db.session.commit()
+
+        resp = self.client.get("/assignments/search?course_id=1")
+
+        self.assertIn("Assignment 1", resp.text)
+        self.assertNotIn("Another assignment", resp.text)
+
+    def test_empty_search_requires_enrollment(self):
+        self.login("teacher@example.com")
+        course = Course(name="Another course")
+        db.session.add(course)
+        db.session.commit()
+
+        resp = self.client.get(f"/assignments/search?course_id={course.id}")
+
+        self.assertEqual(resp.status_code, 401)
+
+    def test_empty_search_lists_attempt_choices(self):
+        self.login("teacher@example.com")
+        attempt = StandardAttempt(user_id=2, assignment_id=1, standard_id=1, score=1)
+        db.session.add_all([attempt, Assignment(name="Another assignment")])
+        db.session.commit()
+
+        resp = self.client.get(f"/assignments/search?attempt_id={attempt.id}")
+
+        self.assertIn("Assignment 1", resp.text)
+        self.assertNotIn("Another assignment", resp.text)
+
     def test_get_create_assignment_form(self):
         self.login("teacher@example.com")
 
@@ -143,8 +269,6 @@ class TestAssignmentBlueprint(TestBase):
             self.assertEqual(context["assignment"].name, "Assignment 1")
 
     def test_get_assignment_edit_form(self):
-        from feedbook.models import AssignmentType
-
         self.login("teacher@example.com")
 
         with captured_templates(self.app) as templates:
@@ -159,7 +283,10 @@ class TestAssignmentBlueprint(TestBase):
             self.assertIsInstance(context["assignment"], Assignment)
             self.assertEqual(context["assignment"].name, "Assignment 1")
             self.assertIsInstance(context["types"], list)
-            self.assertIsInstance(context["types"][0], AssignmentType)
+            self.assertEqual(
+                [(type.id, type.name) for type in context["types"]],
+                [(1, "Classwork"), (2, "Assessment")],
+            )
 
     def test_edit_assignment(self):
         self.login("teacher@example.com")
@@ -192,6 +319,17 @@ class TestAssignmentBlueprint(TestBase):
         self.assertEqual(resp.status_code, 200)
         self.assertTrue(resp.headers["HX-Trigger"])
 
+    def test_create_standard_alignment_skips_existing(self):
+        self.login("teacher@example.com")
+
+        data = {"standards": [1, 2, 99]}
+        self.client.post("/assignments/1/align", data=data)
+        resp = self.client.post("/assignments/1/align", data=data)
+
+        self.assertEqual(resp.status_code, 200)
+        alignments = db.session.get(Assignment, 1).alignments.all()
+        self.assertEqual(sorted(s.id for s in alignments), [1, 2])
+
     def test_remove_standard_alignment(self):
         self.login("teacher@example.com")
         resp = self.client.delete("/assignments/1/align/1")
@@ -0,0 +1,83 @@
+from unittest import TestCase
+
+from sqlalchemy.exc import IntegrityError
+
+from feedbook.extensions import db
+
+from tests.loader import Loader
+from tests.utils import TestBase
+from feedbook.attempts import add_attempt, parse_grid, GridError
+from feedbook.models import Course, StandardAttempt
+
+
+class TestParseGrid(TestCase):
+    def test_skips_blank_scores(self):
+        entries = parse_grid([2, 3], [1, 1], ["2", " "], ["Nice ", "x"])
+
+        self.assertEqual(
+            entries,
+            [{"user_id": 2, "standard_id": 1, "score": 2, "comments": "Nice"}],
+        )
+
+    def test_invalid_scores(self):
+        with self.assertRaises(GridError) as e:
+            parse_grid([2, 3], [1, 1], ["3", "a"])
+
+        self.assertEqual(len(e.exception.errors), 2)
+
+    def test_mismatched_lists(self):
+        with self.assertRaises(GridError):
+            parse_grid([2, 3], [1], ["1", "1"])
+
+
+class TestAddAttempt(TestBase):
+    def setUp(self):
+        self.app = self.create()
+
+        # Set up the application context manually to build the database
+        # and test client for requests.
+        ctx = self.app.app_context()
+        ctx.push()
+        fixtures = [
+            "assignments.json",
+            "assignment_types.json",
+            "courses.json",
+            "standards.json",
+            "standard_assessments.json",
+            "usertype.json",
+            "users.json",
+        ]
+
+        # Now that we're in context, we can load the database.
+        self.loader = Loader(self.app, db, fixtures)
+        self.loader.load()
+
+    def tearDown(self):
+        db.drop_all()
+        db.session.close()
+
+    def values(self, **values):
+        return dict(dict(user_id=2, standard_id=1, score=1, assignment_id=1), **values)
+
+    def test_stored_key_is_returned(self):
+        attempt, created = add_attempt(key="abc", **self.values())
+        retry, retried = add_attempt(key="abc", **self.values(score=2))
+
+        self.assertTrue(created)
+        self.assertFalse(retried)
+        self.assertIs(retry, attempt)
+
+    def test_other_errors_keep_the_session(self):
+        course = Course(name="Kept")
+        db.session.add(course)
+        db.session.flush()
+
+        # The id is taken, so the insert fails without a stored key
+        with self.assertRaises(IntegrityError):
+            add_attempt(key="abc", **self.values(id=1))
+
+        db.session.commit()
+        self.assertIsNotNone(db.session.get(Course, course.id))
+        self.assertEqual(
+            StandardAttempt.query.filter_by(idempotency_key="abc").count(), 0
+        )
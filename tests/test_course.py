@@ -2,7 +2,7 @@ from feedbook.extensions import db
 
 from tests.loader import Loader
 from tests.utils import TestBase, captured_templates, get_template_context
-from feedbook.models import Course
+from feedbook.models import Course, StandardAttempt, User
 
 
 class TestCourseModel(TestBase):
@@ -38,6 +38,45 @@ class TestCourseModel(TestBase):
         c.align(s)
         self.assertEqual(len(c.standards.all()), 1)
 
+    def test_align_many_skips_existing(self):
+        c = db.session.get(Course, 1)
+        c.align_many([1])
+
+        self.assertEqual(c.align_many([1, 2, 2]), 1)
+        self.assertEqual(c.align_many([1, 2]), 0)
+        self.assertEqual(c.standards.count(), 2)
+
+    def test_available_standards(self):
+        from feedbook.models import Standard
+
+        c = db.session.get(Course, 1)
+        c.align_many([1])
+        db.session.get(Standard, 3).active = False
+
+        page = c.available_standards()
+        self.assertEqual([standard.id for standard in page.items], [2])
+        self.assertEqual(c.available_standards(search="standard 2").total, 1)
+        self.assertEqual(c.available_standards(search="%").total, 0)
+
+    def test_available_standards_pages(self):
+        c = db.session.get(Course, 1)
+
+        page = c.available_standards(per_page=2)
+        self.assertEqual(page.total, 3)
+        self.assertTrue(page.has_next)
+        self.assertEqual(len(c.available_standards(page=2, per_page=2).items), 1)
+
+    def test_enroll_many(self):
+        from feedbook.models import User
+
+        user = User(first_name="Test", last_name="Student", email="new@example.com")
+        db.session.add(user)
+
+        c = db.session.get(Course, 1)
+        self.assertEqual(c.enroll_many([user]), 1)
+        self.assertEqual(c.enroll_many([user.id]), 0)
+        self.assertTrue(user.is_enrolled(c))
+
 
 class TestCourseBlueprint(TestBase):
     def setUp(self):
@@ -125,7 +164,65 @@ class TestCourseBlueprint(TestBase):
             self.assertEqual(resp.status_code, 200)
 
             names = [template["template_name"] for template in templates]
-            self.assertIn("course/teacher-index-htmx.html", names)
+            self.assertIn("course/partials/roster-results.html", names)
+
+            context = get_template_context(
+                templates, "course/partials/roster-results.html"
+            )
+            result = context["result"]
+            self.assertEqual(result.created, 1)
+            self.assertEqual(result.enrolled, 1)
+
+    def test_post_roster_upload_again(self):
+        from io import BytesIO
+
+        self.login("teacher@example.com")
+
+        file_data = b"last_name,first_name,email,password\nExample,Student3,student3@example.com,abc123"
+
+        for _ in range(2):
+            with captured_templates(self.app) as templates:
+                resp = self.client.post(
+                    "/courses/1/upload",
+                    data={"file": (BytesIO(file_data), "test.csv")},
+                )
+                self.assertEqual(resp.status_code, 200)
+
+        context = get_template_context(templates, "course/partials/roster-results.html")
+        result = context["result"]
+        self.assertEqual(result.created, 0)
+        self.assertEqual(result.skipped, 1)
+        self.assertEqual(result.enrolled, 0)
+
+    def test_post_roster_sync_dry_run(self):
+        from io import BytesIO
+
+        self.login("teacher@example.com")
+
+        file_data = (
+            b"last_name,first_name,email\nStudent 1,Example,student1@example.com"
+        )
+
+        with captured_templates(self.app) as templates:
+            resp = self.client.post(
+                "/courses/1/upload",
+                data={
+                    "file": (BytesIO(file_data), "test.csv"),
+                    "mode": "sync",
+                    "dry_run": "true",
+                },
+            )
+            self.assertEqual(resp.status_code, 200)
+
+            context = get_template_context(
+                templates, "course/partials/roster-sync.html"
+            )
+            self.assertEqual(
+                [user.email for user in context["result"].deactivated],
+                ["student2@example.com"],
+            )
+
+        self.assertTrue(db.session.get(User, 3).active)
 
     # anonymous users are redirected to login
     def test_get_single_course_as_anonymous(self):
@@ -179,6 +276,15 @@ class TestCourseBlueprint(TestBase):
                         context["results"]["standard_1"]["not_proficient"], 2
                     )
 
+                    rows = context["assignments"]
+                    self.assertTrue(rows)
+                    dates = [row.assignment.created_on for row in rows]
+                    self.assertEqual(dates, sorted(dates, reverse=True))
+                    for row in rows:
+                        self.assertEqual(
+                            row.alignments, row.assignment.alignments.all()
+                        )
+
     def test_get_assignment_from_course(self):
         self.login("teacher@example.com")
 
@@ -189,6 +295,32 @@ class TestCourseBlueprint(TestBase):
             names = [template["template_name"] for template in templates]
             self.assertIn("assignments/assignment-detail.html", names)
 
+            context = get_template_context(
+                templates, "assignments/assignment-detail.html"
+            )
+            rows = {row.user.id: row.attempts for row in context["results"]}
+            self.assertEqual(rows, {2: {}, 3: {}})
+            self.assertEqual([standard.id for standard in context["alignments"]], [1])
+
+    def test_get_assignment_shows_first_attempt(self):
+        self.login("teacher@example.com")
+        first, second = [
+            StandardAttempt(user_id=2, standard_id=1, score=score, assignment_id=1)
+            for score in (1, 2)
+        ]
+        db.session.add_all([first, second])
+        db.session.commit()
+
+        with captured_templates(self.app) as templates:
+            self.client.get("/courses/1/assignments/1")
+
+            context = get_template_context(
+                templates, "assignments/assignment-detail.html"
+            )
+            rows = {row.user.id: row.attempts for row in context["results"]}
+            self.assertEqual(rows[2][1].id, first.id)
+            self.assertEqual(rows[3], {})
+
     def test_get_create_standard_form(self):
         self.login("teacher@example.com")
 
@@ -200,6 +332,35 @@ class TestCourseBlueprint(TestBase):
             self.assertIn("standards/standard-sidebar.html", names)
             self.assertIn("shared/forms/create-standard.html", names)
 
+            context = get_template_context(templates, "standards/standard-sidebar.html")
+            self.assertEqual([item.id for item in context["page"].items], [3])
+
+    def test_search_available_standards(self):
+        from feedbook.models import Standard
+
+        self.login("teacher@example.com")
+        db.session.add_all(
+            Standard(name=name, active=active)
+            for name, active in [("Writing", True), ("Word study", False)]
+        )
+        db.session.commit()
+
+        with captured_templates(self.app) as templates:
+            resp = self.client.get("/courses/1/standards/available?q=wr")
+            self.assertEqual(resp.status_code, 200)
+
+            context = get_template_context(
+                templates, "standards/standards-available.html"
+            )
+            self.assertEqual([item.name for item in context["page"].items], ["Writing"])
+
+    def test_available_standards_are_paged(self):
+        self.login("teacher@example.com")
+
+        resp = self.client.get("/courses/1/standards/available?page=2")
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn("Standard 3", resp.text)
+
     def test_get_course_standard_scores(self):
         self.login("teacher@example.com")
 
@@ -210,6 +371,29 @@ class TestCourseBlueprint(TestBase):
             names = [template["template_name"] for template in templates]
             self.assertIn("course/partials/standard-score-table.html", names)
 
+    def test_course_standard_scores_are_grouped(self):
+        self.login("teacher@example.com")
+        attempts = [
+            StandardAttempt(user_id=user_id, standard_id=1, score=2, assignment_id=1)
+            for user_id in (2, 3, 2)
+        ]
+        db.session.add_all(attempts)
+        db.session.commit()
+
+        with captured_templates(self.app) as templates:
+            self.client.get("/courses/1/standards/1/results")
+
+            context = get_template_context(
+                templates, "course/partials/standard-score-table.html"
+            )
+            scores = {
+                student["id"]: [attempt.id for attempt in student["scores"]]
+                for student in context["students"]
+            }
+            self.assertEqual(scores[2], [attempts[0].id, attempts[2].id])
+            self.assertEqual(scores[3], [attempts[1].id])
+            self.assertEqual(context["standard"].id, 1)
+
     def test_get_student_results(self):
         self.login("teacher@example.com")
 
@@ -247,6 +431,23 @@ class TestCourseBlueprint(TestBase):
             names = [template["template_name"] for template in templates]
             self.assertIn("standards/student-assessment-form.html", names)
 
+    def test_assessment_form_lists_course_assignments(self):
+        from feedbook.models import Assignment
+
+        self.login("teacher@example.com")
+        db.session.add(Assignment(name="Not in this course"))
+        db.session.commit()
+
+        with captured_templates(self.app) as templates:
+            self.client.get("/courses/1/standards/1/assess")
+
+            context = get_template_context(
+                templates, "standards/student-assessment-form.html"
+            )
+            self.assertEqual(
+                [assignment.id for assignment in context["assignments"]], [1]
+            )
+
     def test_get_single_assignment(self):
         from feedbook.models import Assignment
 
@@ -297,3 +498,33 @@ class TestCourseBlueprint(TestBase):
             self.assertEqual(context["user"].id, 2)
             self.assertIsInstance(context["course"], Course)
             self.assertEqual(context["course"].id, 1)
+            self.assertEqual([user.id for user in context["enrollments"]], [2, 3])
+
+    def test_get_user_groups_attempts_by_standard(self):
+        from feedbook.models import Standard
+
+        self.login("teacher@example.com")
+        db.session.add_all(
+            StandardAttempt(user_id=2, standard_id=1, score=2, assignment_id=1)
+            for _ in range(3)
+        )
+        db.session.commit()
+
+        standard = db.session.get(Standard, 1)
+        expected = standard.is_proficient(db.session.get(User, 2))
+
+        with captured_templates(self.app) as templates:
+            self.client.get("/courses/1/users?user_id=2")
+
+            context = get_template_context(templates, "user/user-index.html")
+            result = context["standards"][standard.name]
+            self.assertEqual(result["id"], 1)
+            self.assertEqual(result["is_proficient"], expected)
+            self.assertEqual(len(result["assessments"]), 3)
+            self.assertEqual(result["assessments"][0]["assignment"].id, 1)
+
+    def test_get_missing_user_from_course(self):
+        self.login("teacher@example.com")
+
+        resp = self.client.get("/courses/1/users?user_id=99")
+        self.assertEqual(resp.status_code, 404)
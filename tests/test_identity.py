@@ -0,0 +1,115 @@
+from feedbook.extensions import db
+
+from tests.loader import Loader
+from tests.utils import TestBase, assert_max_queries
+from feedbook.models import Course, User
+from feedbook import identity
+
+
+class TestIdentityCache(TestBase):
+    def setUp(self):
+        self.app = self.create()
+
+        # Set up the application context manually to build the database
+        # and test client for requests.
+        ctx = self.app.app_context()
+        ctx.push()
+
+        self.client = self.app.test_client()
+
+        fixtures = [
+            "courses.json",
+            "course_enrollments.json",
+            "usertype.json",
+            "users.json",
+        ]
+
+        # Now that we're in context, we can load the database.
+        self.loader = Loader(self.app, db, fixtures)
+        self.loader.load()
+
+    def tearDown(self):
+        db.drop_all()
+        db.session.close()
+
+    def test_load_is_cached(self):
+        user = identity.load(1)
+
+        self.assertEqual(user.email, "teacher@example.com")
+        self.assertTrue(user.is_teacher)
+        self.assertEqual([course.id for course in user.courses], [1])
+        with assert_max_queries(0):
+            self.assertEqual(identity.load(1).get_id(), "1")
+
+    def test_missing_user(self):
+        self.assertIsNone(identity.load(99))
+
+    def test_other_attributes_load_the_user(self):
+        user = identity.load(2)
+
+        self.assertEqual(user.assessments.count(), 0)
+        self.assertIsInstance(user.user, User)
+
+    def test_enrolled_course(self):
+        user = identity.load(1)
+
+        self.assertEqual(user.enrolled_course(1).id, 1)
+        with assert_max_queries(0):
+            self.assertIsNone(user.enrolled_course(2))
+
+    def test_enrollment_clears_user(self):
+        identity.load(1)
+
+        db.session.get(Course, 2).enroll_many([1])
+        db.session.commit()
+
+        self.assertEqual([course.id for course in identity.load(1).courses], [1, 2])
+
+    def test_unenrollment_clears_user(self):
+        identity.load(2)
+
+        db.session.get(User, 2).unenroll(db.session.get(Course, 1))
+
+        self.assertEqual(identity.load(2).courses, [])
+
+    def test_status_change_clears_user(self):
+        identity.load(2)
+
+        db.session.get(User, 2).active = False
+        db.session.commit()
+
+        self.assertFalse(identity.load(2).active)
+
+    def test_archived_course_clears_everyone(self):
+        identity.load(1)
+
+        db.session.get(Course, 1).active = False
+        db.session.commit()
+
+        self.assertEqual(identity.load(1).active_courses, [])
+
+    def test_rollback_keeps_cache(self):
+        identity.load(1)
+
+        db.session.get(User, 1).first_name = "Changed"
+        db.session.flush()
+        db.session.rollback()
+        db.session.commit()
+
+        with assert_max_queries(0):
+            identity.load(1)
+
+    def test_entries_expire(self):
+        self.app.config["USER_CACHE_TTL"] = 0
+        identity.load(1)
+
+        with assert_max_queries(2) as log:
+            identity.load(1)
+        self.assertEqual(log.count, 2)
+
+    def test_sidebar_lists_active_courses(self):
+        self.login("teacher@example.com")
+
+        resp = self.client.get("/")
+
+        self.assertIn('id="course-1"', resp.text)
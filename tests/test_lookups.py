@@ -0,0 +1,82 @@
+from feedbook.extensions import db
+
+from tests.loader import Loader
+from tests.utils import TestBase, assert_max_queries
+from feedbook.models import Assignment, AssignmentType, User, UserType
+from feedbook.lookups import (
+    ASSESSMENT,
+    STUDENT,
+    TEACHER,
+    assignment_types,
+    user_types,
+)
+from feedbook import lookups
+
+
+class TestLookups(TestBase):
+    def setUp(self):
+        self.app = self.create()
+
+        # Set up the application context manually to build the database
+        # and test client for requests.
+        ctx = self.app.app_context()
+        ctx.push()
+
+        fixtures = [
+            "assignments.json",
+            "assignment_types.json",
+            "usertype.json",
+            "users.json",
+        ]
+
+        # Now that we're in context, we can load the database.
+        self.loader = Loader(self.app, db, fixtures)
+        self.loader.load()
+
+    def tearDown(self):
+        db.drop_all()
+        db.session.close()
+
+    def test_resolve_names(self):
+        self.assertEqual(user_types.id(TEACHER), 1)
+        self.assertEqual(user_types.id(STUDENT), 2)
+        self.assertEqual(assignment_types.id(ASSESSMENT), 2)
+        self.assertEqual(assignment_types.name(1), "Classwork")
+        self.assertIsNone(assignment_types.name(99))
+
+        with self.assertRaises(KeyError):
+            user_types.id("Parent")
+
+    def test_lookups_are_cached(self):
+        lookups.load()
+
+        with assert_max_queries(0):
+            self.assertEqual(user_types.id(STUDENT), 2)
+            self.assertEqual(len(assignment_types.all()), 2)
+
+    def test_commit_refreshes_cache(self):
+        lookups.load()
+
+        db.session.get(AssignmentType, 2).name = "Test"
+        db.session.add(UserType(id=3, name="Parent"))
+        db.session.commit()
+
+        self.assertEqual(assignment_types.id("Test"), 2)
+        self.assertEqual(user_types.id("Parent"), 3)
+
+    def test_missing_rows_use_seeded_ids(self):
+        db.session.execute(db.delete(AssignmentType))
+        db.session.commit()
+        assignment_types.clear()
+
+        self.assertEqual(assignment_types.id(ASSESSMENT), 2)
+        self.assertEqual(assignment_types.all(), [])
+
+    def test_model_helpers(self):
+        self.assertTrue(db.session.get(User, 1).is_teacher)
+        self.assertTrue(db.session.get(User, 2).is_student)
+
+        assignment = db.session.get(Assignment, 1)
+        self.assertFalse(assignment.is_assessment)
+        assignment.assignmenttype_id = 2
+        self.assertTrue(assignment.is_assessment)
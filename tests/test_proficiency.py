@@ -0,0 +1,133 @@
+from feedbook.extensions import db
+
+from tests.loader import Loader
+from tests.utils import TestBase
+from feedbook.models import (
+    course_assignments,
+    Assignment,
+    Course,
+    Standard,
+    StandardAttempt,
+    User,
+)
+from feedbook.proficiency import ProficiencyEngine
+
+
+class TestProficiencyEngine(TestBase):
+    def setUp(self):
+        self.app = self.create()
+
+        # Set up the application context manually to build the database
+        # and test client for requests.
+        ctx = self.app.app_context()
+        ctx.push()
+        fixtures = [
+            "assignments.json",
+            "assignment_standards.json",
+            "assignment_types.json",
+            "courses.json",
+            "course_assignments.json",
+            "course_enrollments.json",
+            "course_standards.json",
+            "standards.json",
+            "standard_assessments.json",
+            "usertype.json",
+            "users.json",
+        ]
+
+        # Now that we're in context, we can load the database.
+        self.loader = Loader(self.app, db, fixtures)
+        self.loader.load()
+
+    def tearDown(self):
+        db.drop_all()
+        db.session.close()
+
+    def assertMatchesModel(self, engine, course):
+        for user_id in engine.student_ids:
+            user = db.session.get(User, user_id)
+            for standard in course.standards.all():
+                self.assertEqual(
+                    engine.is_proficient(user_id, standard.id),
+                    standard.is_proficient(user),
+                )
+
+    def test_for_course_defaults(self):
+        course = db.session.get(Course, 1)
+        engine = ProficiencyEngine.for_course(course)
+
+        self.assertEqual(sorted(engine.student_ids), [2, 3])
+        self.assertEqual(sorted(engine.standard_ids), [1, 2])
+
+    def test_matches_is_proficient_on_scores(self):
+        course = db.session.get(Course, 1)
+        engine = ProficiencyEngine.for_course(course)
+
+        self.assertMatchesModel(engine, course)
+        self.assertEqual(engine.summary(1), {"proficient": 0, "not_proficient": 2})
+
+    def add_assessment(self):
+        # Assign an assessment on standard 1 in the course so it counts
+        # toward proficiency, then pass it for student 2. The id is set so it
+        # doesn't pick up the orphaned assignment 2 alignment in the fixtures.
+        assessment = Assignment(id=10, name="Test", assignmenttype_id=2)
+        db.session.add(assessment)
+        db.session.flush()
+        db.session.execute(
+            course_assignments.insert().values(course_id=1, assignment_id=assessment.id)
+        )
+        assessment.alignments.append(db.session.get(Standard, 1))
+        db.session.add(
+            StandardAttempt(
+                user_id=2, standard_id=1, score=2, assignment_id=assessment.id
+            )
+        )
+        db.session.commit()
+
+    def test_matches_is_proficient_with_assessment(self):
+        self.add_assessment()
+
+        course = db.session.get(Course, 1)
+        engine = ProficiencyEngine.for_course(course)
+
+        self.assertTrue(engine.has_assessment(1))
+        self.assertTrue(engine.is_proficient(2, 1))
+        self.assertFalse(engine.is_proficient(3, 1))
+        self.assertMatchesModel(engine, course)
+
+    def test_override(self):
+        self.add_assessment()
+
+        standard = db.session.get(Standard, 1)
+        standard.add_proficient_override(db.session.get(User, 3))
+
+        course = db.session.get(Course, 1)
+        engine = ProficiencyEngine.for_course(course)
+
+        self.assertTrue(engine.is_proficient(3, 1))
+        self.assertMatchesModel(engine, course)
+
+    def test_matrix(self):
+        course = db.session.get(Course, 1)
+        matrix = ProficiencyEngine.for_course(course).matrix()
+
+        self.assertEqual(set(matrix.keys()), {2, 3})
+        self.assertEqual(set(matrix[2].keys()), {1, 2})
+
+    def test_empty_roster(self):
+        course = db.session.get(Course, 2)
+        engine = ProficiencyEngine.for_course(course)
+
+        self.assertEqual(engine.matrix(), {})
+        self.assertEqual(engine.summary(1), {"proficient": 0, "not_proficient": 0})
+
+    def test_attempt_without_score(self):
+        db.session.add(StandardAttempt(user_id=2, standard_id=1, assignment_id=1))
+        db.session.commit()
+
+        record = ProficiencyEngine(1, [2], [1]).record(2, 1)
+
+        self.assertEqual(record["max_score"], 1)
+        self.assertEqual(
+            (record["count_0"], record["count_1"], record["count_2"]), (1, 1, 0)
+        )
@@ -0,0 +1,63 @@
+from feedbook.extensions import db
+
+from tests.loader import Loader
+from tests.utils import TestBase
+from feedbook.models import User
+from feedbook.profiling import Query, QueryLog, record_queries
+
+
+class TestQueryLog(TestBase):
+    def setUp(self):
+        self.app = self.create()
+
+        # Set up the application context manually to build the database
+        # and test client for requests.
+        ctx = self.app.app_context()
+        ctx.push()
+
+        self.client = self.app.test_client()
+
+        fixtures = [
+            "courses.json",
+            "course_enrollments.json",
+            "usertype.json",
+            "users.json",
+        ]
+
+        # Now that we're in context, we can load the database.
+        self.loader = Loader(self.app, db, fixtures)
+        self.loader.load()
+
+    def tearDown(self):
+        db.drop_all()
+        db.session.close()
+
+    def test_record_queries(self):
+        with record_queries() as log:
+            for user_id in [1, 2, 3]:
+                db.session.execute(db.select(User).where(User.id == user_id)).all()
+
+        self.assertEqual(log.count, 3)
+        self.assertEqual(log.repeated(threshold=3)[0].count, 3)
+        self.assertEqual(log.repeated(threshold=4), [])
+
+    def test_repeated_needs_different_parameters(self):
+        log = QueryLog()
+        log.queries = [Query("SELECT 1", "()", 0.1, "home.index")] * 5
+        log.queries += [Query("SELECT ?", f"({i},)", 0.1, "a.html") for i in range(5)]
+
+        repeats = log.repeated()
+        self.assertEqual(len(repeats), 1)
+        self.assertEqual(repeats[0].statement, "SELECT ?")
+        self.assertEqual(repeats[0].sources, ["a.html"])
+
+    def test_server_timing_header(self):
+        self.login("teacher@example.com")
+
+        with self.assertLogs(self.app.logger, level="INFO") as logs:
+            resp = self.client.get("/courses/1", headers={"HX-Request": "true"})
+
+        timing = resp.headers["Server-Timing"]
+        self.assertIn("db;dur=", timing)
+        self.assertIn("render;dur=", timing)
+        self.assertTrue(any("course.get_single_course" in line for line in logs.output))
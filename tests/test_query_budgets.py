@@ -0,0 +1,170 @@
+from feedbook.extensions import db
+
+from tests.loader import Loader
+from tests.utils import TestBase, assert_max_queries
+from feedbook.models import Course, StandardAttempt, User
+from feedbook import lookups
+
+# Extra students added on top of the fixtures. Budgets should hold no matter
+# how many students are in the course, so a query per student fails them.
+# First loads include filling the stored student statuses.
+EXTRA_STUDENTS = 20
+
+
+class TestQueryBudgets(TestBase):
+    def setUp(self):
+        self.app = self.create()
+
+        # Set up the application context manually to build the database
+        # and test client for requests.
+        ctx = self.app.app_context()
+        ctx.push()
+
+        self.client = self.app.test_client()
+
+        fixtures = [
+            "assignments.json",
+            "assignment_standards.json",
+            "assignment_types.json",
+            "courses.json",
+            "course_assignments.json",
+            "course_enrollments.json",
+            "course_standards.json",
+            "standards.json",
+            "standard_assessments.json",
+            "usertype.json",
+            "users.json",
+        ]
+
+        # Now that we're in context, we can load the database.
+        self.loader = Loader(self.app, db, fixtures)
+        self.loader.load()
+
+        course = db.session.get(Course, 1)
+        students = [
+            User(
+                first_name="Student",
+                last_name=f"Extra {i}",
+                email=f"extra{i}@example.com",
+                usertype_id=2,
+            )
+            for i in range(EXTRA_STUDENTS)
+        ]
+        db.session.add_all(students)
+        course.enroll_many(students)
+        db.session.add_all(
+            StandardAttempt(
+                user_id=student.id, standard_id=standard_id, score=1, assignment_id=1
+            )
+            for student in students
+            for standard_id in (1, 2)
+        )
+        db.session.commit()
+
+        # The app reads its lookup tables at startup, which is before the
+        # test database exists. Read them now so budgets match a running app.
+        lookups.load()
+
+        self.login("teacher@example.com")
+
+    def tearDown(self):
+        db.drop_all()
+        db.session.close()
+
+    def get(self, url):
+        resp = self.client.get(url, headers={"HX-Request": "true"})
+        self.assertEqual(resp.status_code, 200)
+        return resp
+
+    def test_budget_exceeded(self):
+        with self.assertRaises(AssertionError):
+            with assert_max_queries(1):
+                db.session.scalars(db.select(User)).all()
+                db.session.scalars(db.select(Course)).all()
+
+    def test_get_single_course(self):
+        with assert_max_queries(15):
+            self.get("/courses/1")
+
+    def test_get_single_course_as_student(self):
+        self.login("student1@example.com")
+        with assert_max_queries(11):
+            self.get("/courses/1")
+
+    def test_admin_index(self):
+        with assert_max_queries(15):
+            self.get("/admin")
+
+    # Built courses are read from the rollup with one query
+    def test_admin_index_warm(self):
+        self.get("/admin")
+        with assert_max_queries(2):
+            self.get("/admin")
+
+    def test_get_single_assignment(self):
+        with assert_max_queries(5):
+            self.get("/courses/1/assignments/1")
+
+    # Attempts, proficiency and the roster are each read once
+    def test_get_user(self):
+        with assert_max_queries(7):
+            self.get("/courses/1/users?user_id=2")
+
+    # Attempts for the whole roster come from one query
+    def test_get_standard_scores_in_course(self):
+        with assert_max_queries(12):
+            self.get("/courses/1/standards/1/results")
+
+    # Once the statuses are stored, the dashboard is a fixed set of queries
+    def test_get_single_course_is_flat(self):
+        self.get("/courses/1")
+        with assert_max_queries(7) as before:
+            self.get("/courses/1")
+
+        course = db.session.get(Course, 1)
+        students = [
+            User(
+                first_name="Student",
+                last_name=f"More {i}",
+                email=f"more{i}@example.com",
+                usertype_id=2,
+            )
+            for i in range(50)
+        ]
+        db.session.add_all(students)
+        course.enroll_many(students)
+        db.session.commit()
+
+        self.get("/courses/1")
+        with assert_max_queries(before.count):
+            self.get("/courses/1")
+
+    # Saving a grid is a fixed set of queries however many courses the
+    # students are in
+    def test_add_attempts_is_flat(self):
+        students = [
+            user.id
+            for user in db.session.get(Course, 1).enrollments.filter(
+                User.usertype_id == 2
+            )
+        ]
+        data = {
+            "assignment": 1,
+            "user_id": students,
+            "standard_id": [1] * len(students),
+            "score": ["1"] * len(students),
+        }
+
+        self.client.post("/standards/attempts", data=data)
+        with assert_max_queries(16) as before:
+            resp = self.client.post("/standards/attempts", data=data)
+        self.assertEqual(resp.status_code, 200)
+
+        course = db.session.get(Course, 2)
+        course.align_many([1])
+        course.enroll_many(students)
+        db.session.commit()
+
+        self.client.post("/standards/attempts", data=data)
+        with assert_max_queries(before.count):
+            self.client.post("/standards/attempts", data=data)
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+
+from feedbook.extensions import db
+
+from tests.loader import Loader
+from tests.utils import TestBase, assert_max_queries
+from feedbook.models import StandardAttempt, StandardReport
+from feedbook import reports
+
+
+class TestStandardReports(TestBase):
+    def setUp(self):
+        self.app = self.create()
+
+        # Set up the application context manually to build the database
+        # and test client for requests.
+        ctx = self.app.app_context()
+        ctx.push()
+
+        fixtures = [
+            "assignments.json",
+            "assignment_standards.json",
+            "assignment_types.json",
+            "courses.json",
+            "course_assignments.json",
+            "course_enrollments.json",
+            "course_standards.json",
+            "standards.json",
+            "standard_assessments.json",
+            "usertype.json",
+            "users.json",
+        ]
+
+        # Now that we're in context, we can load the database.
+        self.loader = Loader(self.app, db, fixtures)
+        self.loader.load()
+
+    def tearDown(self):
+        db.drop_all()
+        db.session.close()
+
+    def test_assignment_averages(self):
+        report = reports.build(1)
+
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report[0]["name"], "Course 1")
+        self.assertEqual(
+            report[0]["assignments"],
+            [{"assignment": "Assignment 1", "avg": 0.67, "count": 3}],
+        )
+
+    def test_week_averages(self):
+        monday = datetime(2024, 9, 2, 9)
+        for attempt in db.session.scalars(db.select(StandardAttempt)):
+            attempt.occurred = monday + timedelta(days=attempt.id * 3)
+        db.session.commit()
+
+        weeks = reports.build(1, "week")[0]["weeks"]
+
+        # Sunday the 8th is in the same week as the 5th, the 11th is not
+        self.assertEqual(
+            weeks,
+            [
+                {"week": "2024-09-02", "avg": 0.5, "count": 2},
+                {"week": "2024-09-09", "avg": 1.0, "count": 1},
+            ],
+        )
+
+    def test_standard_without_courses(self):
+        self.assertEqual(reports.standard_report(3), [])
+
+    def test_report_is_stored(self):
+        report = reports.standard_report(1)
+
+        self.assertEqual(StandardReport.query.count(), 1)
+        with assert_max_queries(1):
+            self.assertEqual(reports.standard_report(1), report)
+
+    def test_new_attempt_invalidates_report(self):
+        reports.standard_report(1)
+
+        db.session.add(
+            StandardAttempt(user_id=2, standard_id=1, score=2, assignment_id=1)
+        )
+        db.session.commit()
+
+        self.assertEqual(StandardReport.query.count(), 0)
+        point = reports.standard_report(1)[0]["assignments"][0]
+        self.assertEqual(point["count"], 4)
+        self.assertEqual(point["avg"], 1.0)
+
+    def test_old_report_is_rebuilt(self):
+        reports.standard_report(1)
+        stored = StandardReport.query.first()
+        stored.updated_at = datetime.now(timezone.utc) - timedelta(hours=2)
+        stored.data = "[]"
+        db.session.commit()
+
+        self.assertEqual(reports.standard_report(1, max_age=7200 + 60), [])
+        self.assertEqual(len(reports.standard_report(1, max_age=60)), 1)
@@ -0,0 +1,169 @@
+from feedbook.extensions import db
+
+from tests.loader import Loader
+from tests.utils import TestBase
+from feedbook.models import (
+    Course,
+    CourseStandardRollup,
+    Standard,
+    StandardAttempt,
+    User,
+)
+from feedbook import rollup
+
+
+class TestCourseStandardRollup(TestBase):
+    def setUp(self):
+        self.app = self.create()
+
+        # Set up the application context manually to build the database
+        # and test client for requests.
+        ctx = self.app.app_context()
+        ctx.push()
+
+        self.client = self.app.test_client()
+
+        fixtures = [
+            "assignments.json",
+            "assignment_standards.json",
+            "assignment_types.json",
+            "courses.json",
+            "course_assignments.json",
+            "course_enrollments.json",
+            "course_standards.json",
+            "standards.json",
+            "standard_assessments.json",
+            "usertype.json",
+            "users.json",
+        ]
+
+        # Now that we're in context, we can load the database.
+        self.loader = Loader(self.app, db, fixtures)
+        self.loader.load()
+
+    def tearDown(self):
+        db.drop_all()
+        db.session.close()
+
+    def results(self, course_id=1, archived=False):
+        return {
+            result.standard_id: result
+            for result in rollup.read(archived)
+            if result.course_id == course_id
+        }
+
+    def built(self, course_id=1):
+        return CourseStandardRollup.query.filter_by(course_id=course_id).count()
+
+    def test_read_builds_missing_courses(self):
+        self.assertEqual(CourseStandardRollup.query.count(), 0)
+
+        results = self.results()
+
+        self.assertEqual(set(results), {None, 1, 2})
+        self.assertEqual(results[1].students, 2)
+        self.assertEqual(results[1].proficient, 0)
+        # Course 2 has no standards but is still stored
+        self.assertEqual(set(self.results(course_id=2)), {None})
+        self.assertEqual(self.built(course_id=2), 1)
+
+    def test_matches_is_proficient(self):
+        for _ in range(3):
+            db.session.add(
+                StandardAttempt(user_id=2, standard_id=1, score=2, assignment_id=1)
+            )
+        db.session.commit()
+
+        standard = db.session.get(Standard, 1)
+        expected = sum(
+            standard.is_proficient(db.session.get(User, user_id)) for user_id in (2, 3)
+        )
+        self.assertEqual(self.results()[1].proficient, expected)
+        self.assertEqual(rollup.ratio(self.results()[1]), round(expected / 2, 2))
+
+    def test_new_attempt_invalidates_course(self):
+        self.assertEqual(self.results()[1].proficient, 0)
+
+        for _ in range(3):
+            db.session.add(
+                StandardAttempt(user_id=2, standard_id=1, score=2, assignment_id=1)
+            )
+        db.session.commit()
+
+        self.assertEqual(self.built(), 0)
+        self.assertEqual(self.results()[1].proficient, 1)
+
+    def test_enrollment_invalidates_course(self):
+        self.results()
+
+        student = User(
+            first_name="New",
+            last_name="Student",
+            email="new@example.com",
+            usertype_id=2,
+        )
+        db.session.add(student)
+        db.session.get(Course, 1).enroll_many([student])
+        db.session.commit()
+
+        self.assertEqual(self.built(), 0)
+        self.assertEqual(self.results()[1].students, 3)
+
+    def test_deactivated_student_invalidates_course(self):
+        self.results()
+
+        db.session.get(User, 3).active = False
+        db.session.commit()
+
+        self.assertEqual(self.built(), 0)
+        self.assertEqual(self.results()[1].students, 1)
+
+    def test_removed_standard_invalidates_course(self):
+        self.results()
+
+        course = db.session.get(Course, 1)
+        course.standards.remove(db.session.get(Standard, 2))
+        db.session.commit()
+
+        self.assertEqual(self.built(), 0)
+        self.assertEqual(set(self.results()), {None, 1})
+
+    def test_course_without_students(self):
+        db.session.get(Course, 2).align(db.session.get(Standard, 1))
+        db.session.commit()
+
+        result = self.results(course_id=2)[1]
+
+        self.assertEqual(result.students, 0)
+        self.assertEqual(rollup.ratio(result), 0)
+
+    def test_archived_courses(self):
+        db.session.get(Course, 2).active = False
+        db.session.commit()
+
+        self.assertEqual(self.results(course_id=2), {})
+        self.assertEqual(set(self.results(course_id=2, archived=True)), {None})
+
+    def test_admin_archived_json(self):
+        self.login("teacher@example.com")
+        db.session.get(Course, 2).align(db.session.get(Standard, 1))
+        db.session.get(Course, 2).active = False
+        db.session.commit()
+
+        resp = self.client.get("/admin?archived=1")
+
+        self.assertEqual(resp.status_code, 200)
+        data = {course["course"]: course["results"] for course in resp.json}
+        self.assertEqual(
+            [result["name"] for result in data["Course 1"]],
+            [db.session.get(Standard, 1).name, db.session.get(Standard, 2).name],
+        )
+        self.assertEqual(data["Course 2"][0]["avg"], 0)
+
+    def test_refresh_command(self):
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=["refresh-rollup"])
+
+        # Course 1 has two standards and course 2 has none
+        self.assertIn("Stored 4 rollup rows.", result.output)
+        self.assertEqual(CourseStandardRollup.query.count(), 4)
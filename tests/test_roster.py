@@ -0,0 +1,200 @@
+from io import StringIO
+
+from feedbook.extensions import db
+
+from tests.loader import Loader
+from tests.utils import TestBase
+from feedbook.models import Course, User
+from feedbook.roster import import_roster, sync_roster
+
+HEADER = "last_name,first_name,email,password\n"
+
+
+class TestRosterImport(TestBase):
+    def setUp(self):
+        self.app = self.create()
+
+        # Set up the application context manually to build the database
+        # and test client for requests.
+        ctx = self.app.app_context()
+        ctx.push()
+        fixtures = [
+            "courses.json",
+            "course_enrollments.json",
+            "usertype.json",
+            "users.json",
+        ]
+
+        # Now that we're in context, we can load the database.
+        self.loader = Loader(self.app, db, fixtures)
+        self.loader.load()
+
+    def tearDown(self):
+        db.drop_all()
+        db.session.close()
+
+    def import_rows(self, course_id, rows, **kwargs):
+        course = db.session.get(Course, course_id)
+        return import_roster(course, StringIO(HEADER + "\n".join(rows)), **kwargs)
+
+    def test_creates_and_enrolls(self):
+        result = self.import_rows(
+            2,
+            [
+                "Student,New,New@Example.com,abc",
+                "Student 1,Example,student1@example.com,abc",
+            ],
+        )
+
+        self.assertEqual(
+            (result.created, result.updated, result.skipped, result.enrolled),
+            (1, 0, 1, 2),
+        )
+
+        user = db.session.scalar(db.select(User).filter_by(email="new@example.com"))
+        self.assertTrue(user.is_enrolled(db.session.get(Course, 2)))
+
+    def test_updates_names_by_email(self):
+        result = self.import_rows(1, ["Renamed,Example,student1@example.com"])
+
+        self.assertEqual(result.updated, 1)
+        self.assertEqual(result.enrolled, 0)
+        self.assertEqual(db.session.get(User, 2).last_name, "Renamed")
+
+    def test_matches_mixed_case_emails(self):
+        user = User(
+            email="Ann.Lee@School.org",
+            first_name="Ann",
+            last_name="Lee",
+            usertype_id=2,
+            active=True,
+        )
+        db.session.add(user)
+        db.session.commit()
+
+        result = self.import_rows(1, ["Lee,Ann,ann.lee@school.org"])
+
+        self.assertEqual((result.created, result.skipped, result.enrolled), (0, 1, 1))
+        self.assertEqual(User.query.filter(User.last_name == "Lee").count(), 1)
+        self.assertTrue(user.is_enrolled(db.session.get(Course, 1)))
+
+    def test_row_errors(self):
+        result = self.import_rows(
+            1,
+            [
+                "Student,Missing,",
+                "Student,Bad,not-an-email",
+                "Student,Dupe,dupe@example.com",
+                "Student,Dupe,DUPE@example.com",
+                "Example,Teacher,teacher@example.com",
+                "",
+            ],
+        )
+
+        self.assertEqual([line for line, _ in result.errors], [2, 3, 5, 6])
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.skipped, 4)
+
+    def test_chunks(self):
+        rows = [f"Student,{i},student{i}@test.com" for i in range(5)]
+        result = self.import_rows(2, rows, chunk_size=2)
+
+        self.assertEqual(result.created, 5)
+        self.assertEqual(result.enrolled, 5)
+        self.assertEqual(db.session.get(Course, 2).enrollments.count(), 5)
+
+
+class TestRosterSync(TestBase):
+    def setUp(self):
+        self.app = self.create()
+
+        # Set up the application context manually to build the database
+        # and test client for requests.
+        ctx = self.app.app_context()
+        ctx.push()
+        fixtures = [
+            "courses.json",
+            "course_enrollments.json",
+            "usertype.json",
+            "users.json",
+        ]
+
+        # Now that we're in context, we can load the database.
+        self.loader = Loader(self.app, db, fixtures)
+        self.loader.load()
+
+        # Student 2 was dropped earlier and is coming back
+        db.session.get(User, 3).active = False
+        db.session.commit()
+
+    def tearDown(self):
+        db.drop_all()
+        db.session.close()
+
+    def sync_rows(self, rows, **kwargs):
+        course = db.session.get(Course, 1)
+        return sync_roster(course, StringIO(HEADER + "\n".join(rows)), **kwargs)
+
+    rows = [
+        "Student 2,Example,student2@example.com",
+        "Student,New,new@example.com",
+        "Example,Teacher,teacher@example.com",
+    ]
+
+    def test_dry_run(self):
+        result = self.sync_rows(self.rows, dry_run=True)
+
+        self.assertEqual(result.added, [("Student", "New", "new@example.com")])
+        self.assertEqual([user.id for user in result.reactivated], [3])
+        self.assertEqual([user.id for user in result.deactivated], [2])
+        self.assertEqual([line for line, _ in result.errors], [4])
+
+        # Nothing is written
+        db.session.rollback()
+        self.assertTrue(db.session.get(User, 2).active)
+        self.assertFalse(db.session.get(User, 3).active)
+        self.assertEqual(db.session.get(Course, 1).enrollments.count(), 3)
+
+    def test_apply(self):
+        self.sync_rows(self.rows)
+        db.session.expire_all()
+
+        self.assertFalse(db.session.get(User, 2).active)
+        self.assertTrue(db.session.get(User, 3).active)
+        # The teacher is never deactivated
+        self.assertTrue(db.session.get(User, 1).active)
+
+        user = db.session.scalar(db.select(User).filter_by(email="new@example.com"))
+        self.assertTrue(user.is_enrolled(db.session.get(Course, 1)))
+
+    def test_matching_roster(self):
+        result = self.sync_rows(
+            [
+                "Student 1,Example,student1@example.com",
+                "Student 2,Example,student2@example.com",
+            ]
+        )
+
+        self.assertEqual(result.unchanged, 1)
+        self.assertEqual([user.id for user in result.reactivated], [3])
+        self.assertEqual(result.deactivated, [])
+
+    def test_enrolls_mixed_case_account(self):
+        user = User(
+            email="Ann.Lee@School.org",
+            first_name="Ann",
+            last_name="Lee",
+            usertype_id=2,
+            active=False,
+        )
+        db.session.add(user)
+        db.session.commit()
+
+        result = self.sync_rows(self.rows[:1] + ["Lee,Ann,ann.lee@school.org"])
+
+        self.assertEqual(result.added, [("Lee", "Ann", "ann.lee@school.org")])
+        self.assertIn(user, result.reactivated)
+        db.session.expire_all()
+        self.assertEqual(User.query.filter(User.last_name == "Lee").count(), 1)
+        self.assertTrue(user.active)
+        self.assertTrue(user.is_enrolled(db.session.get(Course, 1)))
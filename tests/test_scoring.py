@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from feedbook.extensions import db
+
+from tests.loader import Loader
+from tests.utils import TestBase
+from feedbook.models import Course, StandardAttempt
+from feedbook.scoring import current_scores, score_summaries
+
+
+class TestScoring(TestBase):
+    def setUp(self):
+        self.app = self.create()
+
+        # Set up the application context manually to build the database
+        # and test client for requests.
+        ctx = self.app.app_context()
+        ctx.push()
+        fixtures = [
+            "courses.json",
+            "course_enrollments.json",
+            "course_standards.json",
+            "standards.json",
+            "standard_assessments.json",
+            "users.json",
+        ]
+
+        # Now that we're in context, we can load the database.
+        self.loader = Loader(self.app, db, fixtures)
+        self.loader.load()
+
+    def tearDown(self):
+        db.drop_all()
+        db.session.close()
+
+    def test_current_scores_for_course(self):
+        course = db.session.get(Course, 1)
+        scores = current_scores(course=course)
+
+        self.assertEqual(scores, {(2, 1): 0.5, (3, 1): 1.0})
+
+    def test_latest_score_uses_occurred(self):
+        # Entered last, but occurred first
+        db.session.add_all(
+            [
+                StandardAttempt(
+                    user_id=3, standard_id=2, score=2, occurred=datetime(2024, 9, 2)
+                ),
+                StandardAttempt(
+                    user_id=3, standard_id=2, score=0, occurred=datetime(2024, 9, 1)
+                ),
+            ]
+        )
+        db.session.commit()
+
+        summaries = score_summaries(users=[3], standards=[2])
+        self.assertEqual(summaries[(3, 2)], (2, 2))
+
+    def test_filters(self):
+        self.assertEqual(list(current_scores(users=[3]).keys()), [(3, 1)])
+        self.assertEqual(current_scores(standards=[2]), {})
@@ -1,8 +1,11 @@
+import json
+
 from feedbook.extensions import db
 
 from tests.loader import Loader
 from tests.utils import TestBase, captured_templates, get_template_context
 from feedbook.models import Course, Standard, StandardAttempt, User
+from feedbook.profiling import record_queries
 
 
 class TestStandardModel(TestBase):
@@ -134,10 +137,32 @@ class TestStandardBlueprint(TestBase):
 
             self.assertIn("shared/forms/create-standard.html", names)
             self.assertEqual(template_context["course"].name, "Course 1")
-            self.assertIsInstance(template_context["items"], list)
+            self.assertIsInstance(template_context["page"].items, list)
 
     def test_get_single_standard(self):
-        pass
+        self.login("teacher@example.com")
+
+        resp = self.client.get("/standards/1")
+
+        self.assertEqual(resp.status_code, 200)
+        results = json.loads(resp.headers["HX-Trigger"])["buildChart"]
+        self.assertEqual([course["name"] for course in results], ["Course 1"])
+
+    def test_get_single_standard_by_week(self):
+        self.login("teacher@example.com")
+
+        resp = self.client.get("/standards/1?by=week")
+
+        self.assertEqual(resp.status_code, 200)
+        results = json.loads(resp.headers["HX-Trigger"])["buildChart"]
+        self.assertIn("weeks", results[0])
+
+    def test_get_single_standard_without_courses(self):
+        self.login("teacher@example.com")
+
+        resp = self.client.get("/standards/3")
+
+        self.assertEqual(resp.status_code, 404)
 
     def test_update_standard_status(self):
         self.login("teacher@example.com")
@@ -180,6 +205,123 @@ class TestStandardBlueprint(TestBase):
             self.assertIs(type(template_context["record"]), StandardAttempt)
             self.assertEqual(template_context["record"].user_id, 2)
 
+    def align_assignment(self, assignmenttype_id=1):
+        from feedbook.models import Assignment
+
+        assignment = db.session.get(Assignment, 1)
+        assignment.assignmenttype_id = assignmenttype_id
+        assignment.add_standards([1, 2])
+        db.session.commit()
+
+    def test_add_assessment_grid(self):
+        self.align_assignment()
+        self.login("teacher@example.com")
+
+        data = {
+            "assignment": 1,
+            "user_id": [2, 2, 3],
+            "standard_id": [1, 2, 1],
+            "score": ["1", "0", ""],
+            "comments": ["Good", "", ""],
+        }
+
+        with captured_templates(self.app) as templates:
+            resp = self.client.post("/standards/attempts", data=data)
+            self.assertEqual(resp.status_code, 200)
+
+            context = get_template_context(templates, "standards/attempt-rows.html")
+            self.assertEqual(
+                [(a.user_id, a.standard_id) for a in context["attempts"]],
+                [(2, 1), (2, 2)],
+            )
+
+        self.assertIn(b'id="attempt-row-2-2"', resp.data)
+        self.assertIn(b'hx-swap-oob="outerHTML"', resp.data)
+
+    def test_add_assessment_grid_overrides(self):
+        self.align_assignment(assignmenttype_id=2)
+        self.login("teacher@example.com")
+
+        data = {
+            "assignment": 1,
+            "user_id": [2, 3],
+            "standard_id": [1, 1],
+            "score": ["2", "1"],
+        }
+        with record_queries() as log:
+            resp = self.client.post("/standards/attempts", data=data)
+
+        self.assertEqual(resp.status_code, 200)
+        standard = db.session.get(Standard, 1)
+        self.assertEqual([user.id for user in standard.students], [2])
+
+        # Statuses for the new overrides are refreshed with the attempts,
+        # and every refresh starts by finding the students' courses
+        refreshes = [
+            query
+            for query in log.queries
+            if query.statement.startswith("SELECT user_courses.course_id")
+        ]
+        self.assertEqual(len(refreshes), 1)
+
+    def test_add_assessment_idempotent(self):
+        self.login("teacher@example.com")
+
+        before = StandardAttempt.query.count()
+        data = {"user_id": 2, "score": 1, "assignment": 1, "comments": "Retry"}
+
+        for _ in range(2):
+            resp = self.client.post(
+                "/standards/1/attempts",
+                data=data,
+                headers={"Idempotency-Key": "abc123"},
+            )
+            self.assertEqual(resp.status_code, 200)
+
+        self.assertEqual(StandardAttempt.query.count(), before + 1)
+
+    def test_add_assessment_grid_idempotent(self):
+        self.align_assignment(assignmenttype_id=2)
+        self.login("teacher@example.com")
+
+        before = StandardAttempt.query.count()
+        data = {
+            "assignment": 1,
+            "user_id": [2, 3],
+            "standard_id": [1, 1],
+            "score": ["2", "1"],
+            "idempotency_key": "abc123",
+        }
+
+        ids = []
+        for _ in range(2):
+            with captured_templates(self.app) as templates:
+                resp = self.client.post("/standards/attempts", data=data)
+                self.assertEqual(resp.status_code, 200)
+
+                context = get_template_context(templates, "standards/attempt-rows.html")
+                ids.append([attempt.id for attempt in context["attempts"]])
+
+        self.assertEqual(ids[0], ids[1])
+        self.assertEqual(StandardAttempt.query.count(), before + 2)
+
+    def test_add_assessment_grid_invalid(self):
+        self.align_assignment()
+        self.login("teacher@example.com")
+
+        before = StandardAttempt.query.count()
+        data = {
+            "assignment": 1,
+            "user_id": [2, 1, 2],
+            "standard_id": [1, 1, 3],
+            "score": ["1", "1", "1"],
+        }
+        resp = self.client.post("/standards/attempts", data=data)
+
+        self.assertEqual(resp.status_code, 422)
+        self.assertIn("not a student", resp.headers["HX-Trigger"])
+        self.assertEqual(StandardAttempt.query.count(), before)
+
     def test_get_edit_attempt_form(self):
         self.login("teacher@example.com")
 
@@ -194,7 +336,43 @@ class TestStandardBlueprint(TestBase):
             self.assertIsInstance(template_context["attempt"], StandardAttempt)
             self.assertIsInstance(template_context["assignments"], list)
             self.assertEqual(template_context["attempt"].id, 1)
-            self.assertEqual(len(template_context["standards"]), 3)
+            # The teacher and student share no course, so only the attempt's
+            # own assignment and standard are listed.
+            self.assertEqual(
+                [standard.id for standard in template_context["standards"]], [1]
+            )
+            self.assertEqual(
+                [assignment.id for assignment in template_context["assignments"]],
+                [1],
+            )
+
+    def test_edit_attempt_form_lists_shared_courses(self):
+        from feedbook.models import Assignment
+
+        self.login("teacher@example.com")
+        other = Assignment(name="Another course's assignment")
+        db.session.add(other)
+        course = db.session.get(Course, 1)
+        course.enroll_many([1, 2])
+        course.add_assignments([1])
+        db.session.commit()
+
+        with captured_templates(self.app) as templates:
+            self.client.get("/standards/1/attempts/1")
+
+            template_context = get_template_context(
+                templates, "shared/forms/edit-standard-attempt.html"
+            )
+            self.assertEqual(
+                [standard.id for standard in template_context["standards"]], [1, 2]
+            )
+            self.assertNotIn(other, template_context["assignments"])
+
+    def test_get_edit_form_missing_attempt(self):
+        self.login("teacher@example.com")
+
+        resp = self.client.get("/standards/1/attempts/99")
+        self.assertEqual(resp.status_code, 404)
 
     def test_edit_attempt_from_standard(self):
         from feedbook.models import User
@@ -0,0 +1,170 @@
+from feedbook.extensions import db
+
+from tests.loader import Loader
+from tests.utils import TestBase
+from feedbook.models import (
+    Assignment,
+    Course,
+    Standard,
+    StandardAttempt,
+    StudentStandardStatus,
+    User,
+)
+from feedbook import status
+from feedbook.profiling import record_queries
+from feedbook.proficiency import ProficiencyEngine
+
+
+class TestStudentStandardStatus(TestBase):
+    def setUp(self):
+        self.app = self.create()
+
+        # Set up the application context manually to build the database
+        # and test client for requests.
+        ctx = self.app.app_context()
+        ctx.push()
+        fixtures = [
+            "assignments.json",
+            "assignment_standards.json",
+            "assignment_types.json",
+            "courses.json",
+            "course_assignments.json",
+            "course_enrollments.json",
+            "course_standards.json",
+            "standards.json",
+            "standard_assessments.json",
+            "usertype.json",
+            "users.json",
+        ]
+
+        # Now that we're in context, we can load the database.
+        self.loader = Loader(self.app, db, fixtures)
+        self.loader.load()
+
+    def tearDown(self):
+        db.drop_all()
+        db.session.close()
+
+    def get_row(self, user_id, standard_id, course_id=1):
+        return StudentStandardStatus.query.filter_by(
+            user_id=user_id, standard_id=standard_id, course_id=course_id
+        ).first()
+
+    def test_load_statuses_fills_missing_rows(self):
+        course = db.session.get(Course, 1)
+        self.assertEqual(StudentStandardStatus.query.count(), 0)
+
+        statuses = status.load_statuses(course, [2, 3], [1, 2])
+
+        self.assertEqual(len(statuses), 4)
+        self.assertEqual(StudentStandardStatus.query.count(), 4)
+
+        row = statuses[(2, 1)]
+        self.assertEqual((row.count_0, row.count_1, row.count_2), (1, 1, 0))
+        self.assertEqual(row.current_score, 0.5)
+        self.assertFalse(row.proficient)
+
+    def test_new_attempt_updates_row(self):
+        status.load_statuses(1, [2], [1])
+
+        for _ in range(3):
+            db.session.add(
+                StandardAttempt(user_id=2, standard_id=1, score=2, assignment_id=1)
+            )
+        db.session.commit()
+
+        row = self.get_row(2, 1)
+        self.assertEqual(row.count_2, 3)
+        self.assertEqual(row.last_score, 2)
+        self.assertTrue(row.proficient)
+        self.assertEqual(
+            row.proficient,
+            db.session.get(Standard, 1).is_proficient(db.session.get(User, 2)),
+        )
+
+    def test_deleted_attempt_updates_row(self):
+        status.load_statuses(1, [3], [1])
+        self.assertEqual(self.get_row(3, 1).count_1, 1)
+
+        db.session.delete(db.session.get(StandardAttempt, 3))
+        db.session.commit()
+
+        row = self.get_row(3, 1)
+        self.assertEqual(row.count_1, 0)
+        self.assertIsNone(row.current_score)
+
+    def test_override_updates_row(self):
+        standard = db.session.get(Standard, 1)
+        standard.add_proficient_override(db.session.get(User, 3))
+
+        self.assertTrue(self.get_row(3, 1).has_override)
+
+    def test_assessment_alignment_invalidates_rows(self):
+        status.load_statuses(1, [2, 3], [1])
+
+        assessment = Assignment(name="Test", assignmenttype_id=2)
+        db.session.add(assessment)
+        db.session.get(Course, 1).add_assignment(assessment)
+        db.session.commit()
+
+        self.assertIsNone(self.get_row(2, 1))
+
+    def test_rebuild_command(self):
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=["rebuild-status"])
+
+        self.assertIn("Stored 4 status rows.", result.output)
+        self.assertEqual(StudentStandardStatus.query.count(), 4)
+
+    def test_realigned_standard_rebuilds_rows(self):
+        status.load_statuses(1, [2], [1])
+        course = db.session.get(Course, 1)
+        standard = db.session.get(Standard, 1)
+
+        course.standards.remove(standard)
+        db.session.commit()
+        self.assertIsNone(self.get_row(2, 1))
+
+        for _ in range(3):
+            db.session.add(
+                StandardAttempt(user_id=2, standard_id=1, score=2, assignment_id=1)
+            )
+        db.session.commit()
+
+        course.align_many([standard])
+        db.session.commit()
+
+        statuses = status.load_statuses(1, [2], [1])
+        engine = ProficiencyEngine(1, [2], [1])
+        self.assertTrue(statuses[(2, 1)].proficient)
+        self.assertEqual(statuses[(2, 1)].proficient, engine.is_proficient(2, 1))
+
+    def test_enrollment_invalidates_rows(self):
+        status.load_statuses(1, [2], [1])
+        course = db.session.get(Course, 1)
+
+        db.session.get(User, 2).enrollments.remove(course)
+        db.session.commit()
+        course.enroll_many([2])
+        db.session.commit()
+
+        self.assertIsNone(self.get_row(2, 1))
+
+    def test_refresh_queries_do_not_grow_with_courses(self):
+        pairs = {(2, 1), (3, 1)}
+        # Load the lookup tables so they aren't counted
+        status.refresh(pairs)
+        with record_queries() as one_course:
+            status.refresh(pairs)
+
+        course = db.session.get(Course, 2)
+        course.align_many([1])
+        course.enroll_many([2, 3])
+        db.session.commit()
+
+        with record_queries() as two_courses:
+            status.refresh(pairs)
+
+        self.assertEqual(two_courses.count, one_course.count)
+        self.assertEqual(self.get_row(2, 1, course_id=2).count_0, 1)
+        self.assertEqual(StudentStandardStatus.query.count(), 4)
@@ -0,0 +1,85 @@
+from feedbook.extensions import db
+
+from tests.loader import Loader
+from tests.utils import TestBase
+from feedbook.models import Assignment, Course, StandardAttempt, User
+from feedbook.synthetic import District
+
+
+class TestSyntheticDistrict(TestBase):
+    def setUp(self):
+        self.app = self.create()
+
+        # Set up the application context manually to build the database
+        # and test client for requests.
+        ctx = self.app.app_context()
+        ctx.push()
+
+        self.client = self.app.test_client()
+
+        # Load a small generated district instead of fixture files
+        self.loader = Loader(self.app, db, [])
+        self.district = self.loader.load_district(
+            courses=6,
+            students_per_course=10,
+            courses_per_student=3,
+            courses_per_teacher=3,
+            standards=8,
+            standards_per_course=4,
+            assignments_per_course=5,
+        )
+
+    def tearDown(self):
+        db.drop_all()
+        db.session.close()
+
+    def test_rosters(self):
+        self.assertEqual(User.query.filter_by(usertype_id=2).count(), 20)
+        self.assertEqual(User.query.filter_by(usertype_id=1).count(), 2)
+
+        for course in Course.query:
+            students = course.enrollments.filter(User.usertype_id == 2).count()
+            self.assertEqual(students, 10)
+            self.assertEqual(course.standards.count(), 4)
+            self.assertEqual(course.assignments.count(), 5)
+
+        # Students overlap between courses
+        student = db.session.get(User, 3)
+        self.assertEqual(student.enrollments.count(), 3)
+
+    def test_attempts_use_course_standards(self):
+        attempt = db.session.scalars(db.select(StandardAttempt)).first()
+        course = attempt.assessed_on.courses.first()
+
+        self.assertIn(attempt.standard, course.standards.all())
+        self.assertIn(attempt.standard, attempt.assessed_on.alignments.all())
+
+    def test_classwork_can_be_mastered(self):
+        classwork_scores = set(
+            db.session.scalars(
+                db.select(StandardAttempt.score)
+                .join(Assignment, Assignment.id == StandardAttempt.assignment_id)
+                .where(Assignment.assignmenttype_id == 1)
+                .distinct()
+            )
+        )
+
+        self.assertEqual(classwork_scores, {0, 1, 2})
+
+    def test_same_seed_same_rows(self):
+        def rows(seed):
+            return list(District(courses=4, seed=seed).rows())[-50:]
+
+        self.assertEqual(rows(1), rows(1))
+        self.assertNotEqual(rows(1), rows(2))
+
+    def test_chunks(self):
+        entries = list(District(courses=4).tables(chunk_size=100))
+
+        self.assertTrue(all(len(entry["records"]) <= 100 for entry in entries))
+
+    def test_dashboard(self):
+        self.login("teacher1@example.com")
+
+        resp = self.client.get("/courses/1", headers={"HX-Request": "true"})
+        self.assertEqual(resp.status_code, 200)
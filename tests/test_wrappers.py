@@ -2,7 +2,7 @@ from feedbook.extensions import db
 
 from tests.loader import Loader
 from tests.utils import TestBase, captured_templates
-from feedbook.models import User, UserType
+from feedbook.models import Course, User, UserType
 from feedbook.wrappers import restricted
 
 
@@ -43,3 +43,103 @@ class TestWrappers(TestBase):
 
     def test_templated_wrapper(self):
         pass
+
+
+class TestRenderPage(TestBase):
+    def setUp(self):
+        self.app = self.create()
+
+        # Set up the application context manually to build the database
+        # and test client for requests.
+        ctx = self.app.app_context()
+        ctx.push()
+
+        self.client = self.app.test_client()
+
+        fixtures = [
+            "courses.json",
+            "course_enrollments.json",
+            "usertype.json",
+            "users.json",
+        ]
+
+        # Now that we're in context, we can load the database.
+        self.loader = Loader(self.app, db, fixtures)
+        self.loader.load()
+
+        self.login("teacher@example.com")
+
+    def tearDown(self):
+        db.drop_all()
+        db.session.close()
+
+    def rendered(self, *args, **kwargs):
+        with captured_templates(self.app) as templates:
+            resp = self.client.get(*args, **kwargs)
+        return resp, [template["template_name"] for template in templates]
+
+    def test_htmx_request_renders_partial(self):
+        resp, names = self.rendered("/admin", headers={"HX-Request": "true"})
+
+        self.assertEqual(names, ["admin/index.html"])
+        self.assertNotIn(b"left-sidebar", resp.data)
+
+    def test_page_load_renders_layout(self):
+        resp, names = self.rendered("/admin")
+        html = resp.data.decode()
+
+        self.assertIn("shared/layout_wrapper.html", names)
+        self.assertIn("admin/index.html", names)
+        self.assertIn('id="left-sidebar"', html)
+        self.assertIn('id="course-1"', html)
+        self.assertLess(html.index('<section id="detail">'), html.index("Admin</h1>"))
+
+    def test_layout_is_cached(self):
+        self.rendered("/admin")
+        resp, names = self.rendered("/admin")
+
+        self.assertEqual(names, ["admin/index.html"])
+        self.assertIn(b"left-sidebar", resp.data)
+
+    def test_layout_is_rendered_again_when_courses_change(self):
+        self.rendered("/admin")
+
+        db.session.get(Course, 1).name = "Renamed"
+        db.session.commit()
+        resp, names = self.rendered("/admin")
+
+        self.assertIn("shared/layout_wrapper.html", names)
+        self.assertIn(b"Renamed", resp.data)
+
+    def test_users_with_the_same_courses_share_a_layout(self):
+        self.rendered("/admin")
+
+        teacher = User(
+            first_name="Other",
+            last_name="Teacher",
+            email="other@example.com",
+            usertype_id=1,
+        )
+        teacher.enrollments.append(db.session.get(Course, 1))
+        db.session.add(teacher)
+        db.session.commit()
+
+        self.login("other@example.com")
+        resp, names = self.rendered("/admin")
+
+        self.assertNotIn("shared/layout_wrapper.html", names)
+        self.assertIn(b"left-sidebar", resp.data)
+        self.assertEqual(len(self.app.extensions["layout_shells"]), 1)
+
+    def test_layout_cache_is_limited(self):
+        self.app.config["LAYOUT_CACHE_SIZE"] = 1
+        self.rendered("/admin")
+        first = next(iter(self.app.extensions["layout_shells"]))
+
+        db.session.get(Course, 1).name = "Renamed"
+        db.session.commit()
+        self.rendered("/admin")
+
+        shells = self.app.extensions["layout_shells"]
+        self.assertEqual(len(shells), 1)
+        self.assertNotIn(first, shells)
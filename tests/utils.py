@@ -8,6 +8,7 @@ from flask_login.utils import login_user
 from feedbook import create_app
 from feedbook.extensions import db
 from feedbook.models import User
+from feedbook.profiling import record_queries
 from feedbook.schemas import UserSchema
 from config import TestConfig
 
@@ -48,6 +49,29 @@ def captured_templates(app):
         template_rendered.disconnect(record, app)
 
 
+@contextmanager
+def assert_max_queries(n):
+    """
+    Fail when the block (or decorated test) runs more than `n` SQL statements.
+
+        with assert_max_queries(10):
+            self.client.get("/courses/1")
+
+    The failure lists every statement that ran.
+    """
+    with record_queries() as log:
+        yield log
+
+    if log.count > n:
+        statements = "\n".join(
+            f"{i}. {query.statement} ({query.source})"
+            for i, query in enumerate(log.queries, start=1)
+        )
+        raise AssertionError(
+            f"Expected at most {n} queries, ran {log.count}:\n{statements}"
+        )
+
+
 # Look for an object in the templates based on a template title
 def get_template_context(values: list, template_name: str) -> dict:
     try: